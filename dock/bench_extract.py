@@ -0,0 +1,207 @@
+"""
+Offline benchmark of the DB2 extraction path
+
+Generates a synthetic table of configurable size and width in a local SQLite
+(or DuckDB, if installed) database and streams it through the Lambda's
+extraction path (DB2DataProcessor.iter_query_batches and write_record_batches)
+over DBAPIBackend, writing to a byte-counting sink instead of S3. No DB2 server
+or AWS account is needed.
+
+Each output format x batch size case runs in its own process so peak RSS is
+measured per case. The report gives rows/sec, output MB/sec, output size, peak
+RSS and peak Arrow memory per case.
+
+Usage:
+    python bench_extract.py --rows 500000 --columns 24
+    python bench_extract.py --engine duckdb --formats parquet --batch-sizes 1000 10000 100000
+"""
+
+import argparse
+import io
+import logging
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+import pyarrow as pa
+
+from lam import DB2DataProcessor, DBAPIBackend, write_record_batches
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ('sqlite', 'duckdb')
+
+# Column kinds cycled through to reach the requested width: SQL expression of the
+# row number x per engine (the first column is always the unique ID)
+COLUMN_KINDS = {
+    'int': {
+        'sqlite': "x * 31 % 1000003",
+        'duckdb': "CAST(x * 31 % 1000003 AS BIGINT)",
+    },
+    'amount': {
+        'sqlite': "ROUND((x * 7919 % 100000) / 100.0, 2)",
+        'duckdb': "CAST((x * 7919 % 100000) / 100.0 AS DECIMAL(12, 2))",
+    },
+    'code': {
+        'sqlite': "'S' || (x % 7)",
+        'duckdb': "'S' || CAST(x % 7 AS VARCHAR)",
+    },
+    'name': {
+        'sqlite': "'customer_' || (x * 2654435761 % 1000003)",
+        'duckdb': "'customer_' || CAST(x * 2654435761 % 1000003 AS VARCHAR)",
+    },
+    'timestamp': {
+        'sqlite': "datetime(1700000000 + x, 'unixepoch')",
+        'duckdb': "make_timestamp((1700000000 + x) * 1000000)",
+    },
+    'float': {
+        'sqlite': "(x % 1000) * 1.5",
+        'duckdb': "CAST((x % 1000) * 1.5 AS DOUBLE)",
+    },
+}
+
+
+class CountingSink(io.RawIOBase):
+    """Writable file object that discards its data and counts the bytes"""
+
+    def __init__(self):
+        self.bytes_written = 0
+
+    def writable(self):
+        return True
+
+    def tell(self):
+        return self.bytes_written
+
+    def write(self, data):
+        size = memoryview(data).nbytes
+        self.bytes_written += size
+        return size
+
+
+def _driver(engine):
+    if engine == 'duckdb':
+        import duckdb
+        return duckdb
+    import sqlite3
+    return sqlite3
+
+
+def create_table(engine, path, rows, columns):
+    """Create the synthetic BENCH table (ID plus columns - 1 generated columns)"""
+    kinds = list(COLUMN_KINDS)
+    expressions = ["x AS ID"] + [
+        f"{COLUMN_KINDS[kinds[i % len(kinds)]][engine]} AS C{i:03d}_{kinds[i % len(kinds)].upper()}"
+        for i in range(columns - 1)
+    ]
+    select = ', '.join(expressions)
+    if engine == 'duckdb':
+        source = f"SELECT {select} FROM range(1, {rows + 1}) AS t(x)"
+    else:
+        source = (f"WITH RECURSIVE seq(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM seq WHERE x < {rows}) "
+                  f"SELECT {select} FROM seq")
+
+    connection = _driver(engine).connect(path)
+    try:
+        connection.execute(f"CREATE TABLE BENCH AS {source}")
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def run_case(engine, path, file_format, batch_size):
+    """Extract the BENCH table once and return its measurements"""
+    processor = DB2DataProcessor(backend=DBAPIBackend(_driver(engine)))
+    processor.db_connection = processor.backend.connect(path)
+    sink = CountingSink()
+
+    started = time.perf_counter()
+    batches = processor.iter_query_batches("SELECT * FROM BENCH", batch_size=batch_size)
+    rows = write_record_batches(batches, sink, file_format)
+    seconds = time.perf_counter() - started
+    processor.close_connection()
+
+    return {
+        'rows': rows,
+        'seconds': seconds,
+        'rows_per_second': rows / seconds,
+        'output_mb': sink.bytes_written / 2 ** 20,
+        'output_mb_per_second': sink.bytes_written / 2 ** 20 / seconds,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'peak_arrow_mb': pa.default_memory_pool().max_memory() / 2 ** 20,
+    }
+
+
+def _run_case_process(queue, engine, path, file_format, batch_size):
+    logging.getLogger().setLevel(logging.WARNING)
+    try:
+        queue.put(run_case(engine, path, file_format, batch_size))
+    except Exception as e:
+        queue.put({'error': str(e)})
+
+
+def run_benchmark(rows=200000, columns=12, engine='sqlite', formats=('parquet', 'csv'),
+                  batch_sizes=(1000, 10000, 50000)):
+    """Generate the table once, then run each format x batch size in its own process"""
+    report = {
+        'params': {'rows': rows, 'columns': columns, 'engine': engine},
+        'cases': [],
+    }
+    context = multiprocessing.get_context('spawn')
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f"bench.{engine}")
+        started = time.perf_counter()
+        create_table(engine, path, rows, columns)
+        report['params']['generate_seconds'] = time.perf_counter() - started
+
+        for file_format in formats:
+            for batch_size in batch_sizes:
+                queue = context.Queue()
+                process = context.Process(
+                    target=_run_case_process, args=(queue, engine, path, file_format, batch_size)
+                )
+                process.start()
+                stats = queue.get()
+                process.join()
+                report['cases'].append({'format': file_format, 'batch_size': batch_size, **stats})
+    return report
+
+
+def format_report(report):
+    params = report['params']
+    lines = [f"engine={params['engine']} rows={params['rows']} columns={params['columns']} "
+             f"(generated in {params['generate_seconds']:.1f}s)"]
+    for case in report['cases']:
+        label = f"{case['format']:>8} batch {case['batch_size']:>7}"
+        if 'error' in case:
+            lines.append(f"  {label}: failed - {case['error']}")
+            continue
+        lines.append(
+            f"  {label}: {case['seconds']:7.2f}s {case['rows_per_second']:10.0f} rows/s "
+            f"{case['output_mb_per_second']:7.1f} MB/s out {case['output_mb']:7.1f}MB "
+            f"rss {case['peak_rss_mb']:7.1f}MB arrow {case['peak_arrow_mb']:6.1f}MB"
+        )
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DB2 extraction formats and batch sizes on a local database")
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--columns', type=int, default=12, help="Table width (including the ID column)")
+    parser.add_argument('--engine', choices=ENGINES, default='sqlite')
+    parser.add_argument('--formats', nargs='+', choices=['parquet', 'csv'], default=['parquet', 'csv'])
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=[1000, 10000, 50000])
+    args = parser.parse_args()
+    if args.columns < 1:
+        parser.error("--columns must be at least 1")
+
+    logging.basicConfig(level=logging.WARNING)
+    report = run_benchmark(args.rows, args.columns, args.engine, args.formats, args.batch_sizes)
+    print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,116 +1,965 @@
+import csv
 import json
 import boto3
-import ibm_db
 import yaml
-import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import io
 import logging
-from io import StringIO, BytesIO
-from datetime import datetime
+import queue
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from decimal import Decimal, InvalidOperation
+from typing import NamedTuple, Optional
 import os
+import re
+import sqlite3
+from botocore.exceptions import ClientError
+try:
+    import ibm_db
+except ImportError:  # Only needed for the DB2 backend; local tests and benchmarks use DBAPIBackend
+    ibm_db = None
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-class DB2DataProcessor:
+# Rows fetched per batch when conf.yaml has no settings.batch_size
+DEFAULT_BATCH_SIZE = 10000
+
+# Batches held back while a column without a declared type has only had NULLs
+TYPE_INFERENCE_BATCHES = 10
+
+# S3 multipart upload part size (S3 minimum is 5 MiB) and parts uploaded concurrently
+MIN_PART_SIZE = 5 * 1024 * 1024
+DEFAULT_PART_SIZE_MB = 16
+DEFAULT_MAX_PARTS_IN_FLIGHT = 4
+
+CONTENT_TYPES = {
+    'parquet': 'application/octet-stream',
+    'csv': 'text/csv',
+}
+
+# Seconds a secret is reused by warm invocations before Secrets Manager is asked again
+SECRET_CACHE_TTL_SECONDS = int(os.environ.get('SECRET_CACHE_TTL_SECONDS', 300))
+
+# Cheap statement used to check a cached DB2 connection before reuse
+DB2_PING_QUERY = "SELECT 1 FROM SYSIBM.SYSDUMMY1"
+
+# Time left (seconds) at which extraction stops and returns a continuation;
+# it must cover fetching one batch and completing the part file's upload
+DEFAULT_DEADLINE_MARGIN_SECONDS = 60
+
+
+class DB2ConnectionPool:
+    """Bounded pool of DB2 connections for extracting tables concurrently
+    
+    Connections are opened on demand (through backend, IbmDbBackend by default),
+    up to max_connections, and reused by later tables. An ibm_db connection must
+    only be used by one thread at a time.
+    """
+    
+    def __init__(self, connection_string, max_connections, initial_connection=None, backend=None):
+        self.connection_string = connection_string
+        self.max_connections = max_connections
+        self.backend = backend or IbmDbBackend()
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+        self._connections = []
+        if initial_connection:
+            self._connections.append(initial_connection)
+            self._idle.put(initial_connection)
+    
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with block"""
+        with self._slots:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                connection = self.backend.connect(self.connection_string)
+                with self._lock:
+                    self._connections.append(connection)
+                logger.info(f"Opened DB2 connection {len(self._connections)}/{self.max_connections}")
+            try:
+                yield connection
+            finally:
+                self._idle.put(connection)
+    
+    def close(self, keep=None):
+        """Close every pooled connection except keep"""
+        with self._lock:
+            for connection in self._connections:
+                if connection is not keep:
+                    self.backend.close(connection)
+            self._connections = [keep] if keep else []
+
+
+class S3MultipartWriter(io.RawIOBase):
+    """Write-only file object that streams its data to S3 as a multipart upload
+    
+    Data is cut into parts of part_size bytes that are uploaded by background
+    threads, at most max_in_flight at a time (write blocks when all are busy), so
+    memory stays at a few part sizes and uploading overlaps with producing the
+    data. Objects smaller than one part are sent with a single put_object.
+    close() completes the upload; abort() (or leaving a with block on an
+    exception) discards it.
+    """
+    
+    def __init__(self, s3_client, bucket_name, s3_key, content_type='application/octet-stream',
+                 part_size=DEFAULT_PART_SIZE_MB * 1024 * 1024, max_in_flight=DEFAULT_MAX_PARTS_IN_FLIGHT):
+        super().__init__()
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.s3_key = s3_key
+        self.content_type = content_type
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.max_in_flight = max_in_flight
+        self.bytes_written = 0
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._executor = None
+        self._futures = []
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+    
+    def writable(self):
+        return True
+    
+    def tell(self):
+        return self.bytes_written
+    
+    def write(self, data):
+        if self.closed:
+            raise ValueError("write to closed S3MultipartWriter")
+        data = memoryview(data).cast('B')
+        self._buffer += data
+        self.bytes_written += len(data)
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            self._submit_part(part)
+        return len(data)
+    
+    def _submit_part(self, body):
+        if self._upload_id is None:
+            response = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket_name, Key=self.s3_key, ContentType=self.content_type
+            )
+            self._upload_id = response['UploadId']
+            self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight)
+        
+        # Surface a failed part now rather than after uploading the rest
+        for future in self._futures:
+            if future.done() and future.exception() is not None:
+                raise future.exception()
+        
+        self._slots.acquire()
+        part_number = len(self._futures) + 1
+        self._futures.append(self._executor.submit(self._upload_part, part_number, body))
+    
+    def _upload_part(self, part_number, body):
+        try:
+            response = self.s3_client.upload_part(
+                Bucket=self.bucket_name, Key=self.s3_key, UploadId=self._upload_id,
+                PartNumber=part_number, Body=body
+            )
+            return {'PartNumber': part_number, 'ETag': response['ETag']}
+        finally:
+            self._slots.release()
+    
+    def close(self):
+        """Upload the remaining data and complete the upload"""
+        if self.closed:
+            return
+        try:
+            if self._upload_id is None:
+                self.s3_client.put_object(
+                    Bucket=self.bucket_name, Key=self.s3_key, Body=bytes(self._buffer),
+                    ContentType=self.content_type
+                )
+            else:
+                if self._buffer:
+                    self._submit_part(bytes(self._buffer))
+                parts = [future.result() for future in self._futures]
+                self.s3_client.complete_multipart_upload(
+                    Bucket=self.bucket_name, Key=self.s3_key, UploadId=self._upload_id,
+                    MultipartUpload={'Parts': parts}
+                )
+                logger.info(f"Completed multipart upload of {len(parts)} parts to s3://{self.bucket_name}/{self.s3_key}")
+        except Exception:
+            self.abort()
+            raise
+        finally:
+            self._shutdown()
+    
+    def abort(self):
+        """Discard the upload and any parts already sent"""
+        if self.closed:
+            return
+        try:
+            if self._upload_id is not None:
+                if self._executor is not None:
+                    self._executor.shutdown(wait=True, cancel_futures=True)
+                self.s3_client.abort_multipart_upload(
+                    Bucket=self.bucket_name, Key=self.s3_key, UploadId=self._upload_id
+                )
+                logger.warning(f"Aborted multipart upload to s3://{self.bucket_name}/{self.s3_key}")
+        finally:
+            self._shutdown()
+    
+    def _shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._buffer = bytearray()
+        self._futures = []
+        super().close()
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+
+def numeric_value(value):
+    """Return a numeric string (as ibm_db returns DECIMAL and BIGINT values) as an int or Decimal"""
+    if not isinstance(value, str):
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        return value
+    return number if number.is_finite() else value
+
+
+def encode_watermark(value):
+    """Encode a column value as a JSON-friendly {'type', 'value'} dict"""
+    if isinstance(value, datetime):
+        return {'type': 'timestamp', 'value': value.isoformat()}
+    if isinstance(value, date):
+        return {'type': 'date', 'value': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'type': 'decimal', 'value': str(value)}
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"Unsupported watermark value: {value!r}")
+    return {'type': type(value).__name__, 'value': value}
+
+
+def decode_watermark(encoded):
+    """Decode a value encoded by encode_watermark"""
+    decoders = {
+        'timestamp': datetime.fromisoformat,
+        'date': date.fromisoformat,
+        'decimal': Decimal,
+        'int': int,
+        'float': float,
+        'str': str,
+    }
+    return decoders[encoded['type']](encoded['value'])
+
+
+class WatermarkStore:
+    """Per-table high-water marks of incremental extraction, kept as one JSON document
+    
+    The document lives in S3 (location 's3://bucket/key') or in a local file.
+    S3 updates are conditional on the ETag that was read (If-Match, or
+    If-None-Match for a new object) and retried on conflict; local updates are
+    written to a temporary file and renamed. Either way concurrent table workers
+    and overlapping invocations never lose each other's marks.
+    """
+    
+    MAX_ATTEMPTS = 5
+    
+    def __init__(self, location, s3_client=None):
+        self.location = location
+        self.s3_client = s3_client
+        self._lock = threading.Lock()
+        if location.startswith('s3://'):
+            self.bucket_name, _, self.key = location[len('s3://'):].partition('/')
+        else:
+            self.bucket_name = self.key = None
+    
+    def _read(self):
+        """Return (marks, version) where version is the S3 ETag (None if absent)"""
+        if self.bucket_name is None:
+            if not os.path.exists(self.location):
+                return {}, None
+            with open(self.location, encoding='utf-8') as state_file:
+                return json.load(state_file), None
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=self.key)
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('NoSuchKey', '404'):
+                return {}, None
+            raise
+        return json.loads(response['Body'].read()), response['ETag']
+    
+    def get(self, table_name):
+        """Return the table's mark, or None if it was never extracted"""
+        marks, _ = self._read()
+        encoded = marks.get(table_name)
+        return decode_watermark(encoded['mark']) if encoded else None
+    
+    def advance(self, table_name, value):
+        """Store a new mark for the table (never moving it backwards)"""
+        with self._lock:
+            for attempt in range(self.MAX_ATTEMPTS):
+                marks, etag = self._read()
+                current = marks.get(table_name)
+                if current is not None:
+                    current = decode_watermark(current['mark'])
+                    if isinstance(current, str) and not isinstance(value, str):
+                        # Numeric marks stored as text by earlier versions
+                        current = numeric_value(current)
+                    if current >= value:
+                        return
+                marks[table_name] = {'mark': encode_watermark(value),
+                                     'updated_at': datetime.now(timezone.utc).isoformat()}
+                body = json.dumps(marks, indent=2)
+                
+                if self.bucket_name is None:
+                    temp_path = f"{self.location}.tmp"
+                    with open(temp_path, 'w', encoding='utf-8') as state_file:
+                        state_file.write(body)
+                    os.replace(temp_path, self.location)
+                    return
+                
+                condition = {'IfMatch': etag} if etag else {'IfNoneMatch': '*'}
+                try:
+                    self.s3_client.put_object(Bucket=self.bucket_name, Key=self.key, Body=body.encode('utf-8'),
+                                              ContentType='application/json', **condition)
+                    return
+                except ClientError as e:
+                    if e.response['Error']['Code'] not in ('PreconditionFailed', 'ConditionalRequestConflict'):
+                        raise
+                    logger.warning(f"Watermark state changed concurrently; retrying ({attempt + 1})")
+                    time.sleep(0.1 * (attempt + 1))
+            raise Exception(f"Could not update watermark for {table_name} after {self.MAX_ATTEMPTS} attempts")
+
+
+def partition_bounds(low, high, count):
+    """Split [low, high] into count equal ranges and return the count - 1 inner bounds
+    
+    Works for integer, decimal, float, date and timestamp columns. Integer and
+    date bounds are rounded down, so ranges may be merged when there are fewer
+    distinct values than ranges. Numeric strings (ibm_db's DECIMAL and BIGINT
+    values) are split as numbers. Other columns (e.g. VARCHAR) raise ValueError;
+    they can still be partitioned with explicit bounds.
+    """
+    if low is None or high is None or count <= 1:
+        return []
+    low, high = numeric_value(low), numeric_value(high)
+    if Decimal in (type(low), type(high)) and all(type(value) in (int, Decimal) for value in (low, high)):
+        low, high = Decimal(low), Decimal(high)
+    for value in (low, high):
+        if isinstance(value, bool) or not isinstance(value, (int, float, Decimal, date)):
+            raise ValueError(f"Cannot split a {type(value).__name__} partition column into {count} "
+                             f"ranges; use a numeric, date or timestamp column or explicit bounds")
+    if low >= high:
+        return []
+    
+    bounds = []
+    for i in range(1, count):
+        if isinstance(low, (datetime, date)):
+            bound = low + (high - low) * i / count
+        elif isinstance(low, int):
+            bound = low + (high - low) * i // count
+        else:
+            bound = low + (high - low) * i / count
+        if bound > low and (not bounds or bound > bounds[-1]):
+            bounds.append(bound)
+    return bounds
+
+
+def partition_predicates(column, bounds):
+    """Return (WHERE predicate, parameters) of each range slice split at bounds
+    
+    Slices are half-open (lower <= column < upper); the first is open below and
+    the last open above and also takes the NULLs, so together they cover every row.
+    """
+    if not bounds:
+        return [(None, ())]
+    slices = [(f"{column} < ?", (bounds[0],))]
+    for lower, upper in zip(bounds, bounds[1:]):
+        slices.append((f"{column} >= ? AND {column} < ?", (lower, upper)))
+    slices.append((f"({column} >= ? OR {column} IS NULL)", (bounds[-1],)))
+    return slices
+
+
+def db2_arrow_type(field_type, precision=None, scale=None):
+    """Map an ibm_db column type (field_type, field_precision, field_scale) to an Arrow type
+    
+    Character and LOB text columns are dictionary-encoded, which keeps repeated
+    values (codes, statuses, names) small in memory and in Parquet. ibm_db
+    reports DECFLOAT as "real" and binary columns as "string"; those types are
+    corrected from the values (see refine_arrow_type).
+    """
+    field_type = (field_type or '').lower()
+    if field_type in ('int', 'integer', 'smallint', 'bigint'):
+        return pa.int64()
+    if field_type in ('decimal', 'numeric') and precision:
+        return pa.decimal128(min(precision, 38), scale or 0)
+    if field_type in ('real', 'float', 'double'):
+        return pa.float64()
+    if field_type == 'timestamp':
+        return pa.timestamp('us')
+    if field_type == 'date':
+        return pa.date32()
+    if field_type == 'time':
+        return pa.time64('us')
+    if field_type == 'boolean':
+        return pa.bool_()
+    if field_type == 'blob':
+        return pa.binary()
+    return pa.dictionary(pa.int32(), pa.string())
+
+
+def refine_arrow_type(arrow_type, values):
+    """Return the Arrow type of a column whose ibm_db type name is ambiguous, from its values"""
+    value = next((value for value in values if value is not None), None)
+    # DECFLOAT ("real") comes back as text that fits neither float64 nor decimal128;
+    # BINARY and FOR BIT DATA ("string") come back as bytes
+    if pa.types.is_floating(arrow_type) and isinstance(value, str):
+        return pa.string()
+    if pa.types.is_dictionary(arrow_type) and isinstance(value, (bytes, bytearray)):
+        return pa.binary()
+    return arrow_type
+
+
+# DB-API type names (as reported by e.g. duckdb) and their db2_arrow_type equivalent
+DBAPI_TYPE_NAMES = {
+    'tinyint': 'int', 'smallint': 'int', 'integer': 'int', 'int': 'int', 'bigint': 'int',
+    'decimal': 'decimal', 'numeric': 'decimal',
+    'real': 'real', 'float': 'real', 'double': 'real',
+    'varchar': 'string', 'char': 'string', 'text': 'string', 'string': 'string',
+    'timestamp': 'timestamp', 'datetime': 'timestamp', 'date': 'date', 'time': 'time',
+    'boolean': 'boolean', 'bool': 'boolean', 'blob': 'blob',
+}
+
+
+def dbapi_arrow_type(type_code, precision=None, scale=None):
+    """Map a DB-API cursor.description type (or a declared SQL type) to an Arrow type
+    
+    Returns the null type when the driver reports no type, an unknown one or a
+    DECIMAL without precision; such columns are inferred from the data.
+    """
+    if not type_code:
+        return pa.null()
+    name = str(type_code).lower().strip()
+    match = re.fullmatch(r'(\w+)\s*\((\d+)(?:,\s*(\d+))?\)', name)
+    if match:
+        name, precision, scale = match.group(1), int(match.group(2)), int(match.group(3) or 0)
+    if name not in DBAPI_TYPE_NAMES or (DBAPI_TYPE_NAMES[name] == 'decimal' and not precision):
+        return pa.null()
+    return db2_arrow_type(DBAPI_TYPE_NAMES[name], precision, scale)
+
+
+def sqlite_declared_types(connection, query):
+    """Return the declared type of each result column of a sqlite3 query ('' if none)
+    
+    sqlite3 reports no types in cursor.description, but a temporary view of the
+    query carries the declared types of the table columns it selects (e.g.
+    DECIMAL(10,2)). Parameter markers, which a view cannot hold, are replaced by
+    NULL. Returns None if the view cannot be created.
+    """
+    view_query = re.sub(r"('(?:[^']|'')*')|\?", lambda match: match.group(1) or 'NULL', query)
+    view = f"lam_schema_{threading.get_ident()}"
+    try:
+        connection.execute(f"CREATE TEMP VIEW {view} AS {view_query}")
+    except sqlite3.Error:
+        return None
+    try:
+        return [column[2] for column in connection.execute(f"PRAGMA temp.table_info({view})")]
+    finally:
+        connection.execute(f"DROP VIEW temp.{view}")
+
+
+class IbmDbBackend:
+    """DB2 access through ibm_db (the Lambda's backend)"""
+    
+    ping_query = DB2_PING_QUERY
+    
     def __init__(self):
-        self.secrets_client = boto3.client('secretsmanager')
-        self.s3_client = boto3.client('s3')
+        if ibm_db is None:
+            raise ImportError("ibm_db is required for the DB2 backend")
+    
+    def connection_string(self, credentials):
+        return (
+            f"DATABASE={credentials['database']};"
+            f"HOSTNAME={credentials['hostname']};"
+            f"PORT={credentials['port']};"
+            f"PROTOCOL=TCPIP;"
+            f"UID={credentials['username']};"
+            f"PWD={credentials['password']};"
+        )
+    
+    def connect(self, connection_string):
+        return ibm_db.connect(connection_string, "", "")
+    
+    def close(self, connection):
+        ibm_db.close(connection)
+    
+    def execute(self, connection, query, params=None):
+        """Run query, binding params to its ? parameter markers, and return the statement"""
+        if params:
+            stmt = ibm_db.prepare(connection, query)
+            ibm_db.execute(stmt, tuple(params))
+        else:
+            stmt = ibm_db.exec_immediate(connection, query)
+        return stmt
+    
+    def fetch_rows(self, stmt, count):
+        """Fetch up to count rows as tuples (fewer only at the end of the result)"""
+        rows = []
+        while len(rows) < count:
+            row = ibm_db.fetch_tuple(stmt)
+            if not row:
+                break
+            rows.append(row)
+        return rows
+    
+    def schema(self, stmt):
+        """Return the Arrow schema of an executed statement from its column metadata"""
+        fields = []
+        for i in range(ibm_db.num_fields(stmt)):
+            arrow_type = db2_arrow_type(
+                ibm_db.field_type(stmt, i), ibm_db.field_precision(stmt, i), ibm_db.field_scale(stmt, i)
+            )
+            fields.append(pa.field(ibm_db.field_name(stmt, i), arrow_type))
+        return pa.schema(fields)
+    
+    def free(self, stmt):
+        ibm_db.free_stmt(stmt)
+
+
+class DBAPIStatement(NamedTuple):
+    """An executed DB-API cursor and the declared column types of its query, if known"""
+    cursor: object
+    declared_types: Optional[list]
+
+
+class DBAPIBackend:
+    """Any DB-API 2.0 driver with ? parameter markers (sqlite3, duckdb), as a local stand-in for DB2
+    
+    Lets the extraction path run in tests and benchmarks without a DB2 server.
+    Connection strings (the credentials' database) are passed to module.connect
+    with connect_kwargs, e.g. DBAPIBackend(sqlite3, check_same_thread=False)
+    for pooled use. sqlite3 columns are typed from their declared types (see
+    sqlite_declared_types).
+    """
+    
+    ping_query = "SELECT 1"
+    
+    def __init__(self, module, **connect_kwargs):
+        self.module = module
+        self.connect_kwargs = connect_kwargs
+    
+    def connection_string(self, credentials):
+        return credentials['database']
+    
+    def connect(self, connection_string):
+        return self.module.connect(connection_string, **self.connect_kwargs)
+    
+    def close(self, connection):
+        connection.close()
+    
+    def execute(self, connection, query, params=None):
+        declared_types = None
+        if isinstance(connection, sqlite3.Connection):
+            declared_types = sqlite_declared_types(connection, query)
+            # sqlite3 cannot bind Decimal; text compared with a NUMERIC column is read as a number
+            params = [str(param) if isinstance(param, Decimal) else param for param in params or ()]
+        cursor = connection.cursor()
+        cursor.execute(query, tuple(params or ()))
+        return DBAPIStatement(cursor, declared_types)
+    
+    def fetch_rows(self, stmt, count):
+        return stmt.cursor.fetchmany(count)
+    
+    def schema(self, stmt):
+        fields = []
+        for i, column in enumerate(stmt.cursor.description):
+            arrow_type = dbapi_arrow_type(column[1], column[4], column[5])
+            if pa.types.is_null(arrow_type) and stmt.declared_types:
+                arrow_type = dbapi_arrow_type(stmt.declared_types[i])
+            fields.append(pa.field(column[0], arrow_type))
+        return pa.schema(fields)
+    
+    def free(self, stmt):
+        stmt.cursor.close()
+
+
+def column_array(values, arrow_type):
+    """Build an Arrow array of arrow_type from fetched column values"""
+    try:
+        return pa.array(values, type=arrow_type)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        # DECIMAL as text or floats, DATE/TIMESTAMP as ISO text and BOOLEAN as 0/1
+        # are cast by Arrow; any other mismatch raises
+        if pa.types.is_boolean(arrow_type):
+            return pa.array(values, type=pa.int64()).cast(arrow_type)
+        if not (pa.types.is_decimal(arrow_type) or pa.types.is_integer(arrow_type)
+                or pa.types.is_temporal(arrow_type)):
+            raise
+        strings = pa.array([str(value) if isinstance(value, (int, float)) else value for value in values],
+                           type=pa.string())
+        return strings.cast(arrow_type)
+
+
+def typed_value(value, arrow_type):
+    """Convert one fetched value to the Python value of its column's Arrow type"""
+    if value is None:
+        return None
+    if pa.types.is_null(arrow_type):
+        return numeric_value(value)
+    return column_array([value], refine_arrow_type(arrow_type, [value]))[0].as_py()
+
+
+def infer_arrow_type(values):
+    """Return the Arrow type of a column the backend reports no type for, from its values"""
+    arrow_type = pa.array(values).type
+    if pa.types.is_string(arrow_type):
+        return pa.dictionary(pa.int32(), pa.string())
+    return arrow_type
+
+
+def build_record_batch(rows, schema, inferred, offset):
+    """Build a record batch of schema from fetched rows; inferred columns that do not match raise ValueError"""
+    arrays = []
+    for i, column_values in enumerate(zip(*rows) if rows else [[]] * len(schema)):
+        field = schema.field(i)
+        if i not in inferred:
+            arrays.append(column_array(column_values, field.type))
+            continue
+        array = pa.array(column_values)
+        if pa.types.is_string(array.type):
+            array = array.dictionary_encode()
+        if pa.types.is_null(array.type):
+            array = pa.nulls(len(array), field.type)
+        elif pa.types.is_null(field.type):
+            raise ValueError(
+                f"Column {field.name} has no declared type and was NULL in the first {offset} rows; "
+                f"CAST it in the query"
+            )
+        elif array.type != field.type:
+            raise ValueError(
+                f"Column {field.name} has no declared type and its values changed from "
+                f"{field.type} to {array.type} after {offset} rows; CAST it in the query"
+            )
+        arrays.append(array)
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def plain_schema(schema):
+    """Return schema with dictionary-encoded columns replaced by their value type"""
+    return pa.schema([
+        field.with_type(field.type.value_type) if pa.types.is_dictionary(field.type) else field
+        for field in schema
+    ])
+
+
+class CSVBatchWriter:
+    """Write record batches to a binary file object as CSV, quoting only where needed
+    
+    Like DataFrame.to_csv, the header and values are unquoted unless a value
+    holds a comma, quote or line break, and nulls and empty strings are both
+    written as empty fields, whichever batch they are in. The sink is not closed.
+    """
+    
+    def __init__(self, sink, schema):
+        self.sink = sink
+        header = io.StringIO()
+        csv.writer(header, lineterminator='\n').writerow(schema.names)
+        sink.write(header.getvalue().encode())
+    
+    def write_batch(self, batch):
+        buffer = io.BytesIO()
+        try:
+            pa_csv.write_csv(batch, buffer, pa_csv.WriteOptions(include_header=False, quoting_style='none'))
+        except pa.ArrowInvalid:
+            # Arrow cannot quote value by value, so the csv module writes this batch
+            # from Arrow's own text of each value
+            columns = [column.cast(pa.string()).to_pylist() for column in batch.columns]
+            text = io.StringIO()
+            csv.writer(text, lineterminator='\n').writerows(zip(*columns))
+            buffer = io.BytesIO(text.getvalue().encode())
+        self.sink.write(buffer.getvalue())
+    
+    def close(self):
+        pass
+
+
+def write_record_batches(batches, sink, file_format='parquet'):
+    """Write Arrow record batches to a writable file object as Parquet or CSV
+    
+    Each batch becomes a Parquet row group or a CSV chunk as it arrives, so only
+    one batch is held at a time. Later batches are cast to the first batch's
+    schema; dictionary columns are written as plain strings to CSV. sink may be
+    any binary file object (an S3MultipartWriter, a local file, a byte counter
+    for benchmarks); it is not closed. Returns the row count.
+    """
+    file_format = file_format.lower()
+    if file_format not in CONTENT_TYPES:
+        raise ValueError(f"Unsupported file format: {file_format}")
+    
+    writer = None
+    schema = None
+    rows = 0
+    try:
+        for batch in batches:
+            if writer is None:
+                if file_format == 'parquet':
+                    schema = batch.schema
+                    writer = pq.ParquetWriter(sink, schema)
+                else:
+                    schema = plain_schema(batch.schema)
+                    writer = CSVBatchWriter(sink, schema)
+            elif batch.schema != schema:
+                batch = batch.cast(schema)
+            
+            if batch.num_rows:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+# Module-scope state survives warm invocations of the same Lambda container
+_aws_clients = {}
+_secret_cache = {}
+_config_cache = {}
+_connection_cache = {}
+_cache_stats = {name: {'hits': 0, 'misses': 0} for name in ('secrets', 'config', 'connection')}
+
+
+def aws_client(service_name):
+    """Return the container's boto3 client for a service, creating it on first use"""
+    client = _aws_clients.get(service_name)
+    if client is None:
+        client = _aws_clients[service_name] = boto3.client(service_name)
+    return client
+
+
+def cache_stats():
+    """Return the hit/miss counts of the warm-container caches since the container started"""
+    return {name: dict(counts) for name, counts in _cache_stats.items()}
+
+
+def _count(cache_name, hit):
+    _cache_stats[cache_name]['hits' if hit else 'misses'] += 1
+
+
+def invalidate_secret(secret_name):
+    """Drop a cached secret, e.g. after its credentials were rejected"""
+    _secret_cache.pop(secret_name, None)
+
+
+class DB2DataProcessor:
+    def __init__(self, backend=None):
+        self.backend = backend or IbmDbBackend()
         self.db_connection = None
+        self.connection_string = None
+        self.max_parallel_tables = 1
+        self.watermark_store = None
+        self.batch_size = DEFAULT_BATCH_SIZE
+        self.upload_part_size = DEFAULT_PART_SIZE_MB * 1024 * 1024
+        self.upload_max_in_flight = DEFAULT_MAX_PARTS_IN_FLIGHT
+        self.remaining_time_ms = None
+        self.deadline_margin_ms = DEFAULT_DEADLINE_MARGIN_SECONDS * 1000
         
+    @property
+    def secrets_client(self):
+        return aws_client('secretsmanager')
+    
+    @property
+    def s3_client(self):
+        return aws_client('s3')
+    
+    def deadline_reached(self):
+        """Whether the invocation is close enough to its deadline to stop extracting"""
+        return self.remaining_time_ms is not None and self.remaining_time_ms() < self.deadline_margin_ms
+    
     def get_db_credentials(self, secret_name):
-        """Retrieve DB2 credentials from AWS Secrets Manager"""
+        """Retrieve DB2 credentials from AWS Secrets Manager
+        
+        Credentials are cached for SECRET_CACHE_TTL_SECONDS across warm invocations.
+        """
+        cached = _secret_cache.get(secret_name)
+        if cached and cached[1] > time.monotonic():
+            _count('secrets', hit=True)
+            return cached[0]
+        
         try:
             response = self.secrets_client.get_secret_value(SecretId=secret_name)
             credentials = json.loads(response['SecretString'])
+            _secret_cache[secret_name] = (credentials, time.monotonic() + SECRET_CACHE_TTL_SECONDS)
+            _count('secrets', hit=False)
             return credentials
         except Exception as e:
             logger.error(f"Error retrieving credentials: {str(e)}")
             raise
     
     def get_config_from_s3(self, bucket_name, config_key):
-        """Download and parse YAML config from S3"""
+        """Download and parse YAML config from S3
+        
+        A config cached by an earlier warm invocation is revalidated with its
+        ETag and only downloaded and parsed again if the object has changed.
+        """
+        cached = _config_cache.get((bucket_name, config_key))
         try:
-            response = self.s3_client.get_object(Bucket=bucket_name, Key=config_key)
+            if cached:
+                try:
+                    response = self.s3_client.get_object(Bucket=bucket_name, Key=config_key, IfNoneMatch=cached[0])
+                except ClientError as e:
+                    if e.response['Error']['Code'] not in ('304', 'NotModified'):
+                        raise
+                    _count('config', hit=True)
+                    return cached[1]
+            else:
+                response = self.s3_client.get_object(Bucket=bucket_name, Key=config_key)
             config_content = response['Body'].read().decode('utf-8')
             config = yaml.safe_load(config_content)
+            _config_cache[(bucket_name, config_key)] = (response['ETag'], config)
+            _count('config', hit=False)
             return config
         except Exception as e:
             logger.error(f"Error retrieving config from S3: {str(e)}")
             raise
     
+    def _cached_connection(self, connection_string):
+        """Return the container's DB2 connection for connection_string if it still answers a ping"""
+        connection = _connection_cache.get(connection_string)
+        if connection is None:
+            return None
+        try:
+            self.backend.free(self.backend.execute(connection, self.backend.ping_query))
+            return connection
+        except Exception as e:
+            logger.warning(f"Cached DB2 connection is unusable, reconnecting: {str(e)}")
+            _connection_cache.pop(connection_string, None)
+            try:
+                self.backend.close(connection)
+            except Exception:
+                pass
+            return None
+    
     def connect_to_db2(self, credentials):
-        """Establish connection to DB2"""
-        try:
-            connection_string = (
-                f"DATABASE={credentials['database']};"
-                f"HOSTNAME={credentials['hostname']};"
-                f"PORT={credentials['port']};"
-                f"PROTOCOL=TCPIP;"
-                f"UID={credentials['username']};"
-                f"PWD={credentials['password']};"
-            )
+        """Establish connection to DB2
+        
+        The connection is kept open across warm invocations and reused after a
+        ping; a connection for other (e.g. rotated) credentials is closed.
+        """
+        try:
+            connection_string = self.backend.connection_string(credentials)
+            self.connection_string = connection_string
+            self.db_connection = self._cached_connection(connection_string)
+            if self.db_connection:
+                _count('connection', hit=True)
+                logger.info("Reusing DB2 connection")
+                return True
             
-            self.db_connection = ibm_db.connect(connection_string, "", "")
+            for stale_connection in _connection_cache.values():
+                # A dropped connection can fail to close; it must not stop the reconnect
+                try:
+                    self.backend.close(stale_connection)
+                except Exception as e:
+                    logger.warning(f"Error closing stale DB2 connection: {str(e)}")
+            _connection_cache.clear()
+            self.db_connection = self.backend.connect(connection_string)
+            _connection_cache[connection_string] = self.db_connection
+            _count('connection', hit=False)
             logger.info("Successfully connected to DB2")
             return True
         except Exception as e:
             logger.error(f"Error connecting to DB2: {str(e)}")
             raise
     
-    def execute_query(self, query):
+    def iter_query_batches(self, query, batch_size=None, connection=None, params=None):
+        """Execute query and yield the results as Arrow record batches of batch_size rows"""
+        connection = connection or self.db_connection
+        if not connection:
+            raise Exception("No database connection available")
+        batch_size = batch_size or self.batch_size
+        
+        stmt = self.backend.execute(connection, query, params)
+        
+        total_rows = 0
+        try:
+            schema = self.backend.schema(stmt)
+            inferred = {i for i, field in enumerate(schema) if pa.types.is_null(field.type)}
+            pending = set(inferred)
+            ambiguous = {i for i, field in enumerate(schema)
+                         if pa.types.is_floating(field.type) or pa.types.is_dictionary(field.type)}
+            held = []
+            while True:
+                rows = self.backend.fetch_rows(stmt, batch_size)
+                exhausted = len(rows) < batch_size
+                if rows or not (total_rows or held):
+                    held.append(rows)
+                
+                # Undeclared columns take their type from their first values (holding
+                # batches back until they have some); ambiguous ones are refined once
+                for i in sorted(pending | ambiguous):
+                    values = [row[i] for row in rows if row[i] is not None]
+                    if values:
+                        field = schema.field(i)
+                        arrow_type = (infer_arrow_type(values) if i in inferred
+                                      else refine_arrow_type(field.type, values))
+                        schema = schema.set(i, field.with_type(arrow_type))
+                        pending.discard(i)
+                ambiguous.clear()
+                if pending and not exhausted and len(held) < TYPE_INFERENCE_BATCHES:
+                    continue
+                
+                # The schema is fixed from the first batch yielded on
+                pending.clear()
+                for held_rows in held:
+                    batch = build_record_batch(held_rows, schema, inferred, total_rows)
+                    total_rows += len(held_rows)
+                    yield batch
+                held = []
+                
+                if exhausted:
+                    break
+        finally:
+            self.backend.free(stmt)
+        
+        logger.info(f"Query executed successfully. Retrieved {total_rows} rows.")
+    
+    def execute_query(self, query, connection=None):
         """Execute query and return results as DataFrame"""
         try:
-            if not self.db_connection:
-                raise Exception("No database connection available")
-            
-            stmt = ibm_db.exec_immediate(self.db_connection, query)
-            
-            # Fetch column metadata
-            columns = []
-            num_columns = ibm_db.num_fields(stmt)
-            for i in range(num_columns):
-                columns.append(ibm_db.field_name(stmt, i))
-            
-            # Fetch all rows
-            rows = []
-            while ibm_db.fetch_row(stmt):
-                row = []
-                for i in range(num_columns):
-                    row.append(ibm_db.result(stmt, i))
-                rows.append(row)
-            
-            # Create DataFrame
-            df = pd.DataFrame(rows, columns=columns)
-            logger.info(f"Query executed successfully. Retrieved {len(df)} rows.")
-            return df
+            return pa.Table.from_batches(list(self.iter_query_batches(query, connection=connection))).to_pandas()
             
         except Exception as e:
             logger.error(f"Error executing query: {str(e)}")
             raise
     
+    def open_s3_writer(self, bucket_name, s3_key, file_format='parquet'):
+        """Return an S3MultipartWriter for an output object, using the upload settings"""
+        return S3MultipartWriter(
+            self.s3_client, bucket_name, s3_key,
+            content_type=CONTENT_TYPES.get(file_format.lower(), 'application/octet-stream'),
+            part_size=self.upload_part_size, max_in_flight=self.upload_max_in_flight
+        )
+    
     def upload_to_s3(self, dataframe, bucket_name, s3_key, file_format='parquet'):
         """Upload DataFrame to S3 in specified format"""
         try:
-            if file_format.lower() == 'parquet':
-                buffer = BytesIO()
-                dataframe.to_parquet(buffer, index=False)
-                buffer.seek(0)
-                content_type = 'application/octet-stream'
-            elif file_format.lower() == 'csv':
-                buffer = StringIO()
-                dataframe.to_csv(buffer, index=False)
-                buffer = BytesIO(buffer.getvalue().encode('utf-8'))
-                content_type = 'text/csv'
-            else:
-                raise ValueError(f"Unsupported file format: {file_format}")
-            
-            self.s3_client.put_object(
-                Bucket=bucket_name,
-                Key=s3_key,
-                Body=buffer.getvalue(),
-                ContentType=content_type
-            )
+            batches = pa.Table.from_pandas(dataframe, preserve_index=False).to_batches(self.batch_size)
+            with self.open_s3_writer(bucket_name, s3_key, file_format) as sink:
+                write_record_batches(batches, sink, file_format)
             
             logger.info(f"Data uploaded to s3://{bucket_name}/{s3_key}")
             return True
@@ -119,59 +968,432 @@ class DB2DataProcessor:
             logger.error(f"Error uploading to S3: {str(e)}")
             raise
     
-    def process_tables(self, config):
-        """Process all tables defined in config"""
-        results = []
+    def extract_to_s3(self, query, bucket_name, s3_key, file_format='parquet', connection=None, params=None):
+        """Stream query results to S3 batch by batch and return the number of rows
         
-        for table_config in config.get('tables', []):
-            table_name = table_config.get('name')
-            query = table_config.get('query')
-            output_config = table_config.get('output', {})
+        Fetching, encoding and uploading overlap, and memory stays at about one
+        fetch batch plus a few upload parts however large the result is.
+        """
+        try:
+            with self.open_s3_writer(bucket_name, s3_key, file_format) as sink:
+                batches = self.iter_query_batches(query, connection=connection, params=params)
+                rows = write_record_batches(batches, sink, file_format)
             
-            logger.info(f"Processing table: {table_name}")
+            logger.info(f"Streamed {rows} rows ({sink.bytes_written} bytes) to s3://{bucket_name}/{s3_key}")
+            return rows
             
+        except Exception as e:
+            logger.error(f"Error streaming query results to S3: {str(e)}")
+            raise
+    
+    def delete_s3_objects(self, bucket_name, s3_keys):
+        """Delete objects from a bucket, logging (not raising) any that could not be deleted"""
+        s3_keys = list(s3_keys)
+        for i in range(0, len(s3_keys), 1000):
             try:
-                # Execute query
-                df = self.execute_query(query)
+                response = self.s3_client.delete_objects(
+                    Bucket=bucket_name,
+                    Delete={'Objects': [{'Key': key} for key in s3_keys[i:i + 1000]], 'Quiet': True}
+                )
+                for error in response.get('Errors', []):
+                    logger.error(f"Could not delete s3://{bucket_name}/{error['Key']}: {error.get('Message')}")
+            except Exception as e:
+                logger.error(f"Error deleting {len(s3_keys[i:i + 1000])} objects from {bucket_name}: {str(e)}")
+        if s3_keys:
+            logger.info(f"Deleted {len(s3_keys)} partial output objects from s3://{bucket_name}/")
+    
+    def fetch_one(self, query, connection=None, params=None):
+        """Execute a query and return its first row (or None), with values of the columns' types"""
+        connection = connection or self.db_connection
+        stmt = self.backend.execute(connection, query, params)
+        try:
+            rows = self.backend.fetch_rows(stmt, 1)
+            if not rows:
+                return None
+            return tuple(typed_value(value, field.type) for value, field in zip(rows[0], self.backend.schema(stmt)))
+        finally:
+            self.backend.free(stmt)
+    
+    def get_partition_range(self, query, column, connection=None, params=None):
+        """Return (MIN, MAX) of a column over the rows of query"""
+        row = self.fetch_one(
+            f"SELECT MIN({column}), MAX({column}) FROM ({query}) AS PARTITION_SOURCE", connection, params
+        )
+        return (row[0], row[1]) if row else (None, None)
+    
+    def incremental_query(self, table_config, connection=None):
+        """Return (query, params, new mark) restricting a table to rows past its watermark
+        
+        The new mark is read first, so the extract covers exactly
+        old mark < column <= new mark and rows arriving meanwhile are left for the
+        next run. The new mark is None when there are no new rows.
+        """
+        table_name = table_config.get('name')
+        query = table_config.get('query')
+        column = table_config['incremental']['column']
+        if self.watermark_store is None:
+            raise ValueError("incremental tables need settings.watermark_store")
+        
+        mark = self.watermark_store.get(table_name)
+        if mark is None and table_config['incremental'].get('initial') is not None:
+            mark = table_config['incremental']['initial']
+        
+        if mark is None:
+            condition, params = "", ()
+        else:
+            condition, params = f" WHERE {column} > ?", (mark,)
+        row = self.fetch_one(f"SELECT MAX({column}) FROM ({query}) AS INCREMENTAL_SOURCE{condition}",
+                             connection, params)
+        new_mark = row[0] if row else None
+        if new_mark is None:
+            return None, None, None
+        
+        logger.info(f"Extracting {table_name} rows with {column} in ({mark}, {new_mark}]")
+        if mark is None:
+            return (f"SELECT * FROM ({query}) AS INCREMENTAL_SOURCE WHERE {column} <= ?",
+                    (new_mark,), new_mark)
+        return (f"SELECT * FROM ({query}) AS INCREMENTAL_SOURCE WHERE {column} > ? AND {column} <= ?",
+                (mark, new_mark), new_mark)
+    
+    def extract_partitioned_to_s3(self, table_config, connection=None, query=None, params=(), parallel=True):
+        """Extract a table as range slices on a partition column, in parallel
+        
+        The table's partition setting names the column and either a slice count
+        (split evenly between the column's MIN and MAX) or explicit bounds. Each
+        slice runs on its own DB2 connection (at most partition.max_parallel at a
+        time) and is written as a part file under <prefix>/<table>_<timestamp>/.
+        If any slice fails, the parts already written are deleted so no partial
+        extract is left behind. query and params override the table's query
+        (e.g. an incremental query). With parallel False the slices run one
+        after another on connection.
+        """
+        table_name = table_config.get('name')
+        query = query or table_config.get('query')
+        params = tuple(params or ())
+        output_config = table_config.get('output', {})
+        partition = table_config['partition']
+        column = partition['column']
+        bucket_name = output_config.get('bucket')
+        file_format = output_config.get('format', 'parquet')
+        connection = connection or self.db_connection
+        
+        if partition.get('bounds'):
+            bounds = sorted(partition['bounds'])
+        else:
+            low, high = self.get_partition_range(query, column, connection, params)
+            bounds = partition_bounds(low, high, int(partition.get('count', 1)))
+        slices = partition_predicates(column, bounds)
+        
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        prefix = f"{output_config.get('prefix', 'data')}/{table_name}_{timestamp}"
+        parallelism = min(len(slices), int(partition.get('max_parallel', len(slices)))) if parallel else 1
+        logger.info(f"Extracting {table_name} as {len(slices)} slices on {column} "
+                    f"with up to {parallelism} connections")
+        
+        written_keys = []
+        
+        def extract_slice(part_number, predicate, slice_params, slice_connection):
+            slice_query = f"SELECT * FROM ({query}) AS PARTITION_SOURCE"
+            if predicate:
+                slice_query += f" WHERE {predicate}"
+            s3_key = f"{prefix}/part-{part_number:05d}.{file_format}"
+            rows = self.extract_to_s3(slice_query, bucket_name, s3_key, file_format,
+                                      connection=slice_connection, params=params + tuple(slice_params))
+            written_keys.append(s3_key)
+            return rows
+        
+        try:
+            if parallelism > 1 and self.connection_string:
+                pool = DB2ConnectionPool(self.connection_string, parallelism, initial_connection=connection,
+                                         backend=self.backend)
+                
+                def extract_pooled(part_number, predicate, slice_params):
+                    with pool.connection() as slice_connection:
+                        return extract_slice(part_number, predicate, slice_params, slice_connection)
                 
+                try:
+                    with ThreadPoolExecutor(max_workers=parallelism) as executor:
+                        futures = [executor.submit(extract_pooled, i, predicate, slice_params)
+                                   for i, (predicate, slice_params) in enumerate(slices)]
+                        try:
+                            slice_rows = [future.result() for future in futures]
+                        except Exception:
+                            # Slices not started yet would only be deleted again
+                            for future in futures:
+                                future.cancel()
+                            raise
+                finally:
+                    pool.close(keep=connection)
+            else:
+                slice_rows = [extract_slice(i, predicate, slice_params, connection)
+                              for i, (predicate, slice_params) in enumerate(slices)]
+        except Exception:
+            self.delete_s3_objects(bucket_name, written_keys)
+            raise
+        
+        return {
+            'table': table_name,
+            'rows_processed': sum(slice_rows),
+            's3_location': f"s3://{bucket_name}/{prefix}/",
+            'parts': len(slices),
+            'status': 'success'
+        }
+    
+    def _until_deadline(self, batches, key_column, progress, batch_size):
+        """Pass batches through until the deadline is near, recording the last key seen
+        
+        Only a full batch can stop the extract: an empty batch is the whole,
+        empty result and a short one (fewer than batch_size rows) the end of
+        the result, so a stopped extract always has a last key and more rows.
+        """
+        try:
+            for batch in batches:
+                yield batch
+                if not batch.num_rows:
+                    continue
+                progress['last_key'] = batch.column(key_column)[batch.num_rows - 1].as_py()
+                if batch.num_rows >= batch_size and self.deadline_reached():
+                    progress['stopped'] = True
+                    return
+        finally:
+            batches.close()
+    
+    def extract_resumable_to_s3(self, table_config, connection=None, query=None, params=(), state=None):
+        """Extract a table in resume_key order, stopping before the invocation's deadline
+        
+        Each invocation writes one part file under <prefix>/<table>_<timestamp>/.
+        When the deadline is near, the current batch completes the part and the
+        result carries a continuation (table, last key, parts written) that a
+        later call passes back as state to continue after the last key.
+        resume_key must be a unique column of the table.
+        """
+        table_name = table_config.get('name')
+        key_column = table_config['resume_key']
+        output_config = table_config.get('output', {})
+        bucket_name = output_config.get('bucket')
+        file_format = output_config.get('format', 'parquet')
+        state = state or {}
+        
+        if state.get('s3_prefix'):
+            prefix = state['s3_prefix']
+        else:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            prefix = f"{output_config.get('prefix', 'data')}/{table_name}_{timestamp}"
+        part_number = state.get('parts_written', 0)
+        
+        resume_query = f"SELECT * FROM ({query or table_config.get('query')}) AS RESUMABLE_SOURCE"
+        resume_params = tuple(params or ())
+        if state.get('last_key') is not None:
+            resume_query += f" WHERE {key_column} > ?"
+            resume_params += (decode_watermark(state['last_key']),)
+        resume_query += f" ORDER BY {key_column}"
+        
+        progress = {}
+        s3_key = f"{prefix}/part-{part_number:05d}.{file_format}"
+        with self.open_s3_writer(bucket_name, s3_key, file_format) as sink:
+            batches = self.iter_query_batches(resume_query, connection=connection, params=resume_params)
+            rows = write_record_batches(self._until_deadline(batches, key_column, progress, self.batch_size),
+                                        sink, file_format)
+        
+        rows_processed = state.get('rows_processed', 0) + rows
+        logger.info(f"Wrote part {part_number} of {table_name} ({rows} rows) to s3://{bucket_name}/{s3_key}")
+        result = {
+            'table': table_name,
+            'rows_processed': rows_processed,
+            's3_location': f"s3://{bucket_name}/{prefix}/",
+            'parts': part_number + 1,
+            'status': 'success'
+        }
+        if progress.get('stopped'):
+            logger.info(f"Deadline near; {table_name} stops after {key_column} = {progress['last_key']}")
+            result['status'] = 'incomplete'
+            result['continuation'] = {
+                'table': table_name,
+                'last_key': encode_watermark(progress['last_key']),
+                'parts_written': part_number + 1,
+                'rows_processed': rows_processed,
+                's3_prefix': prefix,
+            }
+        return result
+    
+    def process_table(self, table_config, connection=None, state=None, parallel_partitions=True):
+        """Extract one table to S3 and return its result entry
+        
+        Tables with an incremental column only extract rows past their stored
+        watermark, which is advanced once the upload has succeeded. Tables with
+        a resume_key may stop early with a continuation (see
+        extract_resumable_to_s3); state is that continuation when resuming. If
+        such a table fails, its result carries state back as the continuation,
+        so a retry resumes after the parts already written. parallel_partitions
+        False reads a partitioned table's slices one at a time on connection.
+        """
+        table_name = table_config.get('name')
+        query = table_config.get('query')
+        output_config = table_config.get('output', {})
+        state = state or {}
+        
+        if self.deadline_reached():
+            logger.info(f"Deadline near; deferring table {table_name}")
+            return {
+                'table': table_name,
+                'status': 'deferred',
+                'continuation': {**state, 'table': table_name}
+            }
+        
+        logger.info(f"Processing table: {table_name}")
+        
+        try:
+            params = ()
+            new_mark = None
+            if state.get('query'):
+                # Resume exactly the extract that was started, whatever arrived since
+                query = state['query']
+                params = tuple(decode_watermark(param) for param in state.get('params', []))
+                if state.get('watermark'):
+                    new_mark = decode_watermark(state['watermark'])
+            elif table_config.get('incremental'):
+                query, params, new_mark = self.incremental_query(table_config, connection)
+                if query is None:
+                    logger.info(f"No new rows for {table_name}")
+                    return {
+                        'table': table_name,
+                        'rows_processed': 0,
+                        'status': 'success'
+                    }
+            
+            if table_config.get('resume_key'):
+                result = self.extract_resumable_to_s3(table_config, connection, query, params, state)
+                if 'continuation' in result:
+                    # The watermark only advances once the last part is written
+                    if new_mark is not None:
+                        result['continuation'].update(
+                            query=query,
+                            params=[encode_watermark(param) for param in params],
+                            watermark=encode_watermark(new_mark)
+                        )
+                    return result
+            elif table_config.get('partition'):
+                result = self.extract_partitioned_to_s3(table_config, connection, query, params,
+                                                        parallel=parallel_partitions)
+            else:
                 # Generate output key with timestamp
                 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
                 s3_key = f"{output_config.get('prefix', 'data')}/{table_name}_{timestamp}.{output_config.get('format', 'parquet')}"
                 
-                # Upload to S3
-                self.upload_to_s3(
-                    df, 
-                    output_config.get('bucket'), 
-                    s3_key, 
-                    output_config.get('format', 'parquet')
+                # Stream query results to S3
+                rows_processed = self.extract_to_s3(
+                    query,
+                    output_config.get('bucket'),
+                    s3_key,
+                    output_config.get('format', 'parquet'),
+                    connection=connection,
+                    params=params
                 )
                 
-                results.append({
+                result = {
                     'table': table_name,
-                    'rows_processed': len(df),
+                    'rows_processed': rows_processed,
                     's3_location': f"s3://{output_config.get('bucket')}/{s3_key}",
                     'status': 'success'
-                })
-                
-            except Exception as e:
-                logger.error(f"Error processing table {table_name}: {str(e)}")
-                results.append({
-                    'table': table_name,
-                    'status': 'failed',
-                    'error': str(e)
-                })
+                }
+            
+            # Only advance the mark once the data is safely in S3
+            if new_mark is not None:
+                self.watermark_store.advance(table_name, new_mark)
+                result['watermark'] = encode_watermark(new_mark)['value']
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error processing table {table_name}: {str(e)}")
+            result = {
+                'table': table_name,
+                'status': 'failed',
+                'error': str(e)
+            }
+            if table_config.get('resume_key'):
+                result['continuation'] = {**state, 'table': table_name}
+            return result
+    
+    def _process_table_pooled(self, table_config, pool, state=None):
+        try:
+            with pool.connection() as connection:
+                # Tables already use every connection of the pool, so partitions run one by one
+                return self.process_table(table_config, connection, state, parallel_partitions=False)
+        except Exception as e:
+            logger.error(f"Error processing table {table_config.get('name')}: {str(e)}")
+            result = {
+                'table': table_config.get('name'),
+                'status': 'failed',
+                'error': str(e)
+            }
+            if table_config.get('resume_key'):
+                result['continuation'] = {**(state or {}), 'table': table_config.get('name')}
+            return result
+    
+    def process_tables(self, config, continuation=None):
+        """Process all tables defined in config
+        
+        With settings.max_parallel_tables above 1, tables are extracted side by
+        side over a pool of that many DB2 connections (partitioned tables then
+        read their slices one at a time, so no more connections are opened).
+        Results keep the order of config['tables'] either way. Tables that stop
+        or are not started before the deadline carry a continuation entry; given the collected
+        entries as continuation ({'tables': [...]}), only those tables are
+        processed, each resuming where it stopped.
+        """
+        settings = config.get('settings') or {}
+        self.batch_size = settings.get('batch_size', DEFAULT_BATCH_SIZE)
+        self.upload_part_size = settings.get('upload_part_size_mb', DEFAULT_PART_SIZE_MB) * 1024 * 1024
+        self.upload_max_in_flight = settings.get('upload_max_parts_in_flight', DEFAULT_MAX_PARTS_IN_FLIGHT)
+        self.max_parallel_tables = max(int(settings.get('max_parallel_tables', 1)), 1)
+        self.deadline_margin_ms = settings.get('deadline_margin_seconds', DEFAULT_DEADLINE_MARGIN_SECONDS) * 1000
+        if settings.get('watermark_store'):
+            self.watermark_store = WatermarkStore(settings['watermark_store'], self.s3_client)
         
-        return results
+        tables = config.get('tables', [])
+        states = {}
+        if continuation:
+            states = {entry['table']: entry for entry in continuation.get('tables', [])}
+            unknown = set(states) - {table_config.get('name') for table_config in tables}
+            if unknown:
+                logger.warning(f"Ignoring continuation of tables missing from the config: {sorted(unknown)}")
+            tables = [table_config for table_config in tables if table_config.get('name') in states]
+            logger.info(f"Resuming {len(tables)} tables from continuation")
+        
+        if self.max_parallel_tables == 1 or len(tables) <= 1 or not self.connection_string:
+            return [self.process_table(table_config, state=states.get(table_config.get('name')))
+                    for table_config in tables]
+        
+        workers = min(self.max_parallel_tables, len(tables))
+        logger.info(f"Processing {len(tables)} tables with up to {workers} DB2 connections")
+        pool = DB2ConnectionPool(self.connection_string, workers, initial_connection=self.db_connection,
+                                 backend=self.backend)
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(
+                    lambda table_config: self._process_table_pooled(table_config, pool, states.get(table_config.get('name'))),
+                    tables
+                ))
+        finally:
+            pool.close(keep=self.db_connection)
     
     def close_connection(self):
-        """Close DB2 connection"""
+        """Close DB2 connection (and drop it from the warm-container cache)"""
         if self.db_connection:
-            ibm_db.close(self.db_connection)
+            _connection_cache.pop(self.connection_string, None)
+            self.backend.close(self.db_connection)
+            self.db_connection = None
             logger.info("DB2 connection closed")
 
 def lambda_handler(event, context):
-    """Main Lambda handler"""
+    """Main Lambda handler
+    
+    When tables are left unfinished near the Lambda deadline (or a resumable
+    table fails), the response body carries a continuation; invoking again with
+    it as event['continuation'] resumes them.
+    """
     processor = DB2DataProcessor()
+    processor.remaining_time_ms = getattr(context, 'get_remaining_time_in_millis', None)
     
     try:
         # Extract parameters from event
@@ -190,24 +1412,35 @@ def lambda_handler(event, context):
         # Get table configuration
         config = processor.get_config_from_s3(config_bucket, config_key)
         
-        # Connect to DB2
-        processor.connect_to_db2(credentials)
+        # Connect to DB2 (a rejected cached secret may have been rotated)
+        try:
+            processor.connect_to_db2(credentials)
+        except Exception:
+            invalidate_secret(secret_name)
+            raise
         
         # Process tables
-        results = processor.process_tables(config)
+        results = processor.process_tables(config, event.get('continuation'))
+        pending = [r['continuation'] for r in results if 'continuation' in r]
         
-        # Close connection
-        processor.close_connection()
+        # The connection stays open for the next warm invocation
+        logger.info(f"Warm-container cache stats: {cache_stats()}")
         
         # Return results
+        body = {
+            'message': 'Processing completed successfully',
+            'results': results,
+            'processed_tables': len(results),
+            'successful_tables': len([r for r in results if r['status'] == 'success']),
+            'cache_stats': cache_stats()
+        }
+        if pending:
+            logger.info(f"Stopped with {len(pending)} unfinished or failed resumable tables left to resume")
+            body['message'] = 'Some tables are unfinished; invoke again with the continuation'
+            body['continuation'] = {'tables': pending}
         return {
             'statusCode': 200,
-            'body': json.dumps({
-                'message': 'Processing completed successfully',
-                'results': results,
-                'processed_tables': len(results),
-                'successful_tables': len([r for r in results if r['status'] == 'success'])
-            })
+            'body': json.dumps(body)
         }
         
     except Exception as e:
@@ -220,6 +1453,7 @@ def lambda_handler(event, context):
             'statusCode': 500,
             'body': json.dumps({
                 'message': 'Processing failed',
-                'error': str(e)
+                'error': str(e),
+                'cache_stats': cache_stats()
             })
         }
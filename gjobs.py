@@ -6,36 +6,491 @@ for improved performance when analyzing multiple jobs.
 
 Features:
 - Parallel processing using ThreadPoolExecutor for concurrent API calls
+- One shared, pooled Glue client sized to the number of workers
+- Adaptive (AIMD) concurrency and request rate with throttle-aware retries
+- Bulk job metadata via batch_get_jobs and optional job discovery by tag or name prefix
+- Optional vectorized (pandas) cost kernel for jobs with many runs
+- Optional asyncio engine (aiobotocore) for very large numbers of jobs
+- Streaming, checkpointed result output with resume (see gjobs_output.py)
+- Alternative backend reading AWS Cost and Usage Report Parquet (see gjobs_cur.py)
+- Per-API-call counters, latency histograms and per-job phase timings (see gjobs_metrics.py)
 - Configurable number of worker threads
 - Progress tracking and error handling
 - Performance statistics and reporting
 - Support for both parallel and sequential processing modes
+- Configurable billing windows (month, week or custom date range)
+- Optional incremental local run-history store (see gjobs_store.py)
+- Multi-account, multi-region fan-out with assumed roles, one process per target
+- Deterministic job sharding with mergeable partial results (see gjobs_shard.py)
+- Daily cost rollup cube with date-range/group-by queries (see gjobs_cube.py)
+- Long-running service with scheduled refresh and a cached HTTP JSON API (see gjobs_service.py)
 
 Usage:
     calculator = GlueCostCalculator(
         region_name='us-east-1',
         max_workers=16,           # Number of parallel workers
-        enable_parallel=True      # Enable parallel processing
+        enable_parallel=True,     # Enable parallel processing
+        month='2025-08'           # Or week='2025-08-11', or start_date/end_date
     )
     
     results = calculator.calculate_costs_from_csv('glue_jobs.csv')
+
+Command line:
+    python gjobs.py --csv glue_jobs.csv --month 2025-09
+    python gjobs.py --csv glue_jobs.csv --start 2025-09-01 --end 2025-09-15
+    python gjobs.py --csv glue_jobs.csv --month 2025-09 --shard 0/4 --output shard-0.json
+    python gjobs.py --merge shard-*.json --output glue_costs_2025_09.csv
+    python gjobs.py --csv glue_jobs.csv --month 2025-09 --build-cube glue_cost_cube.parquet
+    python gjobs.py --query-cube glue_cost_cube.parquet --month 2025-09 --group-by day,glue_version
+    python gjobs.py --target arn:aws:iam::111122223333:role/GlueCostReader,us-east-1 \\
+                    --target arn:aws:iam::111122223333:role/GlueCostReader,eu-west-1 --month 2025-09
 """
 
 import boto3
+import botocore.session
+from botocore.config import Config
+from botocore.credentials import CredentialProvider, RefreshableCredentials
+from botocore.exceptions import ClientError
 import pandas as pd
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
+import argparse
+import asyncio
+import json
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
 import multiprocessing
-from functools import partial
+from typing import NamedTuple, Optional
+
+try:
+    from aiobotocore.session import get_session as get_aio_session
+except ImportError:  # Only needed for the asyncio engine
+    get_aio_session = None
+from gjobs_costs import compute_run_costs, round_cents
+from gjobs_metrics import GlueApiMetrics
+from gjobs_output import StreamingResultWriter, read_results
+from gjobs_shard import merge_partials, parse_shard, select_shard, write_partial
+from gjobs_store import JobRunRecord, JobRunStore
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+def _parse_date(value):
+    """Parse a 'YYYY-MM-DD' string (or pass through a datetime) as a UTC datetime"""
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+
+
+def month_window(year, month):
+    """Return the (start, end) datetimes covering a calendar month"""
+    start = datetime(year, month, 1, tzinfo=timezone.utc)
+    if month == 12:
+        next_month = datetime(year + 1, 1, 1, tzinfo=timezone.utc)
+    else:
+        next_month = datetime(year, month + 1, 1, tzinfo=timezone.utc)
+    return start, next_month - timedelta(microseconds=1)
+
+
+def week_window(day):
+    """Return the (start, end) datetimes of the Monday-Sunday week containing day"""
+    day = _parse_date(day)
+    start = (day - timedelta(days=day.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    return start, start + timedelta(days=7) - timedelta(microseconds=1)
+
+
+def resolve_billing_window(month=None, week=None, start_date=None, end_date=None):
+    """Resolve the billing window options into (start, end, label)
+    
+    Exactly one of month ('YYYY-MM'), week (any 'YYYY-MM-DD' in the week) or a
+    custom start_date/end_date range may be given. The end date of a custom range
+    is inclusive. With no options the window defaults to August 2025.
+    """
+    if sum(option is not None for option in (month, week, start_date or end_date)) > 1:
+        raise ValueError("Specify only one of month, week or start_date/end_date")
+    
+    if week is not None:
+        start, end = week_window(week)
+        return start, end, f"week of {start:%Y-%m-%d}"
+    
+    if start_date is not None or end_date is not None:
+        if start_date is None or end_date is None:
+            raise ValueError("Both start_date and end_date are required for a custom window")
+        start = _parse_date(start_date)
+        end = _parse_date(end_date)
+        if not isinstance(end_date, datetime):
+            end = end + timedelta(days=1) - timedelta(microseconds=1)
+        if end < start:
+            raise ValueError(f"end_date {end_date} is before start_date {start_date}")
+        return start, end, f"{start:%Y-%m-%d} to {end:%Y-%m-%d}"
+    
+    if month is None:
+        month = '2025-08'
+    year, month_number = (int(part) for part in month.split('-'))
+    start, end = month_window(year, month_number)
+    return start, end, f"{start:%B %Y}"
+
+
+# Result keys with the first and last run start times of a job
+RUN_SPAN_COLUMNS = ['first_run_started_on', 'last_run_started_on']
+
+
+def filter_runs_page(job_runs, start=None, end=None, raw=False):
+    """Return (JobRunRecords started within [start, end], whether the page reached start)
+    
+    Pages of get_job_runs are newest-first, so once a run older than start is
+    seen no later page can contain runs in the window. Only the compact records
+    of runs in the window are kept, not the full API dicts (unless raw).
+    """
+    kept = []
+    reached_window_start = False
+    for run in job_runs:
+        start_time = run.get('StartedOn')
+        if not start_time:
+            continue
+        if start is not None and start_time < start:
+            reached_window_start = True
+            continue
+        if end is None or start_time <= end:
+            kept.append(run if raw else JobRunRecord.from_api(run))
+    return kept, reached_window_start
+
+
+def error_result(job_name, error):
+    """Result row for a job whose cost could not be calculated"""
+    return {
+        'job_name': job_name,
+        'glue_version': 'Unknown',
+        'total_runs': 0,
+        'successful_runs': 0,
+        'failed_runs': 0,
+        'total_cost_usd': 0.0,
+        'status': 'error',
+        'error_message': str(error)
+    }
+
+
+class RunSpan:
+    """Pass-through iterable of job runs that records their first and last StartedOn"""
+    
+    def __init__(self, job_runs):
+        self._job_runs = job_runs
+        self.first_started_on = None
+        self.last_started_on = None
+    
+    def __iter__(self):
+        for job_run in self._job_runs:
+            started_on = job_run.started_on
+            if started_on is not None:
+                if self.first_started_on is None or started_on < self.first_started_on:
+                    self.first_started_on = started_on
+                if self.last_started_on is None or started_on > self.last_started_on:
+                    self.last_started_on = started_on
+            yield job_run
+
+
+class ResultStats:
+    """Running summary of per-job results, so results need not be kept in memory"""
+    
+    def __init__(self):
+        self.jobs = 0
+        self.successful = 0
+        self.failed = 0
+        self.total_cost = 0.0
+        self.total_runs = 0
+    
+    def add(self, result):
+        self.jobs += 1
+        if result.get('status') == 'error':
+            self.failed += 1
+        else:
+            self.successful += 1
+            self.total_cost += result['total_cost_usd']
+            # Run counts are unknown (NaN) for CUR results
+            if pd.notna(result['total_runs']):
+                self.total_runs += result['total_runs']
+    
+    def summary(self):
+        if not self.jobs:
+            return {}
+        return {
+            'total_jobs_processed': self.jobs,
+            'successful_jobs': self.successful,
+            'failed_jobs': self.failed,
+            'success_rate': self.successful / self.jobs * 100,
+            'total_cost_usd': self.total_cost,
+            'total_job_runs': self.total_runs,
+            'average_cost_per_job': self.total_cost / self.successful if self.successful else 0
+        }
+
+
+def full_jitter_delay(attempt):
+    """Full jitter exponential backoff delay in seconds for a retry attempt"""
+    return random.uniform(0, min(20.0, 0.5 * 2 ** attempt))
+
+
+# Error codes the Glue API uses to signal request throttling
+THROTTLING_ERROR_CODES = {
+    'ThrottlingException',
+    'Throttling',
+    'TooManyRequestsException',
+    'RequestLimitExceeded',
+}
+
+
+def is_throttling_error(error):
+    """Return True if the exception is a Glue API throttling error"""
+    return (isinstance(error, ClientError) and
+            error.response.get('Error', {}).get('Code') in THROTTLING_ERROR_CODES)
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting the Glue API request rate
+    
+    A rate of None means unlimited until a rate is set.
+    """
+    
+    def __init__(self, rate=None, capacity=None):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity or 1.0
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill()
+            self.rate = rate
+    
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate is not None:
+            capacity = self.capacity or max(self.rate, 1.0)
+            self._tokens = min(capacity, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+    
+    def _take(self):
+        """Take a token and return 0, or return the seconds until one is available"""
+        with self._lock:
+            if self.rate is None:
+                return 0
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+    
+    def acquire(self):
+        """Block until a request token is available"""
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            time.sleep(wait)
+    
+    async def acquire_async(self):
+        """Wait (without blocking the event loop) until a request token is available"""
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+
+class AdaptiveConcurrencyController:
+    """AIMD controller for the number of in-flight Glue API requests
+    
+    Every successful call adds roughly 1/limit to the concurrency limit (about +1
+    per round of calls) unless latency has risen well above the best observed,
+    and every throttling event halves it. The shared token bucket follows the
+    same rule: a throttle (at most one a second) caps it at half the request
+    rate actually sent over the last second, or since the first call if that is
+    more recent, and each round trip (latency) without throttling raises it by
+    rate_increase requests/s.
+    """
+    
+    def __init__(self, max_limit, min_limit=1, max_rate=None, min_rate=1.0, rate_increase=1.0,
+                 decrease_factor=0.5, latency_tolerance=2.0):
+        self.max_limit = max(max_limit, min_limit)
+        self.min_limit = min_limit
+        self.limit = float(self.max_limit)
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.rate_increase = rate_increase
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.bucket = TokenBucket(rate=max_rate)
+        
+        self.in_flight = 0
+        self.throttles = 0
+        self.calls = 0
+        self._latency_ewma = None
+        self._best_latency = None
+        self._last_decrease = 0.0
+        self._last_rate_decrease = 0.0
+        self._last_rate_increase = 0.0
+        self._first_call = None
+        self._recent_calls = deque()
+        self._condition = threading.Condition()
+        self._slot_freed = None
+    
+    def acquire(self):
+        """Wait for a request token and a free concurrency slot"""
+        self.bucket.acquire()
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+    
+    async def acquire_async(self):
+        """asyncio counterpart of acquire, for callers on one event loop"""
+        await self.bucket.acquire_async()
+        while True:
+            with self._condition:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                if self._slot_freed is None:
+                    self._slot_freed = asyncio.Event()
+                slot_freed = self._slot_freed
+            await slot_freed.wait()
+    
+    def release(self, latency, throttled=False, error=False):
+        """Record the outcome of a call and adjust the limits
+        
+        Calls that failed for other reasons than throttling (error) free their
+        slot but neither feed the latency estimate nor raise the limits.
+        """
+        with self._condition:
+            now = time.monotonic()
+            self.in_flight -= 1
+            self.calls += 1
+            if self._first_call is None:
+                self._first_call = now - latency
+            self._recent_calls.append(now)
+            while self._recent_calls and now - self._recent_calls[0] > 1.0:
+                self._recent_calls.popleft()
+            
+            if throttled:
+                self.throttles += 1
+                # Only back off once per congestion event (one latency period)
+                if now - self._last_decrease > (self._latency_ewma or 0.1):
+                    self._last_decrease = now
+                    self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                # Glue quotas are request rates per second, so the rate is cut at most once a second
+                if now - self._last_rate_decrease > 1.0:
+                    self._last_rate_decrease = now
+                    # Calls sent in the last second: those completed in it and those still in flight
+                    window = min(1.0, now - self._first_call)
+                    sent = len(self._recent_calls) + self.in_flight
+                    rate = sent / window if window > 0 else float(self.max_limit)
+                    if self.bucket.rate is not None:
+                        rate = min(rate, self.bucket.rate)
+                    self.bucket.set_rate(max(self.min_rate, rate * self.decrease_factor))
+                    logger.info(f"Throttled by Glue: concurrency limit {self.limit:.1f}, "
+                                f"request rate {self.bucket.rate:.1f}/s")
+            elif not error:
+                if self._latency_ewma is None:
+                    self._latency_ewma = latency
+                else:
+                    self._latency_ewma = 0.8 * self._latency_ewma + 0.2 * latency
+                if self._best_latency is None or self._latency_ewma < self._best_latency:
+                    self._best_latency = self._latency_ewma
+                
+                if self._latency_ewma <= self.latency_tolerance * self._best_latency:
+                    self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+                    round_trip = max(self._latency_ewma, 0.001)
+                    if self.bucket.rate is not None and now - self._last_rate_increase >= round_trip:
+                        self._last_rate_increase = now
+                        rate = self.bucket.rate + self.rate_increase
+                        self.bucket.set_rate(min(self.max_rate, rate) if self.max_rate else rate)
+            
+            self._condition.notify_all()
+            if self._slot_freed is not None:
+                self._slot_freed.set()
+                self._slot_freed = None
+    
+    def stats(self):
+        """Return the current limits and throttling counts"""
+        with self._condition:
+            return {
+                'concurrency_limit': int(self.limit),
+                'request_rate_limit': self.bucket.rate,
+                'api_calls': self.calls,
+                'throttles': self.throttles,
+                'latency_ewma_seconds': self._latency_ewma
+            }
+
+
+class GlueClientPool:
+    """Shared Glue client whose connection pool is sized for the worker threads
+    
+    boto3 clients are thread-safe, so one client is built (loading the endpoint
+    and service-model data once) and shared by every worker. Its urllib3 pool
+    keeps up to max_pool_connections TLS connections open for reuse. HTTP
+    requests sent by the client are counted through its before-send event;
+    botocore does not expose how many connections were opened or reused (the
+    benchmark stub counts those on the server side).
+    """
+    
+    def __init__(self, region_name='us-east-1', max_pool_connections=10, endpoint_url=None, session=None):
+        self.region_name = region_name
+        self.endpoint_url = endpoint_url
+        self.session = session
+        self.max_pool_connections = max_pool_connections
+        self.setup_seconds = 0.0
+        self.http_requests = 0
+        self._client = None
+        self._lock = threading.Lock()
+    
+    @property
+    def client(self):
+        """Return the shared Glue client, creating it on first use"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    started = time.perf_counter()
+                    # Throttling retries are handled by GlueCostCalculator._call_glue so
+                    # the concurrency controller sees every throttle
+                    self._client = (self.session or boto3).client(
+                        'glue',
+                        region_name=self.region_name,
+                        endpoint_url=self.endpoint_url,
+                        config=Config(
+                            max_pool_connections=self.max_pool_connections,
+                            retries={'mode': 'standard', 'total_max_attempts': 1}
+                        )
+                    )
+                    self._client.meta.events.register('before-send.glue', self._count_request)
+                    self.setup_seconds = time.perf_counter() - started
+                    logger.info(f"Created Glue client in {self.setup_seconds:.3f}s "
+                                f"(max_pool_connections={self.max_pool_connections})")
+        return self._client
+    
+    def _count_request(self, **kwargs):
+        with self._lock:
+            self.http_requests += 1
+    
+    def stats(self):
+        """Return client setup time, the pool size and the number of HTTP requests sent"""
+        return {
+            'client_setup_seconds': self.setup_seconds,
+            'max_pool_connections': self.max_pool_connections,
+            'http_requests': self.http_requests
+        }
+
+
 class GlueCostCalculator:
-    def __init__(self, region_name='us-east-1', max_workers=None, enable_parallel=True):
+    def __init__(self, region_name='us-east-1', max_workers=None, enable_parallel=True,
+                 month=None, week=None, start_date=None, end_date=None,
+                 run_store=None, offline=False, max_requests_per_second=None, max_retries=10,
+                 cost_engine='decimal', async_mode=False, endpoint_url=None, session=None):
         """Initialize the Glue cost calculator
         
         Args:
@@ -43,9 +498,48 @@ class GlueCostCalculator:
             max_workers: Maximum number of worker threads for parallel processing. 
                         If None, defaults to min(32, (number of CPUs + 4))
             enable_parallel: Whether to enable parallel processing
+            month: Billing month as 'YYYY-MM'
+            week: Any date ('YYYY-MM-DD') in the billing week (Monday to Sunday)
+            start_date: Start of a custom billing window ('YYYY-MM-DD' or datetime)
+            end_date: Inclusive end of a custom billing window ('YYYY-MM-DD' or datetime)
+            run_store: JobRunStore (or path of its SQLite database) holding job run history.
+                       When set, each job is synced incrementally and costs are read from the store.
+            offline: Answer entirely from run_store without calling the Glue API
+            max_requests_per_second: Upper bound for the shared request rate. If None the
+                       rate is unlimited until Glue throttles, then adapts.
+            max_retries: Retries (with jittered exponential backoff) for throttled calls
+            cost_engine: 'decimal' to cost runs one at a time with Decimal arithmetic, or
+                       'vectorized' to cost all runs of a job with one pandas kernel
+            async_mode: Process jobs on one asyncio event loop (requires aiobotocore)
+                       instead of a thread pool; max_workers bounds in-flight calls
+            endpoint_url: Override the Glue endpoint (e.g. a local stub for benchmarks)
+            session: boto3 Session to create the Glue client from (e.g. with assumed-role
+                       credentials, see assume_role_session); defaults to the default session
+            
+        With no window options the billing window defaults to August 2025.
         """
-        self.glue_client = boto3.client('glue', region_name=region_name)
         self.enable_parallel = enable_parallel
+        self.region_name = region_name
+        self.endpoint_url = endpoint_url
+        
+        if async_mode and get_aio_session is None:
+            raise ImportError("async_mode requires the aiobotocore package")
+        if async_mode and run_store is not None:
+            raise ValueError("async_mode does not support a run_store")
+        if async_mode and session is not None:
+            raise ValueError("async_mode does not support a session")
+        self.async_mode = async_mode
+        
+        if cost_engine not in ('decimal', 'vectorized'):
+            raise ValueError(f"Unsupported cost engine: {cost_engine}")
+        self.cost_engine = cost_engine
+        
+        if isinstance(run_store, str):
+            run_store = JobRunStore(run_store)
+        if offline and run_store is None:
+            raise ValueError("offline mode requires a run_store")
+        self.run_store = run_store
+        self.offline = offline
         
         # Set max workers for parallel processing
         if max_workers is None:
@@ -53,6 +547,24 @@ class GlueCostCalculator:
         else:
             self.max_workers = max_workers
         
+        # One shared client with a connection pool sized to the worker threads
+        self.client_pool = GlueClientPool(region_name, max_pool_connections=self.max_workers,
+                                          endpoint_url=endpoint_url, session=session)
+        self.glue_client = self.client_pool.client
+        
+        # Adaptive (AIMD) limit on in-flight Glue calls shared by all workers
+        self.throttle = AdaptiveConcurrencyController(
+            max_limit=self.max_workers, max_rate=max_requests_per_second
+        )
+        self.max_retries = max_retries
+        
+        # Per-operation API counters/latencies and per-job phase timings
+        self.metrics = GlueApiMetrics()
+        
+        # Job details cached for the lifetime of the calculator
+        self._job_details_cache = {}
+        self._jobs_not_found = set()
+        
         # AWS Glue pricing per DPU-hour (as of 2025)
         self.pricing = {
             '2.0': Decimal('0.44'),
@@ -61,9 +573,10 @@ class GlueCostCalculator:
             '5.0': Decimal('0.44')
         }
         
-        # August 2025 date range
-        self.start_date = datetime(2025, 8, 1, tzinfo=timezone.utc)
-        self.end_date = datetime(2025, 8, 31, 23, 59, 59, tzinfo=timezone.utc)
+        # Billing window (defaults to August 2025)
+        self.start_date, self.end_date, self.window_label = resolve_billing_window(
+            month=month, week=week, start_date=start_date, end_date=end_date
+        )
         
     def read_job_names_from_csv(self, csv_file_path, job_name_column='job_name'):
         """Read Glue job names from CSV file"""
@@ -85,11 +598,51 @@ class GlueCostCalculator:
             logger.error(f"Error reading CSV file: {str(e)}")
             raise
     
-    def get_job_runs_for_august_2025(self, job_name):
-        """Get all job runs for a specific job in August 2025"""
+    def _call_glue(self, operation, **kwargs):
+        """Call a Glue API operation, retrying throttled calls with jittered backoff
+        
+        Every attempt goes through the shared concurrency controller, which
+        adapts the in-flight limit and request rate to throttling and latency.
+        """
+        method = getattr(self.glue_client, operation)
+        for attempt in range(self.max_retries + 1):
+            self.throttle.acquire()
+            started = time.perf_counter()
+            throttled = False
+            response = None
+            try:
+                response = method(**kwargs)
+                return response
+            except ClientError as e:
+                throttled = is_throttling_error(e)
+                if not throttled or attempt == self.max_retries:
+                    raise
+            finally:
+                latency = time.perf_counter() - started
+                self.throttle.release(latency, throttled, error=response is None and not throttled)
+                self.metrics.record_call(operation, latency, attempt, throttled,
+                                         error=response is None, response=response)
+            
+            delay = full_jitter_delay(attempt)
+            logger.debug(f"{operation} throttled, retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+            time.sleep(delay)
+    
+    def get_job_runs(self, job_name, start=None, end=None):
+        """Get all job runs (as JobRunRecords) for a specific job started within [start, end]"""
+        return list(self.iter_job_runs(job_name, start, end))
+    
+    def iter_job_runs(self, job_name, start=None, end=None, raw=False):
+        """Yield JobRunRecords for a specific job started within [start, end], page by page
+        
+        Glue returns job runs newest-first, so paging stops as soon as a page
+        reaches a run that started before the window start. Either bound may be
+        None to leave that side of the window open. With raw, the Glue JobRun
+        dicts are yielded instead of records.
+        """
         try:
-            job_runs = []
+            found = 0
             next_token = None
+            pages = 0
             
             while True:
                 kwargs = {
@@ -100,66 +653,200 @@ class GlueCostCalculator:
                 if next_token:
                     kwargs['NextToken'] = next_token
                 
-                response = self.glue_client.get_job_runs(**kwargs)
-                
-                for run in response['JobRuns']:
-                    start_time = run.get('StartedOn')
-                    if start_time and self.start_date <= start_time <= self.end_date:
-                        job_runs.append(run)
+                response = self._call_glue('get_job_runs', **kwargs)
+                pages += 1
                 
+                page_runs, reached_window_start = filter_runs_page(response['JobRuns'], start, end, raw)
                 next_token = response.get('NextToken')
-                if not next_token:
+                # Drop the full page before yielding so only compact records stay alive
+                del response
+                found += len(page_runs)
+                yield from page_runs
+                
+                if not next_token or reached_window_start:
                     break
             
-            logger.info(f"Found {len(job_runs)} job runs for {job_name} in August 2025")
-            return job_runs
+            logger.info(f"Found {found} job runs for {job_name} ({pages} pages)")
             
         except Exception as e:
+            # Re-raise so a failed scan is reported as an error rather than a zero cost
             logger.error(f"Error getting job runs for {job_name}: {str(e)}")
-            return []
+            raise
     
-    def get_job_details(self, job_name):
-        """Get job details including Glue version"""
-        try:
-            response = self.glue_client.get_job(JobName=job_name)
-            job = response['Job']
+    def get_job_runs_for_august_2025(self, job_name):
+        """Get all job runs (Glue JobRun dicts) for a specific job in the configured billing window
+        
+        Kept for backwards compatibility; use get_job_runs for compact JobRunRecords.
+        """
+        return list(self.iter_job_runs(job_name, self.start_date, self.end_date, raw=True))
+    
+    @staticmethod
+    def _parse_job_details(job):
+        """Extract the Glue version and default DPUs from a Glue Job definition"""
+        # Extract Glue version
+        glue_version = job.get('GlueVersion', '2.0')
+        
+        # Get default DPUs if not specified in job runs
+        if glue_version in ['2.0']:
+            default_allocated_capacity = job.get('AllocatedCapacity', 10)  # Legacy parameter
+            default_max_capacity = job.get('MaxCapacity', default_allocated_capacity)
+        else:
+            default_max_capacity = job.get('MaxCapacity', 10)
+        
+        return {
+            'glue_version': glue_version,
+            'default_max_capacity': default_max_capacity
+        }
+    
+    def prefetch_job_details(self, job_names):
+        """Load job details in bulk with batch_get_jobs (100 names per call) into the run cache"""
+        missing = [name for name in job_names if name not in self._job_details_cache]
+        loaded = 0
+        started = time.perf_counter()
+        
+        for i in range(0, len(missing), 100):
+            chunk = missing[i:i + 100]
+            try:
+                response = self._call_glue('batch_get_jobs', JobNames=chunk)
+            except Exception as e:
+                # Jobs left uncached fall back to get_job calls
+                logger.error(f"Error in batch_get_jobs for {len(chunk)} jobs: {str(e)}")
+                continue
             
-            # Extract Glue version
-            glue_version = job.get('GlueVersion', '2.0')
+            for job in response.get('Jobs', []):
+                self._job_details_cache[job['Name']] = self._parse_job_details(job)
+                loaded += 1
+            for job_name in response.get('JobsNotFound', []):
+                logger.warning(f"Job {job_name} not found; using default job details")
+                self._jobs_not_found.add(job_name)
+        
+        batches = (len(missing) + 99) // 100
+        self.metrics.record_prefetch(time.perf_counter() - started, batches, loaded)
+        logger.info(f"Loaded job details for {loaded} jobs in {batches} batch calls")
+        return loaded
+    
+    def discover_job_names(self, name_prefix=None, tags=None):
+        """List Glue job names by tags and/or name prefix instead of reading a CSV
+        
+        With tags, names come from paginated list_jobs (which filters by tag);
+        otherwise from paginated get_jobs, whose full job definitions also fill
+        the job details cache. The name prefix is applied client-side.
+        """
+        job_names = []
+        next_token = None
+        
+        while True:
+            kwargs = {'MaxResults': 1000}
+            if next_token:
+                kwargs['NextToken'] = next_token
             
-            # Get default DPUs if not specified in job runs
-            if glue_version in ['2.0']:
-                default_allocated_capacity = job.get('AllocatedCapacity', 10)  # Legacy parameter
-                default_max_capacity = job.get('MaxCapacity', default_allocated_capacity)
+            if tags:
+                response = self._call_glue('list_jobs', Tags=tags, **kwargs)
+                page_names = response.get('JobNames', [])
             else:
-                default_max_capacity = job.get('MaxCapacity', 10)
+                response = self._call_glue('get_jobs', **kwargs)
+                page_names = []
+                for job in response.get('Jobs', []):
+                    page_names.append(job['Name'])
+                    self._job_details_cache[job['Name']] = self._parse_job_details(job)
             
-            return {
-                'glue_version': glue_version,
-                'default_max_capacity': default_max_capacity
-            }
+            job_names.extend(name for name in page_names
+                             if name_prefix is None or name.startswith(name_prefix))
+            
+            next_token = response.get('NextToken')
+            if not next_token:
+                break
+        
+        logger.info(f"Discovered {len(job_names)} Glue jobs")
+        return job_names
+    
+    def get_job_details(self, job_name, fallback=True):
+        """Get job details including Glue version
+        
+        If the job cannot be fetched (other than by throttling), the default
+        details are returned, or with fallback=False the error is raised.
+        """
+        cached = self._job_details_cache.get(job_name)
+        if cached is not None:
+            return cached
+        
+        try:
+            if job_name in self._jobs_not_found:
+                raise ValueError(f"Job {job_name} not found")
+            response = self._call_glue('get_job', JobName=job_name)
+            job_details = self._parse_job_details(response['Job'])
+            self._job_details_cache[job_name] = job_details
+            return job_details
             
         except Exception as e:
             logger.error(f"Error getting job details for {job_name}: {str(e)}")
+            if is_throttling_error(e) or not fallback:
+                raise
             return {'glue_version': '2.0', 'default_max_capacity': 10}
     
+    def sync_job_runs(self, job_name):
+        """Fetch runs newer than the store's sync watermark and save them with the job details
+        
+        Stored job details are only replaced by details actually fetched from
+        Glue, never by the defaults used when the fetch fails.
+        """
+        watermark = self.run_store.sync_watermark(job_name)
+        job_runs = self.get_job_runs(job_name, start=watermark)
+        if job_runs:
+            self.run_store.upsert_runs(job_name, job_runs)
+        self.run_store.record_sync(job_name)
+        try:
+            self.run_store.save_job_details(job_name, self.get_job_details(job_name, fallback=False))
+        except Exception as e:
+            if is_throttling_error(e):
+                raise
+            logger.warning(f"Keeping the stored job details of {job_name}: {str(e)}")
+        logger.info(f"Synced {len(job_runs)} job runs for {job_name} "
+                    f"({'full history' if watermark is None else f'since {watermark:%Y-%m-%d %H:%M:%S}'})")
+        return len(job_runs)
+    
+    def load_job_data(self, job_name):
+        """Return (job_details, job_runs) for the billing window from the store or the Glue API
+        
+        From the API, job_runs is a generator of JobRunRecords consumed as pages arrive.
+        """
+        if self.run_store is None:
+            job_details = self.get_job_details(job_name)
+            job_runs = self.iter_job_runs(job_name, self.start_date, self.end_date)
+            return job_details, job_runs
+        
+        if not self.offline:
+            self.sync_job_runs(job_name)
+        elif self.run_store.last_synced(job_name) is None:
+            logger.warning(f"{job_name} was never synced; run without --offline to store its runs")
+        
+        job_details = self.run_store.get_job_details(job_name)
+        if job_details is None:
+            logger.warning(f"No stored job details for {job_name}; using defaults")
+            job_details = {'glue_version': '2.0', 'default_max_capacity': 10}
+        job_runs = self.run_store.get_runs(job_name, self.start_date, self.end_date)
+        return job_details, job_runs
+    
     def calculate_job_run_cost(self, job_run, job_details):
         """Calculate cost for a single job run"""
         try:
+            if isinstance(job_run, dict):
+                job_run = JobRunRecord.from_api(job_run)
+            
             # Get execution time in seconds
-            started_on = job_run.get('StartedOn')
-            completed_on = job_run.get('CompletedOn')
+            started_on = job_run.started_on
+            completed_on = job_run.completed_on
             
             if not started_on or not completed_on:
-                logger.warning(f"Missing start or completion time for job run {job_run.get('Id', 'Unknown')}")
+                logger.warning(f"Missing start or completion time for job run {job_run.run_id or 'Unknown'}")
                 return Decimal('0')
             
             execution_time_seconds = (completed_on - started_on).total_seconds()
             execution_time_hours = Decimal(str(execution_time_seconds)) / Decimal('3600')
             
             # Get DPUs used (prefer AllocatedCapacity, then MaxCapacity, then default)
-            dpus = (job_run.get('AllocatedCapacity') or 
-                   job_run.get('MaxCapacity') or 
+            dpus = (job_run.allocated_capacity or 
+                   job_run.max_capacity or 
                    job_details['default_max_capacity'])
             
             # Get Glue version and corresponding price
@@ -175,195 +862,477 @@ class GlueCostCalculator:
             logger.error(f"Error calculating cost for job run: {str(e)}")
             return Decimal('0')
     
-    @staticmethod
-    def _calculate_job_cost_worker(job_name, region_name, start_date, end_date, pricing):
-        """Static worker function for parallel processing of job cost calculation
+    def aggregate_job_runs(self, job_runs, job_details):
+        """Return (total_cost_usd, successful_runs, failed_runs) for a job's runs
+        
+        job_runs may be any iterable of JobRunRecords; the Decimal engine consumes
+        it as a stream. Only succeeded runs are costed. The total is rounded to the cent.
+        """
+        if self.cost_engine == 'vectorized':
+            return self._aggregate_job_runs_vectorized(job_runs, job_details)
+        
+        total_cost = Decimal('0')
+        successful_runs = 0
+        failed_runs = 0
+        
+        for job_run in job_runs:
+            if job_run.state == 'SUCCEEDED':
+                run_cost = self.calculate_job_run_cost(job_run, job_details)
+                total_cost += run_cost
+                successful_runs += 1
+            else:
+                failed_runs += 1
+        
+        return round_cents(total_cost), successful_runs, failed_runs
+    
+    def _aggregate_job_runs_vectorized(self, job_runs, job_details):
+        """Vectorized equivalent of the Decimal aggregation in aggregate_job_runs"""
+        job_runs = list(job_runs)
+        runs = pd.DataFrame.from_records(job_runs, columns=JobRunRecord._fields)
+        succeeded = runs[runs['state'] == 'SUCCEEDED'].assign(
+            glue_version=job_details['glue_version'],
+            default_max_capacity=job_details['default_max_capacity']
+        )
+        successful_runs = len(succeeded)
+        failed_runs = len(runs) - successful_runs
+        
+        total_cost = float(compute_run_costs(succeeded, self.pricing).sum()) if successful_runs else 0.0
+        
+        # Float error can only change the rounded cent when the total sits on a
+        # half cent; re-cost those jobs exactly so both engines always agree
+        fraction = (total_cost * 100) % 1
+        if abs(fraction - 0.5) < 1e-6:
+            total_cost = sum((self.calculate_job_run_cost(run, job_details)
+                              for run in job_runs if run.state == 'SUCCEEDED'), Decimal('0'))
+        
+        return round_cents(total_cost), successful_runs, failed_runs
+    
+    def _calculate_job_cost_worker(self, job_name):
+        """Worker function for parallel processing of job cost calculation
         
-        This function creates its own boto3 client to avoid thread safety issues
+        Workers share the calculator's pooled Glue client, which is thread-safe
         """
         try:
-            # Create a separate client for this worker
-            glue_client = boto3.client('glue', region_name=region_name)
-            
-            # Create a temporary calculator instance for this worker
-            temp_calc = GlueCostCalculator.__new__(GlueCostCalculator)
-            temp_calc.glue_client = glue_client
-            temp_calc.pricing = pricing
-            temp_calc.start_date = start_date
-            temp_calc.end_date = end_date
-            
-            # Use the existing methods through the temporary instance
-            job_details = temp_calc.get_job_details(job_name)
-            job_runs = temp_calc.get_job_runs_for_august_2025(job_name)
-            
-            total_cost = Decimal('0')
-            successful_runs = 0
-            failed_runs = 0
-            
-            for job_run in job_runs:
-                if job_run.get('JobRunState') == 'SUCCEEDED':
-                    run_cost = temp_calc.calculate_job_run_cost(job_run, job_details)
-                    total_cost += run_cost
-                    successful_runs += 1
-                else:
-                    failed_runs += 1
-            
-            return {
-                'job_name': job_name,
-                'glue_version': job_details['glue_version'],
-                'total_runs': len(job_runs),
-                'successful_runs': successful_runs,
-                'failed_runs': failed_runs,
-                'total_cost_usd': float(total_cost),
-                'status': 'success'
-            }
+            with self.metrics.time_job(job_name):
+                job_details, job_runs = self.load_job_data(job_name)
+                return self._job_result(job_name, job_details, job_runs)
             
         except Exception as e:
             logger.error(f"Error calculating cost for {job_name} in worker: {str(e)}")
-            return {
-                'job_name': job_name,
-                'glue_version': 'Unknown',
-                'total_runs': 0,
-                'successful_runs': 0,
-                'failed_runs': 0,
-                'total_cost_usd': 0.0,
-                'status': 'error',
-                'error_message': str(e)
-            }
+            return error_result(job_name, e)
     
-    def calculate_job_total_cost(self, job_name):
-        """Calculate total cost for all runs of a job in August 2025"""
+    def _cube_job_worker(self, job_name):
+        """Worker function of build_cost_cube: the job's result row plus its cube rows"""
+        from gjobs_cube import job_cube_rows
+        
         try:
-            # Get job details
-            job_details = self.get_job_details(job_name)
-            
-            # Get all job runs for August 2025
-            job_runs = self.get_job_runs_for_august_2025(job_name)
-            
-            total_cost = Decimal('0')
-            successful_runs = 0
-            
-            for job_run in job_runs:
-                # Only calculate cost for completed runs
-                if job_run.get('JobRunState') == 'SUCCEEDED':
-                    run_cost = self.calculate_job_run_cost(job_run, job_details)
-                    total_cost += run_cost
-                    successful_runs += 1
-            
-            return {
-                'job_name': job_name,
-                'glue_version': job_details['glue_version'],
-                'total_runs': len(job_runs),
-                'successful_runs': successful_runs,
-                'total_cost_usd': float(total_cost)
-            }
+            with self.metrics.time_job(job_name):
+                job_details, job_runs = self.load_job_data(job_name)
+                job_runs = list(job_runs)
+                result = self._job_result(job_name, job_details, job_runs)
+                result['cube_rows'] = job_cube_rows(job_name, job_details, job_runs, self.pricing)
+                return result
             
         except Exception as e:
-            logger.error(f"Error calculating total cost for {job_name}: {str(e)}")
-            return {
-                'job_name': job_name,
-                'glue_version': 'Unknown',
-                'total_runs': 0,
-                'successful_runs': 0,
-                'total_cost_usd': 0.0
-            }
+            logger.error(f"Error building cube rows for {job_name} in worker: {str(e)}")
+            return error_result(job_name, e)
+    
+    def _job_result(self, job_name, job_details, job_runs):
+        """Result row for a job whose runs were fetched successfully
+        
+        Besides the report columns it carries the first and last run start times,
+        which shard partial results keep (see gjobs_shard.py).
+        """
+        run_span = RunSpan(job_runs)
+        total_cost, successful_runs, failed_runs = self.aggregate_job_runs(run_span, job_details)
+        return {
+            'job_name': job_name,
+            'glue_version': job_details['glue_version'],
+            'total_runs': successful_runs + failed_runs,
+            'successful_runs': successful_runs,
+            'failed_runs': failed_runs,
+            'total_cost_usd': total_cost,
+            'status': 'success',
+            'first_run_started_on': run_span.first_started_on,
+            'last_run_started_on': run_span.last_started_on
+        }
     
-    def calculate_costs_parallel(self, job_names):
-        """Calculate costs for multiple jobs using parallel processing"""
+    def calculate_job_total_cost(self, job_name):
+        """Calculate total cost for all runs of a job in the billing window
+        
+        Returns the same result row as the parallel workers: a job that fails
+        (including one that ran out of throttling retries) is an error_result.
+        """
+        result = self._calculate_job_cost_worker(job_name)
+        for column in RUN_SPAN_COLUMNS:
+            result.pop(column, None)
+        return result
+    
+    def calculate_costs_parallel(self, job_names, on_result=None, worker=None):
+        """Calculate costs for multiple jobs using parallel processing
+        
+        If on_result is given, each result is passed to it as soon as its job
+        finishes instead of being collected, and an empty list is returned.
+        worker replaces _calculate_job_cost_worker as the per-job function.
+        """
+        results = []
+        if on_result is None:
+            on_result = results.append
+        if worker is None:
+            worker = self._calculate_job_cost_worker
+        
         if not self.enable_parallel or len(job_names) == 1:
             # Fall back to sequential processing
-            results = []
             for job_name in job_names:
-                result = self.calculate_job_total_cost(job_name)
-                results.append(result)
+                on_result(worker(job_name))
             return results
         
         logger.info(f"Starting parallel processing of {len(job_names)} jobs with {self.max_workers} workers")
         
-        # Prepare arguments for worker function
-        worker_func = partial(
-            self._calculate_job_cost_worker,
-            region_name=self.glue_client.meta.region_name,
-            start_date=self.start_date,
-            end_date=self.end_date,
-            pricing=self.pricing
-        )
-        
-        results = []
         completed_jobs = 0
+        job_iter = iter(job_names)
         
         try:
             with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                # Submit all jobs to the executor
-                future_to_job = {
-                    executor.submit(worker_func, job_name): job_name 
-                    for job_name in job_names
-                }
+                # Keep a bounded window of submitted jobs so pending futures
+                # (and their results) do not grow with the number of jobs
+                future_to_job = {}
+                
+                def submit_next():
+                    for job_name in job_iter:
+                        future_to_job[executor.submit(worker, job_name)] = job_name
+                        return
+                
+                for _ in range(self.max_workers * 2):
+                    submit_next()
                 
                 # Process completed futures as they finish
-                for future in as_completed(future_to_job):
-                    job_name = future_to_job[future]
-                    completed_jobs += 1
-                    
-                    try:
-                        result = future.result()
-                        results.append(result)
+                while future_to_job:
+                    done, _ = wait(future_to_job, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job_name = future_to_job.pop(future)
+                        completed_jobs += 1
+                        submit_next()
                         
-                        # Log progress
-                        if result['status'] == 'success':
-                            logger.info(f"✓ Completed {completed_jobs}/{len(job_names)}: {job_name} - Cost: ${result['total_cost_usd']:.2f}")
-                        else:
-                            logger.warning(f"✗ Error in {completed_jobs}/{len(job_names)}: {job_name} - {result.get('error_message', 'Unknown error')}")
+                        try:
+                            result = future.result()
                             
-                    except Exception as e:
-                        logger.error(f"Future failed for {job_name}: {str(e)}")
-                        results.append({
-                            'job_name': job_name,
-                            'glue_version': 'Unknown',
-                            'total_runs': 0,
-                            'successful_runs': 0,
-                            'failed_runs': 0,
-                            'total_cost_usd': 0.0,
-                            'status': 'error',
-                            'error_message': str(e)
-                        })
+                            # Log progress
+                            if result['status'] == 'success':
+                                logger.info(f"✓ Completed {completed_jobs}/{len(job_names)}: {job_name} - Cost: ${result['total_cost_usd']:.2f}")
+                            else:
+                                logger.warning(f"✗ Error in {completed_jobs}/{len(job_names)}: {job_name} - {result.get('error_message', 'Unknown error')}")
+                                
+                        except Exception as e:
+                            logger.error(f"Future failed for {job_name}: {str(e)}")
+                            result = error_result(job_name, e)
+                        
+                        on_result(result)
                         
         except Exception as e:
             logger.error(f"Error in parallel processing: {str(e)}")
             raise
         
-        logger.info(f"Parallel processing completed. Processed {len(results)} jobs.")
+        logger.info(f"Parallel processing completed. Processed {completed_jobs} jobs.")
+        
+        pool_stats = self.client_pool.stats()
+        logger.info(f"Glue client setup: {pool_stats['client_setup_seconds']:.3f}s, "
+                    f"{pool_stats['http_requests']} HTTP requests "
+                    f"(max_pool_connections={pool_stats['max_pool_connections']})")
         return results
     
+    def calculate_costs_async(self, job_names, on_result=None):
+        """Calculate costs for multiple jobs on one asyncio event loop
+        
+        Returns results in the same schema as calculate_costs_parallel (and takes
+        the same on_result callback). Glue calls go through the same adaptive
+        concurrency controller and token bucket as the threaded path (at most
+        max_workers in flight), and throttled calls are retried with the same
+        jittered backoff.
+        """
+        logger.info(f"Starting asyncio processing of {len(job_names)} jobs with "
+                    f"{self.max_workers} concurrent requests")
+        results = []
+        asyncio.run(self._calculate_costs_async(job_names, on_result or results.append))
+        logger.info(f"Asyncio processing completed. Processed {len(job_names)} jobs.")
+        return results
+    
+    async def _calculate_costs_async(self, job_names, on_result):
+        config = Config(max_pool_connections=self.max_workers,
+                        retries={'mode': 'standard', 'total_max_attempts': 1})
+        session = get_aio_session()
+        async with session.create_client('glue', region_name=self.region_name,
+                                         endpoint_url=self.endpoint_url, config=config) as client:
+            # A fixed set of workers pulls job names, so memory does not grow with the job count
+            pending = iter(job_names)
+            
+            async def worker():
+                for job_name in pending:
+                    on_result(await self._async_job_cost(client, job_name))
+            
+            await asyncio.gather(*(worker() for _ in range(self.max_workers)))
+    
+    async def _async_call_glue(self, client, operation, **kwargs):
+        """asyncio counterpart of _call_glue, sharing its concurrency controller"""
+        method = getattr(client, operation)
+        for attempt in range(self.max_retries + 1):
+            await self.throttle.acquire_async()
+            started = time.perf_counter()
+            throttled = False
+            response = None
+            try:
+                response = await method(**kwargs)
+                return response
+            except Exception as e:
+                throttled = is_throttling_error(e)
+                if not throttled or attempt == self.max_retries:
+                    raise
+            finally:
+                latency = time.perf_counter() - started
+                self.throttle.release(latency, throttled, error=response is None and not throttled)
+                self.metrics.record_call(operation, latency, attempt, throttled,
+                                         error=response is None, response=response)
+            
+            await asyncio.sleep(full_jitter_delay(attempt))
+    
+    async def _async_job_cost(self, client, job_name):
+        with self.metrics.time_job(job_name):
+            return await self._async_job_cost_timed(client, job_name)
+    
+    async def _async_job_cost_timed(self, client, job_name):
+        try:
+            job_details = self._job_details_cache.get(job_name)
+            if job_details is None:
+                try:
+                    if job_name in self._jobs_not_found:
+                        raise ValueError(f"Job {job_name} not found")
+                    response = await self._async_call_glue(client, 'get_job', JobName=job_name)
+                    job_details = self._parse_job_details(response['Job'])
+                    self._job_details_cache[job_name] = job_details
+                except Exception as e:
+                    logger.error(f"Error getting job details for {job_name}: {str(e)}")
+                    if is_throttling_error(e):
+                        raise
+                    job_details = {'glue_version': '2.0', 'default_max_capacity': 10}
+            
+            job_runs = []
+            kwargs = {'JobName': job_name, 'MaxResults': 200}
+            while True:
+                response = await self._async_call_glue(client, 'get_job_runs', **kwargs)
+                page_runs, reached_window_start = filter_runs_page(
+                    response['JobRuns'], self.start_date, self.end_date
+                )
+                job_runs.extend(page_runs)
+                next_token = response.get('NextToken')
+                if not next_token or reached_window_start:
+                    break
+                kwargs['NextToken'] = next_token
+            
+            return self._job_result(job_name, job_details, job_runs)
+            
+        except Exception as e:
+            logger.error(f"Error calculating cost for {job_name} in async worker: {str(e)}")
+            return error_result(job_name, e)
+    
     def get_performance_stats(self, results):
         """Get performance statistics from the results"""
-        if not results:
-            return {}
+        result_stats = ResultStats()
+        for result in results:
+            result_stats.add(result)
+        return self._with_client_stats(result_stats.summary())
+    
+    def get_instrumentation_summary(self):
+        """Return per-operation Glue API metrics and per-job phase timings as a dict"""
+        return self.metrics.summary()
+    
+    def write_instrumentation(self, json_path=None, prometheus_path=None):
+        """Write the instrumentation summary as JSON and/or a Prometheus textfile"""
+        if json_path:
+            with open(json_path, 'w', encoding='utf-8') as summary_file:
+                json.dump(self.get_instrumentation_summary(), summary_file, indent=2)
+            logger.info(f"API metrics saved to {json_path}")
+        if prometheus_path:
+            self.metrics.write_prometheus_textfile(prometheus_path)
+            logger.info(f"Prometheus metrics saved to {prometheus_path}")
+    
+    def _with_client_stats(self, stats):
+        if stats:
+            stats['glue_client'] = self.client_pool.stats()
+            stats['throttling'] = self.throttle.stats()
+        return stats
+    
+    def _log_summary(self, stats):
+        logger.info(f"=== Processing Summary ===")
+        logger.info(f"Total jobs processed: {stats.get('total_jobs_processed', 0)}")
+        logger.info(f"Successful jobs: {stats.get('successful_jobs', 0)}")
+        logger.info(f"Failed jobs: {stats.get('failed_jobs', 0)}")
+        logger.info(f"Success rate: {stats.get('success_rate', 0):.1f}%")
+        logger.info(f"Total cost for all jobs in {self.window_label}: ${stats.get('total_cost_usd', 0):.2f}")
+        logger.info(f"Total job runs processed: {stats.get('total_job_runs', 0)}")
+        logger.info(f"Average cost per job: ${stats.get('average_cost_per_job', 0):.2f}")
+    
+    def calculate_costs_streaming(self, job_names, output_path, file_format='csv', resume=False,
+                                  batch_size=100):
+        """Calculate costs, streaming results to disk as jobs finish
+        
+        Results are written in row batches (CSV, or Parquet part files under
+        output_path) and finished jobs are checkpointed, so memory stays flat
+        and a rerun with resume=True skips jobs that already succeeded.
+        Returns the summary statistics of this run.
+        """
+        with StreamingResultWriter(output_path, file_format, batch_size, resume=resume) as writer:
+            if resume:
+                completed = writer.completed_jobs()
+                job_names = [name for name in job_names if name not in completed]
+                logger.info(f"Resuming: {len(completed)} jobs already done, {len(job_names)} remaining")
+            
+            if not self.offline:
+                self.prefetch_job_details(job_names)
             
-        successful = [r for r in results if r.get('status') == 'success']
-        failed = [r for r in results if r.get('status') == 'error']
+            result_stats = ResultStats()
+            
+            def on_result(result):
+                result_stats.add(result)
+                writer.write(result)
+            
+            if self.async_mode:
+                self.calculate_costs_async(job_names, on_result=on_result)
+            else:
+                self.calculate_costs_parallel(job_names, on_result=on_result)
         
-        total_cost = sum(r['total_cost_usd'] for r in successful)
-        total_runs = sum(r['total_runs'] for r in successful)
+        stats = self._with_client_stats(result_stats.summary())
+        self._log_summary(stats)
+        logger.info(f"Results streamed to {output_path}")
+        return stats
+    
+    def calculate_costs_shard(self, job_names, shard_index, shard_count, output_path):
+        """Calculate costs for one shard of the jobs and write its partial result file
         
-        return {
-            'total_jobs_processed': len(results),
-            'successful_jobs': len(successful),
-            'failed_jobs': len(failed),
-            'success_rate': len(successful) / len(results) * 100 if results else 0,
-            'total_cost_usd': total_cost,
-            'total_job_runs': total_runs,
-            'average_cost_per_job': total_cost / len(successful) if successful else 0
-        }
+        Jobs are assigned to shards by a hash of their name (see gjobs_shard.py),
+        so independent runs given the same job list and shard count split the work
+        without overlap. Combine the partial files with gjobs_shard.merge_partials.
+        Returns the summary statistics of this shard.
+        """
+        job_names = select_shard(job_names, shard_index, shard_count)
+        logger.info(f"Shard {shard_index}/{shard_count}: {len(job_names)} jobs")
+        
+        if not self.offline:
+            self.prefetch_job_details(job_names)
+        
+        results = []
+        result_stats = ResultStats()
+        
+        def on_result(result):
+            result_stats.add(result)
+            results.append(result)
+        
+        if self.async_mode:
+            self.calculate_costs_async(job_names, on_result=on_result)
+        else:
+            self.calculate_costs_parallel(job_names, on_result=on_result)
+        
+        write_partial(output_path, results, shard_index, shard_count,
+                      self.start_date, self.end_date, len(job_names))
+        
+        stats = self._with_client_stats(result_stats.summary())
+        self._log_summary(stats)
+        return stats
+    
+    def build_cost_cube(self, job_names, cube_path):
+        """Build or refresh the daily rollup cube for the billing window (see gjobs_cube.py)
+        
+        The cube rows of the given jobs inside the window are replaced; rows of
+        other days and jobs already in cube_path are kept. The window must cover
+        whole UTC days. Jobs that fail keep their previous rows. Returns the
+        updated CostCube.
+        """
+        from gjobs_cube import CostCube, window_days
+        
+        try:
+            # Fail before any API calls if the window would replace part of a day
+            window_days(self.start_date, self.end_date)
+            cube = CostCube.load(cube_path)
+            if not self.offline:
+                self.prefetch_job_details(job_names)
+            
+            job_rows = []
+            built_jobs = []
+            result_stats = ResultStats()
+            
+            def on_result(result):
+                result_stats.add(result)
+                if result['status'] == 'success':
+                    job_rows.append(result.pop('cube_rows'))
+                    built_jobs.append(result['job_name'])
+            
+            self.calculate_costs_parallel(job_names, on_result=on_result, worker=self._cube_job_worker)
+            
+            rows = [frame for frame in job_rows if not frame.empty]
+            cube.upsert(pd.concat(rows, ignore_index=True) if rows else CostCube().frame,
+                        built_jobs, self.start_date, self.end_date)
+            cube.save(cube_path)
+            
+            self._log_summary(self._with_client_stats(result_stats.summary()))
+            return cube
+            
+        except Exception as e:
+            logger.error(f"Error building cost cube: {str(e)}")
+            raise
     
     def calculate_costs_from_csv(self, csv_file_path, job_name_column='job_name', output_csv=None):
         """Main function to calculate costs for all jobs in CSV"""
         try:
             # Read job names from CSV
             job_names = self.read_job_names_from_csv(csv_file_path, job_name_column)
+            return self.calculate_costs_for_jobs(job_names, output_csv)
+            
+        except Exception as e:
+            logger.error(f"Error in main calculation: {str(e)}")
+            raise
+    
+    def calculate_costs_discovered(self, name_prefix=None, tags=None, output_csv=None):
+        """Calculate costs for all Glue jobs matching a name prefix and/or tags"""
+        job_names = self.discover_job_names(name_prefix=name_prefix, tags=tags)
+        return self.calculate_costs_for_jobs(job_names, output_csv)
+    
+    def calculate_costs_from_cur(self, cur_path, job_names=None, tags=None, output_csv=None,
+                                 cost_column='line_item_unblended_cost'):
+        """Calculate per-job costs for the billing window from CUR Parquet exports
+        
+        No Glue API calls are made; see gjobs_cur.CurCostBackend. Returns a
+        DataFrame in the same schema as calculate_costs_from_csv, but costs are
+        the billed usage of all runs (not only succeeded ones) and the run
+        counts are NaN.
+        """
+        from gjobs_cur import CurCostBackend  # pyarrow is only needed for this backend
+        
+        try:
+            backend = CurCostBackend(cur_path, cost_column=cost_column)
+            results_df = backend.job_costs(self.start_date, self.end_date, job_names=job_names, tags=tags)
+            
+            self._log_summary(self.get_performance_stats(results_df.to_dict('records')))
+            
+            if output_csv:
+                results_df.to_csv(output_csv, index=False)
+                logger.info(f"Results saved to {output_csv}")
+            
+            return results_df
+            
+        except Exception as e:
+            logger.error(f"Error calculating costs from CUR: {str(e)}")
+            raise
+    
+    def calculate_costs_for_jobs(self, job_names, output_csv=None):
+        """Calculate costs for the given job names and return a DataFrame sorted by cost"""
+        try:
+            # Load job metadata in bulk instead of one get_job call per job
+            if not self.offline:
+                self.prefetch_job_details(job_names)
             
-            # Calculate costs using parallel processing
-            if self.enable_parallel:
+            # Calculate costs using asyncio or parallel processing
+            if self.async_mode:
+                results = self.calculate_costs_async(job_names)
+            elif self.enable_parallel:
                 logger.info(f"Using parallel processing with {self.max_workers} workers")
                 results = self.calculate_costs_parallel(job_names)
             else:
@@ -374,24 +1343,15 @@ class GlueCostCalculator:
                     result = self.calculate_job_total_cost(job_name)
                     results.append(result)
             
-            # Create results DataFrame
-            results_df = pd.DataFrame(results)
+            # Create results DataFrame (run start times are only kept in shard partials)
+            results_df = pd.DataFrame(results).drop(columns=RUN_SPAN_COLUMNS, errors='ignore')
             
             # Sort by total cost descending
             results_df = results_df.sort_values('total_cost_usd', ascending=False)
             
-            # Get performance statistics
+            # Get and log performance statistics
             stats = self.get_performance_stats(results)
-            
-            # Log summary statistics
-            logger.info(f"=== Processing Summary ===")
-            logger.info(f"Total jobs processed: {stats.get('total_jobs_processed', 0)}")
-            logger.info(f"Successful jobs: {stats.get('successful_jobs', 0)}")
-            logger.info(f"Failed jobs: {stats.get('failed_jobs', 0)}")
-            logger.info(f"Success rate: {stats.get('success_rate', 0):.1f}%")
-            logger.info(f"Total cost for all jobs in August 2025: ${stats.get('total_cost_usd', 0):.2f}")
-            logger.info(f"Total job runs processed: {stats.get('total_job_runs', 0)}")
-            logger.info(f"Average cost per job: ${stats.get('average_cost_per_job', 0):.2f}")
+            self._log_summary(stats)
             
             # Save to CSV if requested
             if output_csv:
@@ -401,41 +1361,461 @@ class GlueCostCalculator:
             return results_df
             
         except Exception as e:
-            logger.error(f"Error in main calculation: {str(e)}")
+            logger.error(f"Error calculating job costs: {str(e)}")
             raise
 
-def main():
-    """Example usage"""
-    # Initialize calculator with parallel processing options
+
+class FanoutTarget(NamedTuple):
+    """An (account role, region) pair of a multi-account report
+
+    role_arn None means the default credentials of the calling process.
+    """
+    role_arn: Optional[str]
+    region: str
+
+    @classmethod
+    def parse(cls, value):
+        """Parse 'ROLE_ARN,REGION', or just 'REGION' for the default credentials"""
+        role_arn, _, region = value.rpartition(',')
+        if not region:
+            raise ValueError(f"Invalid target (expected ROLE_ARN,REGION or REGION): {value}")
+        return cls(role_arn.strip() or None, region.strip())
+
+    @property
+    def account_id(self):
+        """Account ID taken from the role ARN (arn:aws:iam::<account>:role/<name>)"""
+        return self.role_arn.split(':')[4] if self.role_arn else None
+
+
+def read_targets_from_csv(csv_file_path):
+    """Read fan-out targets from a CSV with role_arn and region columns"""
+    targets_df = pd.read_csv(csv_file_path, dtype=str)
+    if 'region' not in targets_df.columns:
+        raise ValueError(f"Column 'region' not found in {csv_file_path}")
+    role_arns = targets_df['role_arn'] if 'role_arn' in targets_df.columns else [None] * len(targets_df)
+    return [
+        FanoutTarget(role_arn if isinstance(role_arn, str) and role_arn.strip() else None, region.strip())
+        for role_arn, region in zip(role_arns, targets_df['region'])
+    ]
+
+
+# Assumed-role sessions of this process and their latest STS credentials, keyed by role ARN
+_assumed_sessions = {}
+_assumed_sessions_lock = threading.Lock()
+
+
+class _AssumedRoleProvider(CredentialProvider):
+    """Credential provider that serves refreshable assumed-role credentials"""
+    METHOD = 'sts-assume-role'
+    CANONICAL_NAME = 'custom-assume-role'
+
+    def __init__(self, metadata, refresh_using):
+        super().__init__()
+        self._metadata = metadata
+        self._refresh_using = refresh_using
+
+    def load(self):
+        return RefreshableCredentials.create_from_metadata(
+            metadata=self._metadata, refresh_using=self._refresh_using, method=self.METHOD
+        )
+
+
+def assume_role_session(role_arn, region_name=None, credentials=None,
+                        session_name='glue-cost-calculator', duration_seconds=3600):
+    """Return a boto3 Session with credentials of the assumed role
+
+    The session is cached per role in this process, so every region of an account
+    shares one set of credentials. botocore refreshes the credentials from STS
+    shortly before they expire, which keeps long reports working.
+
+    Args:
+        role_arn: ARN of the role to assume
+        region_name: Region of the STS endpoint used (credentials are valid in every region)
+        credentials: Credentials already obtained for the role (as returned by
+                     role_credentials), used instead of a first assume_role call
+    """
+    with _assumed_sessions_lock:
+        cached = _assumed_sessions.get(role_arn)
+        if cached is not None:
+            return cached[0]
+
+        sts_client = boto3.client('sts', region_name=region_name)
+        latest = {}
+
+        def fetch_credentials():
+            response = sts_client.assume_role(
+                RoleArn=role_arn, RoleSessionName=session_name, DurationSeconds=duration_seconds
+            )['Credentials']
+            logger.info(f"Assumed role {role_arn} until {response['Expiration']}")
+            latest.update({
+                'access_key': response['AccessKeyId'],
+                'secret_key': response['SecretAccessKey'],
+                'token': response['SessionToken'],
+                'expiry_time': response['Expiration'].isoformat(),
+            })
+            return dict(latest)
+
+        if credentials:
+            latest.update(credentials)
+        else:
+            fetch_credentials()
+
+        # The session resolves its credentials through our provider, ahead of the
+        # environment and config file providers of the default chain
+        botocore_session = botocore.session.get_session()
+        botocore_session.get_component('credential_provider').insert_before(
+            'env', _AssumedRoleProvider(dict(latest), fetch_credentials)
+        )
+        session = boto3.Session(botocore_session=botocore_session)
+        _assumed_sessions[role_arn] = (session, latest)
+        return session
+
+
+def role_credentials(role_arn, region_name=None):
+    """Return the (cached) assumed-role credentials as picklable metadata for worker processes
+
+    The expiry is the Expiration of the latest AssumeRole response for the role.
+    """
+    assume_role_session(role_arn, region_name)
+    with _assumed_sessions_lock:
+        return dict(_assumed_sessions[role_arn][1])
+
+
+def _fanout_target_costs(target, job_names, name_prefix, tags, calculator_options, credentials=None):
+    """Process pool worker: cost one target's jobs with a threaded calculator"""
+    if target.role_arn:
+        session = assume_role_session(target.role_arn, target.region, credentials)
+    else:
+        session = boto3.Session()
+    account_id = target.account_id
+    if account_id is None:
+        account_id = session.client('sts', region_name=target.region).get_caller_identity()['Account']
+
+    calculator = GlueCostCalculator(region_name=target.region, session=session, **calculator_options)
+    if job_names is None:
+        job_names = calculator.discover_job_names(name_prefix, tags)
+    if not job_names:
+        logger.warning(f"No Glue jobs found in account {account_id} region {target.region}")
+        return pd.DataFrame()
+
+    results_df = calculator.calculate_costs_for_jobs(job_names)
+    results_df.insert(0, 'region', target.region)
+    results_df.insert(0, 'account_id', account_id)
+    return results_df
+
+
+def calculate_costs_fanout(targets, job_names=None, name_prefix=None, tags=None, max_processes=None,
+                           output_csv=None, **calculator_options):
+    """Calculate costs across accounts and regions and merge them into one report
+
+    Each target runs in its own process (a GlueCostCalculator with its own
+    thread pool, client and throttle, since Glue rate limits are per account and
+    region). A target that fails is logged and left out of the report.
+
+    Args:
+        targets: FanoutTargets (or 'ROLE_ARN,REGION' strings)
+        job_names: Jobs to cost in every target; if None they are discovered per
+                   target with name_prefix and tags (all jobs when both are None)
+        max_processes: Maximum number of target processes; defaults to the number of CPUs
+        output_csv: Path to save the merged results
+        calculator_options: Further GlueCostCalculator arguments (window, max_workers, ...)
+
+    Returns a DataFrame with account_id and region columns, sorted by cost.
+    """
+    targets = [FanoutTarget.parse(target) if isinstance(target, str) else FanoutTarget(*target)
+               for target in targets]
+    if not targets:
+        raise ValueError("No fan-out targets given")
+    if calculator_options.get('run_store') is not None or calculator_options.get('async_mode'):
+        raise ValueError("Fan-out mode does not support a run_store or async_mode")
+
+    max_processes = min(len(targets), max_processes or multiprocessing.cpu_count())
+
+    # Assume each role once here; the target processes start from these credentials
+    credentials = {}
+    for target in targets:
+        if target.role_arn and target.role_arn not in credentials:
+            try:
+                credentials[target.role_arn] = role_credentials(target.role_arn, target.region)
+            except Exception as e:
+                logger.error(f"Error assuming role {target.role_arn}: {str(e)}")
+                credentials[target.role_arn] = None
+    pending = [target for target in targets if not target.role_arn or credentials[target.role_arn]]
+    failed_targets = [target for target in targets if target not in pending]
+
+    logger.info(f"Fanning out over {len(pending)} targets with {max_processes} processes")
+    frames = []
+    # spawn rather than fork: the parent may already hold boto3 clients and threads
+    with ProcessPoolExecutor(max_workers=max_processes,
+                             mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = {
+            executor.submit(_fanout_target_costs, target, job_names, name_prefix, tags, calculator_options,
+                            credentials.get(target.role_arn)): target
+            for target in pending
+        }
+        for future in as_completed(futures):
+            target = futures[future]
+            try:
+                target_df = future.result()
+            except Exception as e:
+                logger.error(f"Error processing target {target.role_arn or 'default credentials'} "
+                             f"in {target.region}: {str(e)}")
+                failed_targets.append(target)
+                continue
+            logger.info(f"Completed target {target.role_arn or 'default credentials'} in {target.region}: "
+                        f"{len(target_df)} jobs")
+            frames.append(target_df)
+
+    if failed_targets and len(failed_targets) == len(targets):
+        raise RuntimeError("All fan-out targets failed")
+
+    frames = [frame for frame in frames if not frame.empty]
+    results_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
+        columns=['account_id', 'region', 'job_name', 'total_cost_usd'])
+    results_df = results_df.sort_values('total_cost_usd', ascending=False)
+
+    logger.info("=== Fan-out Summary ===")
+    logger.info(f"Targets: {len(targets)} ({len(failed_targets)} failed)")
+    logger.info(f"Jobs: {len(results_df)}")
+    logger.info(f"Total Cost: ${results_df['total_cost_usd'].sum():.2f}")
+
+    if output_csv:
+        results_df.to_csv(output_csv, index=False)
+        logger.info(f"Results saved to {output_csv}")
+
+    return results_df
+
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Calculate AWS Glue job costs for a billing window")
+    parser.add_argument('--csv', help="CSV file containing Glue job names (default: glue_jobs.csv; "
+                                      "with --cur, optional list of jobs to report)")
+    parser.add_argument('--discover-prefix', help="Discover jobs by name prefix instead of reading --csv")
+    parser.add_argument('--discover-tag', action='append', metavar='KEY=VALUE',
+                        help="Discover jobs with this tag instead of reading --csv (repeatable)")
+    parser.add_argument('--job-name-column', default='job_name', help="Column name containing job names")
+    parser.add_argument('--cur', metavar='PATH',
+                        help="Compute costs from CUR Parquet files (local path or s3:// prefix) "
+                             "instead of the Glue API; --discover-tag filters on resource tags. CUR costs "
+                             "are the billed usage of all runs, including failed ones, and have no run counts")
+    parser.add_argument('--cur-cost-column', default='line_item_unblended_cost',
+                        help="CUR cost column to sum")
+    parser.add_argument('--output', help="Output CSV path (defaults to a name derived from the window)")
+    parser.add_argument('--stream', action='store_true',
+                        help="Write results to --output as jobs finish, with a checkpoint file")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue a streamed run, skipping jobs in its checkpoint (implies --stream)")
+    parser.add_argument('--output-format', choices=['csv', 'parquet'], default='csv',
+                        help="Streamed output format; parquet writes part files under --output")
+    parser.add_argument('--region', default='us-east-1', help="AWS region name")
+    parser.add_argument('--max-workers', type=int, default=16, help="Number of parallel workers")
+    parser.add_argument('--sequential', action='store_true', help="Disable parallel processing")
+    parser.add_argument('--async', dest='async_mode', action='store_true',
+                        help="Use the asyncio engine (requires aiobotocore)")
+    parser.add_argument('--cost-engine', choices=['decimal', 'vectorized'], default='decimal',
+                        help="Per-run Decimal costing or a vectorized pandas kernel")
+    parser.add_argument('--max-rps', type=float, help="Upper bound for Glue API requests per second")
+    parser.add_argument('--metrics-json', help="Write per-API-call and per-job metrics to this JSON file")
+    parser.add_argument('--prometheus-textfile', help="Write metrics in Prometheus textfile format")
+    parser.add_argument('--run-store', help="SQLite run-history store to sync into and report from")
+    parser.add_argument('--offline', action='store_true',
+                        help="Report from --run-store only, without calling the Glue API")
+    parser.add_argument('--target', action='append', metavar='ROLE_ARN,REGION',
+                        help="Report across accounts/regions: assume ROLE_ARN in REGION (or just REGION "
+                             "for the current credentials); repeatable. Without --csv jobs are discovered")
+    parser.add_argument('--targets-file', help="CSV of fan-out targets with role_arn and region columns")
+    parser.add_argument('--max-processes', type=int, help="Maximum number of fan-out target processes")
+    parser.add_argument('--shard', metavar='I/N',
+                        help="Only process shard I (0-based) of N of the jobs and write a partial "
+                             "result file (JSON) to --output")
+    parser.add_argument('--merge', nargs='+', metavar='PARTIAL',
+                        help="Merge shard partial result files into the report at --output")
+    parser.add_argument('--allow-missing-shards', action='store_true',
+                        help="With --merge, produce a report even if some shards are missing")
+    parser.add_argument('--build-cube', metavar='PARQUET',
+                        help="Build or refresh the daily cost rollup cube for the window")
+    parser.add_argument('--query-cube', metavar='PARQUET',
+                        help="Answer from the rollup cube (no Glue API calls); the window "
+                             "options limit the date range, which is otherwise the whole cube")
+    parser.add_argument('--group-by', default='job_name',
+                        help="Comma-separated cube dimensions for --query-cube: job_name, day, "
+                             "week, month, glue_version, run_state (empty for a grand total)")
+    
+    window = parser.add_mutually_exclusive_group()
+    window.add_argument('--month', help="Billing month as YYYY-MM (default: 2025-08)")
+    window.add_argument('--week', help="Any date (YYYY-MM-DD) in the billing week")
+    window.add_argument('--start', help="Start date (YYYY-MM-DD) of a custom window; requires --end")
+    parser.add_argument('--end', help="Inclusive end date (YYYY-MM-DD) of a custom window")
+    
+    args = parser.parse_args(argv)
+    if (args.start is None) != (args.end is None):
+        parser.error("--start and --end must be used together")
+    if args.offline and not args.run_store:
+        parser.error("--offline requires --run-store")
+    if args.async_mode and args.run_store:
+        parser.error("--async cannot be combined with --run-store")
+    if args.discover_tag and any('=' not in tag for tag in args.discover_tag):
+        parser.error("--discover-tag must be KEY=VALUE")
+    if args.shard:
+        try:
+            args.shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.cur or args.stream or args.resume or args.target or args.targets_file or args.build_cube:
+            parser.error("--shard cannot be combined with --cur, --stream, --resume, --target, "
+                         "--targets-file or --build-cube")
+    if args.cur and (args.stream or args.resume or args.run_store or args.build_cube):
+        parser.error("--cur cannot be combined with --stream, --resume, --run-store or --build-cube")
+    if args.build_cube and (args.stream or args.resume):
+        parser.error("--build-cube cannot be combined with --stream or --resume")
+    if (args.target or args.targets_file) and (args.cur or args.stream or args.resume or args.run_store
+                                               or args.async_mode):
+        parser.error("--target/--targets-file cannot be combined with --cur, --stream, --resume, "
+                     "--run-store or --async")
+    return args
+
+
+def main(argv=None):
+    """Command line entry point"""
+    args = parse_args(argv)
+    
+    if args.query_cube:
+        from gjobs_cube import CostCube
+        
+        try:
+            start_date = end_date = None
+            if args.month or args.week or args.start:
+                start_date, end_date, _ = resolve_billing_window(args.month, args.week, args.start, args.end)
+            group_by = [dimension.strip() for dimension in args.group_by.split(',') if dimension.strip()]
+            results_df = CostCube.load(args.query_cube).query(start_date, end_date, group_by=group_by)
+            if args.output:
+                results_df.to_csv(args.output, index=False)
+                logger.info(f"Results saved to {args.output}")
+            print(results_df.to_string(index=False))
+        except Exception as e:
+            logger.error(f"Cube query failed: {str(e)}")
+        return
+    
+    if args.merge:
+        try:
+            results_df, (start_date, end_date) = merge_partials(args.merge, args.allow_missing_shards)
+            output_csv = args.output or f"glue_costs_{start_date:%Y%m%d}_{end_date:%Y%m%d}.csv"
+            results_df.to_csv(output_csv, index=False)
+            logger.info(f"Results saved to {output_csv}")
+            
+            print(f"\n=== AWS Glue Job Costs for {start_date:%Y-%m-%d} to {end_date:%Y-%m-%d} ===")
+            print(results_df.to_string(index=False))
+            print(f"\nTotal Cost: ${results_df['total_cost_usd'].sum():.2f}")
+        except Exception as e:
+            logger.error(f"Merging shard results failed: {str(e)}")
+        return
+    
+    # Initialize calculator with parallel processing and billing window options
     calculator = GlueCostCalculator(
-        region_name='us-east-1',  # Change region as needed
-        max_workers=16,           # Optional: set number of parallel workers
-        enable_parallel=True      # Optional: enable/disable parallel processing
+        region_name=args.region,
+        max_workers=args.max_workers,
+        enable_parallel=not args.sequential,
+        month=args.month,
+        week=args.week,
+        start_date=args.start,
+        end_date=args.end,
+        run_store=args.run_store,
+        offline=args.offline,
+        max_requests_per_second=args.max_rps,
+        cost_engine=args.cost_engine,
+        async_mode=args.async_mode
     )
     
-    # Calculate costs from CSV
-    csv_file_path = 'glue_jobs.csv'  # Path to your CSV file
-    job_name_column = 'job_name'     # Column name containing job names
+    output_csv = args.output
+    if output_csv is None:
+        output_csv = f"glue_costs_{calculator.start_date:%Y%m%d}_{calculator.end_date:%Y%m%d}"
+        if args.shard:
+            output_csv += f".shard-{args.shard[0]}-of-{args.shard[1]}.json"
+        elif args.output_format == 'csv':
+            output_csv += '.csv'
+    
+    tags = dict(tag.split('=', 1) for tag in args.discover_tag or []) or None
+    csv_file_path = args.csv or 'glue_jobs.csv'
     
     try:
-        results_df = calculator.calculate_costs_from_csv(
-            csv_file_path=csv_file_path,
-            job_name_column=job_name_column,
-            output_csv='glue_costs_august_2025.csv'  # Optional: save results to CSV
-        )
+        if args.target or args.targets_file:
+            targets = [FanoutTarget.parse(target) for target in args.target or []]
+            if args.targets_file:
+                targets += read_targets_from_csv(args.targets_file)
+            job_names = None
+            if args.csv:
+                job_names = calculator.read_job_names_from_csv(args.csv, args.job_name_column)
+            results_df = calculate_costs_fanout(
+                targets,
+                job_names=job_names,
+                name_prefix=args.discover_prefix,
+                tags=tags,
+                max_processes=args.max_processes,
+                output_csv=output_csv,
+                max_workers=args.max_workers,
+                enable_parallel=not args.sequential,
+                month=args.month,
+                week=args.week,
+                start_date=args.start,
+                end_date=args.end,
+                max_requests_per_second=args.max_rps,
+                cost_engine=args.cost_engine
+            )
+        elif args.shard:
+            if args.discover_prefix or args.discover_tag:
+                job_names = calculator.discover_job_names(args.discover_prefix, tags)
+            else:
+                job_names = calculator.read_job_names_from_csv(csv_file_path, args.job_name_column)
+            calculator.calculate_costs_shard(job_names, *args.shard, output_csv)
+            calculator.write_instrumentation(args.metrics_json, args.prometheus_textfile)
+            return
+        elif args.build_cube:
+            if args.discover_prefix or args.discover_tag:
+                job_names = calculator.discover_job_names(args.discover_prefix, tags)
+            else:
+                job_names = calculator.read_job_names_from_csv(csv_file_path, args.job_name_column)
+            cube = calculator.build_cost_cube(job_names, args.build_cube)
+            results_df = cube.query(calculator.start_date, calculator.end_date, job_names=job_names)
+        elif args.cur:
+            job_names = None
+            if args.csv:
+                job_names = calculator.read_job_names_from_csv(args.csv, args.job_name_column)
+            results_df = calculator.calculate_costs_from_cur(
+                args.cur,
+                job_names=job_names,
+                tags=tags,
+                output_csv=output_csv,
+                cost_column=args.cur_cost_column
+            )
+        elif args.stream or args.resume:
+            if args.discover_prefix or args.discover_tag:
+                job_names = calculator.discover_job_names(args.discover_prefix, tags)
+            else:
+                job_names = calculator.read_job_names_from_csv(csv_file_path, args.job_name_column)
+            calculator.calculate_costs_streaming(job_names, output_csv, args.output_format, resume=args.resume)
+            results_df = read_results(output_csv, args.output_format)
+        elif args.discover_prefix or args.discover_tag:
+            results_df = calculator.calculate_costs_discovered(
+                name_prefix=args.discover_prefix,
+                tags=tags,
+                output_csv=output_csv
+            )
+        else:
+            results_df = calculator.calculate_costs_from_csv(
+                csv_file_path=csv_file_path,
+                job_name_column=args.job_name_column,
+                output_csv=output_csv
+            )
         
-        print("\n=== AWS Glue Job Costs for August 2025 ===")
+        print(f"\n=== AWS Glue Job Costs for {calculator.window_label} ===")
         print(results_df.to_string(index=False))
-        print(f"\nTotal Cost: ${results_df['costaugusttotal'].sum():.2f}")
-        
-        # Display sample of output format
-        print("\n=== Output CSV Format ===")
-        print("gluejob_name,costaugusttotal,number_of_job_runs,total_success_jobs_count,total_unsuccessful_jobs_count,month")
-        for _, row in results_df.head(3).iterrows():
-            print(f"{row['gluejob_name']},{row['costaugusttotal']},{row['number_of_job_runs']},{row['total_success_jobs_count']},{row['total_unsuccessful_jobs_count']},{row['month']}")
+        print(f"\nTotal Cost: ${results_df['total_cost_usd'].sum():.2f}")
         
     except Exception as e:
         logger.error(f"Script execution failed: {str(e)}")
+    
+    calculator.write_instrumentation(args.metrics_json, args.prometheus_textfile)
 
 if __name__ == "__main__":
     main()
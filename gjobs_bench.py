@@ -0,0 +1,390 @@
+"""
+Offline benchmarks for the Glue cost calculator
+
+Runs GlueCostCalculator against StubGlueServer, a local HTTP server that speaks
+the Glue JSON protocol for get_job, batch_get_jobs, get_jobs, list_jobs and
+get_job_runs and serves
+synthetic job histories (N jobs x M runs) with configurable page size, injected
+latency and throttle rate. No AWS credentials or API quota are used.
+
+Each mode (sequential, threads, async, and their vectorized-cost variants) runs
+in its own process so peak RSS is measured per mode. The report gives jobs/sec,
+API calls/sec, p50/p99 per-job latency, throttles and peak RSS, and is appended
+to a JSON Lines history file so runs can be compared over time.
+
+Usage:
+    python gjobs_bench.py --jobs 500 --runs 400 --latency-ms 50 --workers 64
+    python gjobs_bench.py --modes threads async --throttle-rate 0.05
+    python gjobs_bench.py --history
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Run as a script, the repository root comes first on sys.path and its pandas.py
+# (a locust file) would shadow the real pandas, so it is moved to the end
+if __name__ == '__main__':
+    sys.path.append(sys.path.pop(0))
+
+from gjobs import GlueCostCalculator, get_aio_session
+from gjobs_metrics import GlueApiMetrics
+
+logger = logging.getLogger(__name__)
+
+# Newest synthetic run starts here, two weeks after the default August 2025 window
+HISTORY_ANCHOR = datetime(2025, 9, 15, tzinfo=timezone.utc)
+
+DEFAULT_HISTORY_PATH = 'gjobs_bench_results.jsonl'
+
+# Benchmark modes: name -> GlueCostCalculator options
+MODES = {
+    'sequential': {'enable_parallel': False},
+    'threads': {},
+    'threads-vectorized': {'cost_engine': 'vectorized'},
+    'async': {'async_mode': True},
+    'async-vectorized': {'async_mode': True, 'cost_engine': 'vectorized'},
+}
+
+
+class StubGlueServer:
+    """In-process stand-in for the Glue get_job/batch_get_jobs/get_jobs/list_jobs/get_job_runs APIs
+
+    Every job has runs_per_job runs, newest first, one every run_interval_hours
+    back from HISTORY_ANCHOR. Runs are generated on the fly from their index so
+    histories of any size cost no memory. Jobs are tagged parity=even or
+    parity=odd by their index. A throttle_rate fraction of requests is
+    rejected with ThrottlingException. Accepted TCP connections are counted, so
+    connection reuse shows as requests per connection.
+    """
+
+    def __init__(self, jobs=100, runs_per_job=200, page_size=200, latency_ms=0.0,
+                 run_interval_hours=6.0, throttle_rate=0.0, seed=0):
+        self.jobs = jobs
+        self.runs_per_job = runs_per_job
+        self.page_size = page_size
+        self.latency_ms = latency_ms
+        self.run_interval_hours = run_interval_hours
+        self.throttle_rate = throttle_rate
+        self.request_counts = {}
+        self.throttled = 0
+        self.connections = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def job_names(self):
+        return [f"bench_job_{i:05d}" for i in range(self.jobs)]
+
+    @property
+    def endpoint_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # HTTP/1.1 keeps connections alive so clients can reuse them
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                operation = self.headers.get('X-Amz-Target', '').split('.')[-1]
+                status, payload = stub.handle(operation, json.loads(body or b'{}'))
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/x-amz-json-1.1')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+            request_queue_size = 1024
+
+            def process_request(self, request, client_address):
+                with stub._lock:
+                    stub.connections += 1
+                super().process_request(request, client_address)
+
+        self._server = Server(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def handle(self, operation, request):
+        """Return (HTTP status, JSON payload) for a Glue API request"""
+        with self._lock:
+            self.request_counts[operation] = self.request_counts.get(operation, 0) + 1
+            throttle = self.throttle_rate and self._random.random() < self.throttle_rate
+            if throttle:
+                self.throttled += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        if throttle:
+            return 400, {'__type': 'ThrottlingException', 'message': 'Rate exceeded'}
+
+        if operation == 'GetJob':
+            return 200, {'Job': self._job(request['JobName'])}
+        if operation == 'BatchGetJobs':
+            return 200, {'Jobs': [self._job(name) for name in request['JobNames']], 'JobsNotFound': []}
+        if operation == 'GetJobs':
+            names, next_token = self._page(self.job_names, request)
+            return 200, {'Jobs': [self._job(name) for name in names], **next_token}
+        if operation == 'ListJobs':
+            job_names = [name for i, name in enumerate(self.job_names)
+                         if request.get('Tags', {}).items() <= {'parity': 'odd' if i % 2 else 'even'}.items()]
+            names, next_token = self._page(job_names, request)
+            return 200, {'JobNames': names, **next_token}
+        if operation == 'GetJobRuns':
+            return 200, self._job_runs_page(request)
+        return 400, {'__type': 'InvalidInputException', 'message': f"Unsupported operation {operation}"}
+
+    def reset_counts(self):
+        with self._lock:
+            self.request_counts = {}
+            self.throttled = 0
+            self.connections = 0
+
+    def total_requests(self):
+        with self._lock:
+            return sum(self.request_counts.values())
+
+    def _page(self, items, request):
+        offset = int(request.get('NextToken') or 0)
+        end = offset + min(self.page_size, request.get('MaxResults', self.page_size))
+        return items[offset:end], ({'NextToken': str(end)} if end < len(items) else {})
+
+    def _job(self, job_name):
+        return {'Name': job_name, 'GlueVersion': '4.0', 'MaxCapacity': 10.0}
+
+    def _job_runs_page(self, request):
+        job_name = request['JobName']
+        offset = int(request.get('NextToken') or 0)
+        page_size = min(self.page_size, request.get('MaxResults', self.page_size))
+        end = min(offset + page_size, self.runs_per_job)
+        seed = zlib.crc32(job_name.encode('utf-8'))
+
+        runs = []
+        for index in range(offset, end):
+            started_on = HISTORY_ANCHOR - timedelta(hours=index * self.run_interval_hours)
+            duration = 60 + (seed + index * 7919) % 3600
+            runs.append({
+                'Id': f"jr_{seed:08x}_{index:06d}",
+                'JobName': job_name,
+                'JobRunState': 'FAILED' if index % 10 == 9 else 'SUCCEEDED',
+                'StartedOn': started_on.timestamp(),
+                'CompletedOn': (started_on + timedelta(seconds=duration)).timestamp(),
+                'ExecutionTime': duration,
+                'MaxCapacity': 2.0,
+                'Arguments': {'--job-bookmark-option': 'job-bookmark-enable'},
+            })
+
+        page = {'JobRuns': runs}
+        if end < self.runs_per_job:
+            page['NextToken'] = str(end)
+        return page
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class _JobLatencyMetrics(GlueApiMetrics):
+    """GlueApiMetrics that also keeps every job's latency, for exact percentiles"""
+
+    def __init__(self):
+        super().__init__()
+        self.job_latencies = []
+
+    @contextmanager
+    def time_job(self, job_name):
+        started = time.perf_counter()
+        try:
+            with super().time_job(job_name):
+                yield
+        finally:
+            with self._lock:
+                self.job_latencies.append(time.perf_counter() - started)
+
+
+def run_engine(mode, endpoint_url, job_names, workers):
+    """Run one benchmark mode against the stub and return its measurements"""
+    calculator = GlueCostCalculator(max_workers=workers, endpoint_url=endpoint_url, **MODES[mode])
+    calculator.metrics = metrics = _JobLatencyMetrics()
+
+    started = time.perf_counter()
+    results = calculator.calculate_costs_for_jobs(job_names)
+    seconds = time.perf_counter() - started
+
+    return {
+        'seconds': seconds,
+        'jobs_per_second': len(job_names) / seconds,
+        'p50_job_latency_seconds': _percentile(metrics.job_latencies, 0.50),
+        'p99_job_latency_seconds': _percentile(metrics.job_latencies, 0.99),
+        'errors': int((results['status'] == 'error').sum()),
+        'total_cost_usd': round(float(results['total_cost_usd'].sum()), 2),
+        # ru_maxrss is in kilobytes on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def _run_engine_process(queue, mode, endpoint_url, job_names, workers):
+    logging.getLogger('gjobs').setLevel(logging.WARNING)
+    try:
+        queue.put(run_engine(mode, endpoint_url, job_names, workers))
+    except Exception as e:
+        queue.put({'error': str(e)})
+
+
+def run_benchmark(jobs=200, runs_per_job=400, page_size=200, latency_ms=50.0, throttle_rate=0.0,
+                  workers=32, modes=('sequential', 'threads', 'async')):
+    """Run each mode in its own process against one stub and return the report"""
+    # botocore signs requests even for the stub, so any credentials will do
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'git_commit': _git_commit(),
+        'params': {
+            'jobs': jobs, 'runs_per_job': runs_per_job, 'page_size': page_size,
+            'latency_ms': latency_ms, 'throttle_rate': throttle_rate, 'workers': workers,
+        },
+        'modes': {},
+    }
+    context = multiprocessing.get_context('spawn')
+
+    with StubGlueServer(jobs, runs_per_job, page_size, latency_ms, throttle_rate=throttle_rate) as stub:
+        for mode in modes:
+            if mode.startswith('async') and get_aio_session is None:
+                logger.warning(f"Skipping {mode}: aiobotocore is not installed")
+                continue
+
+            stub.reset_counts()
+            queue = context.Queue()
+            process = context.Process(
+                target=_run_engine_process,
+                args=(queue, mode, stub.endpoint_url, stub.job_names, workers)
+            )
+            process.start()
+            stats = queue.get()
+            process.join()
+
+            if 'seconds' in stats:
+                stats['api_calls'] = stub.total_requests()
+                stats['api_calls_per_second'] = stats['api_calls'] / stats['seconds']
+                stats['throttled_calls'] = stub.throttled
+                stats['connections'] = stub.connections
+            report['modes'][mode] = stats
+
+    totals = {mode: stats['total_cost_usd'] for mode, stats in report['modes'].items() if 'total_cost_usd' in stats}
+    if len(set(totals.values())) > 1:
+        logger.warning(f"Modes disagree on total cost: {totals}")
+    return report
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_report(report, history_path=DEFAULT_HISTORY_PATH):
+    """Append a benchmark report to the JSON Lines history file"""
+    with open(history_path, 'a', encoding='utf-8') as history:
+        history.write(json.dumps(report) + '\n')
+
+
+def load_history(history_path=DEFAULT_HISTORY_PATH):
+    """Return all stored benchmark reports, oldest first"""
+    if not os.path.exists(history_path):
+        return []
+    with open(history_path, encoding='utf-8') as history:
+        return [json.loads(line) for line in history if line.strip()]
+
+
+def format_report(report):
+    params = report['params']
+    lines = [f"{report['timestamp']} {report.get('git_commit') or ''} "
+             f"jobs={params['jobs']} runs={params['runs_per_job']} page={params['page_size']} "
+             f"latency={params['latency_ms']}ms throttle={params['throttle_rate']} workers={params['workers']}"]
+    for mode, stats in report['modes'].items():
+        if 'error' in stats:
+            lines.append(f"  {mode:>18}: failed - {stats['error']}")
+            continue
+        lines.append(
+            f"  {mode:>18}: {stats['seconds']:7.2f}s {stats['jobs_per_second']:8.1f} jobs/s "
+            f"{stats['api_calls_per_second']:8.1f} calls/s p50 {stats['p50_job_latency_seconds'] * 1000:7.1f}ms "
+            f"p99 {stats['p99_job_latency_seconds'] * 1000:7.1f}ms rss {stats['peak_rss_mb']:6.1f}MB "
+            f"conns {stats.get('connections', '-')} throttled {stats['throttled_calls']} errors {stats['errors']}"
+        )
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark GlueCostCalculator modes against a local Glue stub")
+    parser.add_argument('--jobs', type=int, default=200)
+    parser.add_argument('--runs', type=int, default=400, help="Runs per job")
+    parser.add_argument('--page-size', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=50.0, help="Injected latency per request")
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help="Fraction of requests rejected with ThrottlingException")
+    parser.add_argument('--workers', type=int, default=32, help="Threads or concurrent async requests")
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=['sequential', 'threads', 'async'])
+    parser.add_argument('--history-file', default=DEFAULT_HISTORY_PATH)
+    parser.add_argument('--no-save', action='store_true', help="Do not append the report to the history file")
+    parser.add_argument('--history', action='store_true', help="Print stored reports and exit")
+    args = parser.parse_args()
+
+    if args.history:
+        for report in load_history(args.history_file):
+            print(format_report(report))
+        return
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger('gjobs').setLevel(logging.WARNING)
+    report = run_benchmark(args.jobs, args.runs, args.page_size, args.latency_ms, args.throttle_rate,
+                           args.workers, args.modes)
+    print(format_report(report))
+    if not args.no_save:
+        save_report(report, args.history_file)
+
+
+if __name__ == "__main__":
+    main()
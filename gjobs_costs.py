@@ -0,0 +1,56 @@
+"""
+Cost arithmetic shared by the Glue cost calculator's backends
+
+Kept apart from gjobs.py so the CUR backend and the cost cube can use it
+without importing gjobs (which may be running as __main__).
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+import pandas as pd
+
+CENT = Decimal('0.01')
+
+
+def round_cents(amount):
+    """Round a cost to the cent (half up) and return it as a float"""
+    return float(Decimal(amount).quantize(CENT, rounding=ROUND_HALF_UP))
+
+
+def compute_run_costs(runs, pricing):
+    """Vectorized cost of each job run in a DataFrame
+
+    Args:
+        runs: DataFrame with the started_on, completed_on, allocated_capacity and
+              max_capacity fields of JobRunRecord plus default_max_capacity and
+              glue_version columns (one row per run)
+        pricing: Mapping of Glue version to price per DPU-hour
+
+    Returns a float Series of USD costs. Like
+    GlueCostCalculator.calculate_job_run_cost, runs without start or completion
+    time cost 0 and DPUs fall back from allocated capacity to max capacity to
+    the job default, skipping missing and zero values.
+    """
+    prices = runs['glue_version'].map({version: float(price) for version, price in pricing.items()})
+    prices = prices.fillna(float(pricing['2.0']))
+
+    return (compute_run_dpu_hours(runs) * prices).fillna(0.0)
+
+
+def compute_run_dpu_hours(runs):
+    """Vectorized DPU-hours of each job run in a DataFrame (see compute_run_costs)
+
+    Runs without start or completion time have NaN DPU-hours.
+    """
+    started = pd.to_datetime(runs['started_on'], utc=True)
+    completed = pd.to_datetime(runs['completed_on'], utc=True)
+    hours = (completed - started).dt.total_seconds() / 3600
+
+    allocated = pd.to_numeric(runs['allocated_capacity'], errors='coerce')
+    max_capacity = pd.to_numeric(runs['max_capacity'], errors='coerce')
+    default_capacity = pd.to_numeric(runs['default_max_capacity'], errors='coerce')
+    dpus = (allocated.where(allocated != 0)
+            .fillna(max_capacity.where(max_capacity != 0))
+            .fillna(default_capacity))
+
+    return hours * dpus
@@ -0,0 +1,201 @@
+"""
+Daily cost rollup cube for the Glue cost calculator
+
+The cube holds Glue job costs pre-aggregated at (job_name, day, glue_version,
+run_state) granularity, so questions such as cost per day, per Glue version or
+per run state over any date range are answered from a small Parquet file in
+milliseconds instead of another scan of the Glue API.
+
+Measures per cell:
+    run_count        number of runs started that day
+    dpu_hours        DPU-hours of those runs
+    cost_usd         cost of the succeeded runs (what calculate_costs_from_csv reports)
+    failed_cost_usd  cost of all other runs (failed, stopped, timed out, ...)
+
+Usage:
+    calculator = GlueCostCalculator(month='2025-09')
+    cube = calculator.build_cost_cube(job_names, 'glue_cost_cube.parquet')
+
+    cube = CostCube.load('glue_cost_cube.parquet')
+    cube.query(start='2025-09-01', end='2025-09-07', group_by=['day', 'glue_version'])
+
+Costs are summed as floats and rounded to the cent (half to even) in query
+results, so a job's total can differ by a cent from the report, which rounds
+half up, when it sits exactly on a half cent.
+"""
+
+import logging
+import os
+
+import pandas as pd
+
+from gjobs_costs import compute_run_costs, compute_run_dpu_hours
+from gjobs_store import JobRunRecord
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ['job_name', 'day', 'glue_version', 'run_state']
+MEASURES = ['run_count', 'dpu_hours', 'cost_usd', 'failed_cost_usd']
+CUBE_COLUMNS = DIMENSIONS + MEASURES
+
+# Coarser time dimensions derived from day at query time
+DERIVED_DIMENSIONS = {
+    'week': lambda day: day.dt.to_period('W-SUN').dt.start_time,
+    'month': lambda day: day.dt.to_period('M').dt.start_time,
+}
+
+
+def _empty_cube():
+    return pd.DataFrame({
+        'job_name': pd.Series(dtype=object),
+        'day': pd.Series(dtype='datetime64[ns]'),
+        'glue_version': pd.Series(dtype=object),
+        'run_state': pd.Series(dtype=object),
+        'run_count': pd.Series(dtype='int64'),
+        'dpu_hours': pd.Series(dtype=float),
+        'cost_usd': pd.Series(dtype=float),
+        'failed_cost_usd': pd.Series(dtype=float),
+    })
+
+
+def _day_time(value):
+    """Convert a date string or datetime to a naive UTC timestamp"""
+    time_value = pd.Timestamp(value)
+    if time_value.tzinfo is not None:
+        time_value = time_value.tz_convert(None)
+    return time_value
+
+
+def _day(value):
+    """Convert a date string or datetime to a naive UTC day timestamp"""
+    return _day_time(value).normalize()
+
+
+def window_days(start, end):
+    """Return the first and last day of a window that covers whole UTC days
+
+    The window must start at midnight and end on the last microsecond of a day
+    (as month_window and the other billing windows do); an end given as a
+    'YYYY-MM-DD' string covers that whole day. Raises ValueError otherwise,
+    since the cube cannot hold part of a day.
+    """
+    start_time, end_time = _day_time(start), _day_time(end)
+    if isinstance(end, str) and end_time == end_time.normalize():
+        end_time += pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+    after_end = end_time + pd.Timedelta(microseconds=1)
+    if start_time != start_time.normalize() or after_end != after_end.normalize():
+        raise ValueError(f"Cost cube windows must cover whole UTC days, got {start} to {end}")
+    return start_time, end_time.normalize()
+
+
+def job_cube_rows(job_name, job_details, job_runs, pricing):
+    """Aggregate a job's runs into cube rows
+
+    Args:
+        job_name: Name of the job
+        job_details: Dict with glue_version and default_max_capacity
+        job_runs: JobRunRecords of the job (runs without StartedOn are skipped)
+        pricing: Mapping of Glue version to price per DPU-hour
+    """
+    runs = pd.DataFrame.from_records(list(job_runs), columns=JobRunRecord._fields)
+    runs = runs[runs['started_on'].notna()]
+    if runs.empty:
+        return _empty_cube()
+
+    runs = runs.assign(
+        glue_version=job_details['glue_version'],
+        default_max_capacity=job_details['default_max_capacity']
+    )
+    costs = compute_run_costs(runs, pricing)
+    succeeded = runs['state'] == 'SUCCEEDED'
+
+    rows = pd.DataFrame({
+        'job_name': job_name,
+        'day': pd.to_datetime(runs['started_on'], utc=True).dt.tz_convert(None).dt.normalize(),
+        'glue_version': job_details['glue_version'],
+        'run_state': runs['state'].fillna('UNKNOWN'),
+        'run_count': 1,
+        'dpu_hours': compute_run_dpu_hours(runs).fillna(0.0),
+        'cost_usd': costs.where(succeeded, 0.0),
+        'failed_cost_usd': costs.where(~succeeded, 0.0),
+    })
+    return rows.groupby(DIMENSIONS, as_index=False)[MEASURES].sum()
+
+
+class CostCube:
+    def __init__(self, frame=None):
+        """Wrap a DataFrame of cube rows (an empty cube if None)"""
+        self.frame = _empty_cube() if frame is None else frame.reindex(columns=CUBE_COLUMNS)
+
+    @classmethod
+    def load(cls, path):
+        """Load a cube from Parquet, or return an empty cube if the file does not exist"""
+        if not os.path.exists(path):
+            return cls()
+        return cls(pd.read_parquet(path))
+
+    def save(self, path):
+        """Write the cube to Parquet atomically (readers may query it at any time)"""
+        temp_path = f"{path}.tmp"
+        self.frame.sort_values(['day', 'job_name']).to_parquet(temp_path, index=False)
+        os.replace(temp_path, path)
+        logger.info(f"Cost cube ({len(self.frame)} rows) saved to {path}")
+
+    def upsert(self, rows, job_names, start, end):
+        """Replace the cube rows of the given jobs between start and end with rows
+
+        Rows of other jobs and days are kept, so a cube can be built up window
+        by window and refreshed for recent days only. The window must cover
+        whole UTC days (see window_days).
+        """
+        start_day, end_day = window_days(start, end)
+        frame = self.frame
+        replaced = (frame['job_name'].isin(list(job_names)) &
+                    (frame['day'] >= start_day) & (frame['day'] <= end_day))
+        parts = [part for part in (frame[~replaced], rows) if not part.empty]
+        self.frame = pd.concat(parts, ignore_index=True) if parts else _empty_cube()
+
+    def query(self, start=None, end=None, group_by=('job_name',), job_names=None,
+              glue_versions=None, run_states=None):
+        """Sum the measures over a date range, grouped by any dimensions
+
+        Args:
+            start, end: Inclusive day range ('YYYY-MM-DD' or datetime); open if None
+            group_by: Dimensions to group by: job_name, day, glue_version,
+                      run_state, or the derived week and month. Empty for a grand total.
+            job_names, glue_versions, run_states: Only include these values
+
+        Returns a DataFrame of the group_by columns and the measures (costs rounded
+        to the cent), sorted by cost descending.
+        """
+        group_by = list(group_by)
+        unknown = set(group_by) - set(DIMENSIONS) - set(DERIVED_DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown cube dimensions: {sorted(unknown)}")
+
+        frame = self.frame
+        mask = pd.Series(True, index=frame.index)
+        if start is not None:
+            mask &= frame['day'] >= _day(start)
+        if end is not None:
+            mask &= frame['day'] <= _day(end)
+        for column, values in (('job_name', job_names), ('glue_version', glue_versions),
+                               ('run_state', run_states)):
+            if values is not None:
+                mask &= frame[column].isin(list(values))
+        frame = frame[mask]
+
+        derived = {name: DERIVED_DIMENSIONS[name](frame['day']) for name in group_by if name in DERIVED_DIMENSIONS}
+        if derived:
+            frame = frame.assign(**derived)
+
+        if group_by:
+            result = frame.groupby(group_by, as_index=False)[MEASURES].sum()
+        else:
+            result = frame[MEASURES].sum().to_frame().T
+            result['run_count'] = result['run_count'].astype('int64')
+
+        result['cost_usd'] = result['cost_usd'].round(2)
+        result['failed_cost_usd'] = result['failed_cost_usd'].round(2)
+        result['dpu_hours'] = result['dpu_hours'].round(4)
+        return result.sort_values('cost_usd', ascending=False).reset_index(drop=True)
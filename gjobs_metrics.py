@@ -0,0 +1,231 @@
+"""
+Instrumentation for the Glue cost pipeline
+
+GlueApiMetrics counts every Glue API call made by GlueCostCalculator per
+operation (calls, pages, retries, throttles, errors, response bytes and a
+latency histogram) and times each job's phases: metadata fetch, run paging and
+cost aggregation. Job details loaded up front in batch_get_jobs calls are shared
+by many jobs, so that prefetch is timed as a phase of its own. The results are
+available as a JSON-friendly summary and as a Prometheus textfile for the
+node_exporter textfile collector.
+"""
+
+import contextvars
+import heapq
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Operations whose successful responses are pages of a listing
+PAGINATED_OPERATIONS = {'get_job_runs', 'get_jobs', 'list_jobs'}
+
+# API seconds per operation for the job being processed in this thread or task
+_job_api_seconds = contextvars.ContextVar('job_api_seconds', default=None)
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative(self):
+        """Return [(upper bound label, cumulative count)] in Prometheus order"""
+        running = 0
+        buckets = []
+        for bound, count in zip(list(LATENCY_BUCKETS) + ['+Inf'], self.counts):
+            running += count
+            buckets.append((str(bound), running))
+        return buckets
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum_seconds': self.total,
+            'mean_seconds': self.total / self.count if self.count else None,
+            'buckets': dict(self.cumulative()),
+        }
+
+
+class _OperationStats:
+    def __init__(self):
+        self.calls = 0
+        self.pages = 0
+        self.retries = 0
+        self.throttles = 0
+        self.errors = 0
+        self.bytes = 0
+        self.latency = _Histogram()
+
+
+class GlueApiMetrics:
+    def __init__(self, top_jobs=10):
+        """Create empty metrics
+
+        Args:
+            top_jobs: Number of slowest jobs listed in the summary
+        """
+        self.top_jobs = top_jobs
+        self._operations = {}
+        self._phases = {'metadata': _Histogram(), 'paging': _Histogram(),
+                        'aggregation': _Histogram(), 'total': _Histogram()}
+        # Min-heap of the top_jobs slowest jobs, so memory does not grow with the job count
+        self._job_timings = []
+        self._prefetch = {'batches': 0, 'jobs': 0, 'seconds': 0.0}
+        self._lock = threading.Lock()
+
+    def record_call(self, operation, latency, attempt=0, throttled=False, error=False, response=None):
+        """Record one attempt of a Glue API call"""
+        response_bytes = 0
+        if response is not None:
+            headers = response.get('ResponseMetadata', {}).get('HTTPHeaders', {})
+            response_bytes = int(headers.get('content-length', 0) or 0)
+
+        with self._lock:
+            stats = self._operations.setdefault(operation, _OperationStats())
+            stats.calls += 1
+            stats.retries += attempt > 0
+            stats.throttles += throttled
+            stats.errors += error and not throttled
+            stats.bytes += response_bytes
+            if response is not None and operation in PAGINATED_OPERATIONS:
+                stats.pages += 1
+            stats.latency.observe(latency)
+
+        job_seconds = _job_api_seconds.get()
+        if job_seconds is not None:
+            job_seconds[operation] = job_seconds.get(operation, 0.0) + latency
+
+    def record_prefetch(self, seconds, batches, jobs):
+        """Record a bulk job details prefetch (batch_get_jobs calls outside any job)"""
+        with self._lock:
+            self._prefetch['batches'] += batches
+            self._prefetch['jobs'] += jobs
+            self._prefetch['seconds'] += seconds
+
+    @contextmanager
+    def time_job(self, job_name):
+        """Time one job; API time inside the block is attributed to its phases
+
+        Metadata is time in get_job calls, paging is time in get_job_runs calls
+        and aggregation is the remaining (local) time of the job. Details that
+        were prefetched are not fetched inside the job; see record_prefetch.
+        """
+        job_seconds = {}
+        token = _job_api_seconds.set(job_seconds)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            total = time.perf_counter() - started
+            _job_api_seconds.reset(token)
+            metadata = job_seconds.get('get_job', 0.0)
+            paging = job_seconds.get('get_job_runs', 0.0)
+            aggregation = max(total - sum(job_seconds.values()), 0.0)
+            with self._lock:
+                self._phases['metadata'].observe(metadata)
+                self._phases['paging'].observe(paging)
+                self._phases['aggregation'].observe(aggregation)
+                self._phases['total'].observe(total)
+                timing = (total, job_name, metadata, paging, aggregation)
+                if len(self._job_timings) < self.top_jobs:
+                    heapq.heappush(self._job_timings, timing)
+                elif self._job_timings and timing > self._job_timings[0]:
+                    heapq.heapreplace(self._job_timings, timing)
+
+    def summary(self):
+        """Return all metrics as a JSON-serializable dict"""
+        with self._lock:
+            operations = {
+                operation: {
+                    'calls': stats.calls,
+                    'pages': stats.pages,
+                    'retries': stats.retries,
+                    'throttles': stats.throttles,
+                    'errors': stats.errors,
+                    'bytes': stats.bytes,
+                    'latency': stats.latency.to_dict(),
+                }
+                for operation, stats in self._operations.items()
+            }
+            phases = {phase: histogram.to_dict() for phase, histogram in self._phases.items()}
+            slowest = sorted(self._job_timings, reverse=True)
+            prefetch = dict(self._prefetch)
+
+        return {
+            'operations': operations,
+            'job_phases': phases,
+            'metadata_prefetch': prefetch,
+            'slowest_jobs': [
+                {'job_name': job_name, 'total_seconds': total, 'metadata_seconds': metadata,
+                 'paging_seconds': paging, 'aggregation_seconds': aggregation}
+                for total, job_name, metadata, paging, aggregation in slowest
+            ],
+        }
+
+    def prometheus_text(self):
+        """Return the metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            counters = [
+                ('glue_cost_api_calls_total', 'Glue API call attempts', 'calls'),
+                ('glue_cost_api_pages_total', 'Pages returned by paginated Glue API calls', 'pages'),
+                ('glue_cost_api_retries_total', 'Retried Glue API call attempts', 'retries'),
+                ('glue_cost_api_throttles_total', 'Throttled Glue API call attempts', 'throttles'),
+                ('glue_cost_api_errors_total', 'Failed (non-throttled) Glue API call attempts', 'errors'),
+                ('glue_cost_api_response_bytes_total', 'Glue API response bytes', 'bytes'),
+            ]
+            for name, help_text, attribute in counters:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for operation, stats in sorted(self._operations.items()):
+                    lines.append(f'{name}{{operation="{operation}"}} {getattr(stats, attribute)}')
+
+            self._append_histograms(
+                lines, 'glue_cost_api_latency_seconds', 'Glue API call latency',
+                'operation', {operation: stats.latency for operation, stats in sorted(self._operations.items())}
+            )
+            self._append_histograms(
+                lines, 'glue_cost_job_phase_seconds', 'Per-job time by phase', 'phase', self._phases
+            )
+            prefetch_counters = [
+                ('glue_cost_prefetch_seconds_total', 'Time spent prefetching job details', 'seconds'),
+                ('glue_cost_prefetch_batches_total', 'batch_get_jobs calls made by prefetches', 'batches'),
+                ('glue_cost_prefetch_jobs_total', 'Job details loaded by prefetches', 'jobs'),
+            ]
+            for name, help_text, key in prefetch_counters:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                lines.append(f"{name} {self._prefetch[key]}")
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _append_histograms(lines, name, help_text, label, histograms):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for value, histogram in histograms.items():
+            for bound, count in histogram.cumulative():
+                lines.append(f'{name}_bucket{{{label}="{value}",le="{bound}"}} {count}')
+            lines.append(f'{name}_sum{{{label}="{value}"}} {histogram.total}')
+            lines.append(f'{name}_count{{{label}="{value}"}} {histogram.count}')
+
+    def write_prometheus_textfile(self, path):
+        """Write the Prometheus textfile atomically (the collector may read at any time)"""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as textfile:
+            textfile.write(self.prometheus_text())
+        os.replace(temp_path, path)
@@ -0,0 +1,137 @@
+"""
+Streaming, checkpointed result output for the Glue cost calculator
+
+StreamingResultWriter writes per-job results to disk in row batches as they
+complete, so memory stays flat however many jobs are processed, and records
+finished jobs in a checkpoint file so an interrupted run can be resumed.
+
+    <output>.csv             result rows (CSV), appended batch by batch
+    <output>/part-*.parquet  result rows (Parquet), one part file per batch
+    <output>.checkpoint      one finished job name per line
+"""
+
+import csv
+import glob
+import os
+import time
+
+import pandas as pd
+
+# Column order of the per-job result rows
+RESULT_COLUMNS = [
+    'job_name',
+    'glue_version',
+    'total_runs',
+    'successful_runs',
+    'failed_runs',
+    'total_cost_usd',
+    'status',
+    'error_message',
+]
+
+
+class StreamingResultWriter:
+    def __init__(self, output_path, file_format='csv', batch_size=100, resume=False):
+        """Open the result output
+
+        Args:
+            output_path: CSV file path, or directory of part files for Parquet
+            file_format: 'csv' or 'parquet'
+            batch_size: Number of rows buffered before each write
+            resume: Keep existing output and checkpoint; otherwise start afresh
+        """
+        if file_format not in ('csv', 'parquet'):
+            raise ValueError(f"Unsupported file format: {file_format}")
+
+        self.output_path = output_path
+        self.file_format = file_format
+        self.batch_size = batch_size
+        self.checkpoint_path = f"{output_path.rstrip(os.sep)}.checkpoint"
+        self._buffer = []
+        self._part_prefix = f"part-{time.strftime('%Y%m%d%H%M%S')}-{os.getpid()}"
+        self._part_number = 0
+
+        if not resume:
+            self._reset()
+        if file_format == 'parquet':
+            os.makedirs(output_path, exist_ok=True)
+
+    def _reset(self):
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        if self.file_format == 'csv':
+            if os.path.exists(self.output_path):
+                os.remove(self.output_path)
+        else:
+            for part in glob.glob(os.path.join(self.output_path, 'part-*.parquet')):
+                os.remove(part)
+
+    def completed_jobs(self):
+        """Return the set of job names recorded as finished in the checkpoint"""
+        if not os.path.exists(self.checkpoint_path):
+            return set()
+        with open(self.checkpoint_path, encoding='utf-8') as checkpoint:
+            return {line.rstrip('\n') for line in checkpoint if line.strip()}
+
+    def write(self, result):
+        """Buffer one result row, writing a batch when the buffer is full"""
+        self._buffer.append(result)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write buffered rows, then checkpoint the jobs that succeeded"""
+        if not self._buffer:
+            return
+
+        if self.file_format == 'csv':
+            write_header = not os.path.exists(self.output_path) or os.path.getsize(self.output_path) == 0
+            with open(self.output_path, 'a', newline='', encoding='utf-8') as output:
+                writer = csv.DictWriter(output, fieldnames=RESULT_COLUMNS, extrasaction='ignore')
+                if write_header:
+                    writer.writeheader()
+                writer.writerows(self._buffer)
+                output.flush()
+                os.fsync(output.fileno())
+        else:
+            part_path = os.path.join(self.output_path, f"{self._part_prefix}-{self._part_number:05d}.parquet")
+            frame = pd.DataFrame(self._buffer).reindex(columns=RESULT_COLUMNS)
+            frame.to_parquet(part_path, index=False)
+            self._part_number += 1
+
+        # Failed jobs are not checkpointed so a resumed run retries them
+        with open(self.checkpoint_path, 'a', encoding='utf-8') as checkpoint:
+            for result in self._buffer:
+                if result.get('status') == 'success':
+                    checkpoint.write(f"{result['job_name']}\n")
+            checkpoint.flush()
+            os.fsync(checkpoint.fileno())
+
+        self._buffer = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_results(output_path, file_format='csv'):
+    """Load streamed results, keeping the latest row per job, sorted by cost descending
+
+    A job can appear more than once when a run crashed between writing its row and
+    checkpointing it, or when a resumed run retried a failed job.
+    """
+    if file_format == 'csv':
+        frame = pd.read_csv(output_path)
+    else:
+        parts = sorted(glob.glob(os.path.join(output_path, 'part-*.parquet')))
+        if not parts:
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+        frame = pd.concat([pd.read_parquet(part) for part in parts], ignore_index=True)
+
+    frame = frame.drop_duplicates('job_name', keep='last')
+    return frame.sort_values('total_cost_usd', ascending=False)
@@ -0,0 +1,336 @@
+"""
+Long-running Glue cost service
+
+Refreshes Glue job costs on a schedule and serves the cached results over a
+small local HTTP JSON API, so dashboards get fresh numbers without re-running
+gjobs.py. Each refresh syncs job runs incrementally into a run-history store
+(see gjobs_store.py) and then computes every configured billing window from the
+store. HTTP reads only ever see the last completed refresh and never call AWS.
+
+Endpoints (GET, JSON):
+    /health                      refresh status and staleness
+    /windows                     configured windows with their totals
+    /windows/<window>            per-job costs of a window, sorted by cost
+    /windows/<window>/top?n=10   the n most expensive jobs of a window
+    /jobs/<job_name>             a job's costs in every window (?window=<window> for one)
+
+Every response carries refreshed_at and staleness_seconds. Windows are
+current-month, previous-month, current-week, previous-week or a YYYY-MM month.
+
+Usage:
+    python gjobs_service.py --csv glue_jobs.csv --run-store glue_runs.db --refresh-interval 900 --port 8080
+"""
+
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+# Keep the repository root's pandas.py (a locust file) from shadowing pandas
+if __name__ == '__main__':
+    sys.path.append(sys.path.pop(0))
+
+from gjobs import GlueCostCalculator, error_result, resolve_billing_window
+from gjobs_store import JobRunStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOWS = ('current-month', 'previous-month', 'current-week')
+
+
+def resolve_service_window(name, now=None):
+    """Resolve a service window name into (start, end, label) as of now"""
+    now = now or datetime.now(timezone.utc)
+    if name == 'current-month':
+        return resolve_billing_window(month=f"{now:%Y-%m}")
+    if name == 'previous-month':
+        return resolve_billing_window(month=f"{now.replace(day=1) - timedelta(days=1):%Y-%m}")
+    if name == 'current-week':
+        return resolve_billing_window(week=f"{now:%Y-%m-%d}")
+    if name == 'previous-week':
+        return resolve_billing_window(week=f"{now - timedelta(days=7):%Y-%m-%d}")
+    try:
+        datetime.strptime(name, '%Y-%m')
+    except ValueError:
+        raise ValueError(f"Unknown window: {name}")
+    return resolve_billing_window(month=name)
+
+
+class GlueCostService:
+    def __init__(self, job_source, run_store='glue_runs.db', windows=DEFAULT_WINDOWS,
+                 refresh_interval=900, calculator_options=None):
+        """Create the service
+
+        Args:
+            job_source: Callable (given a GlueCostCalculator) returning the job names
+                        to report, called on every refresh
+            run_store: JobRunStore (or path of its SQLite database) synced incrementally
+            windows: Window names (see resolve_service_window)
+            refresh_interval: Seconds between the start of one refresh and the next
+            calculator_options: Further GlueCostCalculator arguments (region_name,
+                        max_workers, max_requests_per_second, ...)
+        """
+        if not windows:
+            raise ValueError("At least one window is required")
+        for window in windows:
+            resolve_service_window(window)
+        self.job_source = job_source
+        self.run_store = JobRunStore(run_store) if isinstance(run_store, str) else run_store
+        self.windows = list(windows)
+        self.refresh_interval = refresh_interval
+        self.calculator_options = calculator_options or {}
+
+        self._snapshot = None
+        self._last_error = None
+        self._refreshing = False
+        self._stop = threading.Event()
+        self._refresh_lock = threading.Lock()
+        self._thread = None
+        self._server = None
+
+    def refresh(self):
+        """Sync the run store and recompute every window; the snapshot is swapped in at the end"""
+        with self._refresh_lock:
+            self._refreshing = True
+            started = time.perf_counter()
+            try:
+                now = datetime.now(timezone.utc)
+                windows = {}
+                calculator = None
+                for i, name in enumerate(self.windows):
+                    start, end, label = resolve_service_window(name, now)
+                    if calculator is None:
+                        # One calculator (and Glue client pool) serves every window of the refresh
+                        calculator = GlueCostCalculator(
+                            start_date=start, end_date=end, run_store=self.run_store, **self.calculator_options
+                        )
+                        job_names = self.job_source(calculator)
+                        jobs = self._job_rows(calculator.calculate_costs_for_jobs(job_names))
+                        errors = {job['job_name']: job['error_message'] for job in jobs if job.get('status') == 'error'}
+                    else:
+                        # Only the first window syncs the store; the rest are read offline, and
+                        # a job that failed there (e.g. its sync) fails in every window
+                        calculator.start_date, calculator.end_date, calculator.window_label = start, end, label
+                        calculator.offline = True
+                        synced = [job_name for job_name in job_names if job_name not in errors]
+                        jobs = self._job_rows(calculator.calculate_costs_for_jobs(synced)) if synced else []
+                        jobs += [error_result(job_name, error) for job_name, error in errors.items()]
+                    windows[name] = {
+                        'window': name,
+                        'label': label,
+                        'start': start.isoformat(),
+                        'end': end.isoformat(),
+                        'job_count': len(jobs),
+                        'failed_jobs': sum(job.get('status') == 'error' for job in jobs),
+                        'total_cost_usd': round(sum(job.get('total_cost_usd') or 0 for job in jobs), 2),
+                        'jobs': jobs,
+                    }
+
+                refresh_seconds = time.perf_counter() - started
+                self._snapshot = {
+                    'refreshed_at': now,
+                    'refresh_seconds': refresh_seconds,
+                    'windows': windows,
+                    'jobs': self._index_jobs(windows),
+                }
+                self._last_error = None
+                logger.info(f"Refreshed {len(windows)} windows for {len(job_names)} jobs in {refresh_seconds:.1f}s")
+
+            except Exception as e:
+                logger.error(f"Refresh failed: {str(e)}")
+                self._last_error = {'error': str(e), 'at': datetime.now(timezone.utc).isoformat()}
+            finally:
+                self._refreshing = False
+
+    @staticmethod
+    def _job_rows(results_df):
+        """JSON-ready result rows of a window, most expensive first"""
+        return json.loads(results_df.to_json(orient='records'))
+
+    @staticmethod
+    def _index_jobs(windows):
+        """Map job name to its result row in each window"""
+        jobs = {}
+        for name, window in windows.items():
+            for job in window['jobs']:
+                jobs.setdefault(job['job_name'], {})[name] = job
+        return jobs
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.refresh()
+            self._stop.wait(max(self.refresh_interval - (time.monotonic() - started), 0))
+
+    def _freshness(self, snapshot):
+        refreshed_at = snapshot['refreshed_at']
+        return {
+            'refreshed_at': refreshed_at.isoformat(),
+            'staleness_seconds': round((datetime.now(timezone.utc) - refreshed_at).total_seconds(), 3),
+        }
+
+    def handle(self, path, query):
+        """Return (HTTP status, JSON payload) for a GET request, from the cached snapshot only"""
+        snapshot = self._snapshot
+        parts = [unquote(part) for part in path.strip('/').split('/') if part]
+
+        if parts == ['health']:
+            if self._last_error:
+                status = 'degraded'
+            else:
+                status = 'starting' if snapshot is None else 'ok'
+            health = {
+                'status': status,
+                'refreshing': self._refreshing,
+                'refresh_interval_seconds': self.refresh_interval,
+                'last_error': self._last_error,
+            }
+            if snapshot:
+                health.update(self._freshness(snapshot), refresh_seconds=snapshot['refresh_seconds'])
+            return 200, health
+
+        if snapshot is None:
+            return 503, {'error': 'No cost data yet; the first refresh has not completed',
+                         'last_error': self._last_error}
+        freshness = self._freshness(snapshot)
+        windows = snapshot['windows']
+
+        if parts == ['windows']:
+            summaries = [{key: value for key, value in window.items() if key != 'jobs'}
+                         for window in windows.values()]
+            return 200, {**freshness, 'windows': summaries}
+
+        if len(parts) in (2, 3) and parts[0] == 'windows':
+            window = windows.get(parts[1])
+            if window is None:
+                return 404, {**freshness, 'error': f"Unknown window: {parts[1]}"}
+            if len(parts) == 2:
+                return 200, {**freshness, **window}
+            if parts[2] == 'top':
+                try:
+                    n = int(query.get('n', ['10'])[0])
+                except ValueError:
+                    return 400, {**freshness, 'error': "n must be an integer"}
+                summary = {key: value for key, value in window.items() if key != 'jobs'}
+                return 200, {**freshness, **summary, 'jobs': window['jobs'][:max(n, 0)]}
+
+        if len(parts) == 2 and parts[0] == 'jobs':
+            job = snapshot['jobs'].get(parts[1])
+            if job is None:
+                return 404, {**freshness, 'error': f"Unknown job: {parts[1]}"}
+            if 'window' in query:
+                name = query['window'][0]
+                if name not in job:
+                    return 404, {**freshness, 'error': f"No result for {parts[1]} in window {name}"}
+                return 200, {**freshness, 'window': name, **job[name]}
+            return 200, {**freshness, 'job_name': parts[1], 'windows': job}
+
+        return 404, {'error': f"Not found: {path}"}
+
+    def start(self, host='127.0.0.1', port=8080):
+        """Start the refresh thread and the HTTP server (in background threads)"""
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                status, payload = service.handle(url.path, parse_qs(url.query))
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.send_header('Cache-Control', 'no-cache')
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.debug(f"{self.address_string()} {format % args}")
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name='glue-cost-refresh', daemon=True)
+        self._thread.start()
+        self._server = Server((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name='glue-cost-http', daemon=True).start()
+        logger.info(f"Serving Glue costs on http://{host}:{self._server.server_address[1]}")
+        return self
+
+    @property
+    def address(self):
+        return self._server.server_address[:2] if self._server else None
+
+    def stop(self):
+        """Stop serving and refreshing (waits for a running refresh to finish)"""
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Serve periodically refreshed AWS Glue job costs over HTTP")
+    parser.add_argument('--csv', help="CSV file containing Glue job names (re-read on every refresh)")
+    parser.add_argument('--job-name-column', default='job_name', help="Column name containing job names")
+    parser.add_argument('--discover-prefix', help="Discover jobs by name prefix instead of reading --csv")
+    parser.add_argument('--discover-tag', action='append', metavar='KEY=VALUE',
+                        help="Discover jobs with this tag instead of reading --csv (repeatable)")
+    parser.add_argument('--run-store', default='glue_runs.db', help="SQLite run-history store")
+    parser.add_argument('--windows', default=','.join(DEFAULT_WINDOWS),
+                        help="Comma-separated windows: current-month, previous-month, current-week, "
+                             "previous-week or YYYY-MM")
+    parser.add_argument('--refresh-interval', type=float, default=900, help="Seconds between refreshes")
+    parser.add_argument('--host', default='127.0.0.1', help="HTTP listen address")
+    parser.add_argument('--port', type=int, default=8080, help="HTTP listen port")
+    parser.add_argument('--region', default='us-east-1', help="AWS region name")
+    parser.add_argument('--max-workers', type=int, default=16, help="Number of parallel workers")
+    parser.add_argument('--max-rps', type=float, help="Upper bound for Glue API requests per second")
+    args = parser.parse_args(argv)
+    if not args.csv and not args.discover_prefix and not args.discover_tag:
+        parser.error("one of --csv, --discover-prefix or --discover-tag is required")
+    if args.discover_tag and any('=' not in tag for tag in args.discover_tag):
+        parser.error("--discover-tag must be KEY=VALUE")
+
+    tags = dict(tag.split('=', 1) for tag in args.discover_tag or []) or None
+
+    def job_source(calculator):
+        if args.csv:
+            return calculator.read_job_names_from_csv(args.csv, args.job_name_column)
+        return calculator.discover_job_names(args.discover_prefix, tags)
+
+    service = GlueCostService(
+        job_source,
+        run_store=args.run_store,
+        windows=[window.strip() for window in args.windows.split(',') if window.strip()],
+        refresh_interval=args.refresh_interval,
+        calculator_options={
+            'region_name': args.region,
+            'max_workers': args.max_workers,
+            'max_requests_per_second': args.max_rps,
+        }
+    )
+    service.start(args.host, args.port)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        logger.info("Shutting down")
+    finally:
+        service.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Deterministic sharding and mergeable partial results for the Glue cost calculator
+
+Large job inventories can be split across independent workers (containers,
+CI jobs, ...) with no coordination service: every worker is given the same job
+list and its shard 'i/N', keeps the jobs whose name hashes to shard i, and writes
+a partial result file. The merge step combines the N partial files into the same
+report that GlueCostCalculator.calculate_costs_from_csv produces.
+
+Partial files hold mergeable per-job aggregates (cost sum, run counts and the
+first/last run start times), so they can be merged in any order and grouping.
+
+    python gjobs.py --csv glue_jobs.csv --month 2025-09 --shard 0/4 --output shard-0.json
+    ...
+    python gjobs.py --csv glue_jobs.csv --month 2025-09 --shard 3/4 --output shard-3.json
+    python gjobs.py --merge shard-*.json --output glue_costs_2025_09.csv
+"""
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timezone
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+PARTIAL_FORMAT_VERSION = 1
+
+# Column order of the merged report (that of calculate_costs_from_csv)
+REPORT_COLUMNS = [
+    'job_name',
+    'glue_version',
+    'total_runs',
+    'successful_runs',
+    'failed_runs',
+    'total_cost_usd',
+    'status',
+    'error_message',
+]
+
+# Per-job fields of a partial file
+PARTIAL_COLUMNS = REPORT_COLUMNS + ['first_run_started_on', 'last_run_started_on']
+
+
+def parse_shard(value):
+    """Parse 'i/N' into (index, count), with 0 <= i < N"""
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard (expected i/N): {value}")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard {value}: need 0 <= i < N")
+    return index, count
+
+
+def shard_of(job_name, shard_count):
+    """Return the shard of a job name
+
+    Uses MD5 of the name rather than hash(), which is salted per process, so
+    every worker and every run agrees on the assignment.
+    """
+    digest = hashlib.md5(job_name.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % shard_count
+
+
+def select_shard(job_names, shard_index, shard_count):
+    """Return the job names (in input order, de-duplicated) belonging to a shard"""
+    return [job_name for job_name in dict.fromkeys(job_names)
+            if shard_of(job_name, shard_count) == shard_index]
+
+
+def _timestamp(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def write_partial(path, results, shard_index, shard_count, start_date, end_date, job_count):
+    """Write a shard's per-job results as a partial result file (JSON)
+
+    Args:
+        path: Output path of the partial file
+        results: Per-job result dicts of the shard's jobs
+        shard_index, shard_count: The shard
+        start_date, end_date: Billing window of the results
+        job_count: Number of jobs assigned to the shard
+    """
+    partial = {
+        'format_version': PARTIAL_FORMAT_VERSION,
+        'shard_index': shard_index,
+        'shard_count': shard_count,
+        'window_start': start_date.isoformat(),
+        'window_end': end_date.isoformat(),
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'job_count': job_count,
+        'jobs': [
+            {column: _timestamp(result.get(column)) for column in PARTIAL_COLUMNS}
+            for result in results
+        ],
+    }
+    # Written atomically so a merge never reads a half-written shard
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as partial_file:
+        json.dump(partial, partial_file)
+    os.replace(temp_path, path)
+    logger.info(f"Shard {shard_index}/{shard_count} partial results ({len(results)} jobs) saved to {path}")
+
+
+def read_partial(path):
+    """Load a partial result file"""
+    with open(path, encoding='utf-8') as partial_file:
+        partial = json.load(partial_file)
+    if partial.get('format_version') != PARTIAL_FORMAT_VERSION:
+        raise ValueError(f"Unsupported partial result format in {path}")
+    return partial
+
+
+def merge_aggregates(frame):
+    """Combine per-job partial aggregates that may be split over several rows
+
+    Cost sums and run counts are added, first/last run times take the min/max
+    and a job is in error if any of its rows is.
+    """
+    if frame.empty:
+        return frame.reindex(columns=PARTIAL_COLUMNS)
+
+    frame = frame.assign(
+        first_run_started_on=pd.to_datetime(frame['first_run_started_on'], utc=True),
+        last_run_started_on=pd.to_datetime(frame['last_run_started_on'], utc=True),
+        is_error=frame['status'] == 'error',
+    )
+    merged = frame.groupby('job_name', sort=False).agg(
+        glue_version=('glue_version', 'first'),
+        total_runs=('total_runs', 'sum'),
+        successful_runs=('successful_runs', 'sum'),
+        failed_runs=('failed_runs', 'sum'),
+        total_cost_usd=('total_cost_usd', 'sum'),
+        is_error=('is_error', 'any'),
+        error_message=('error_message', 'last'),
+        first_run_started_on=('first_run_started_on', 'min'),
+        last_run_started_on=('last_run_started_on', 'max'),
+    ).reset_index()
+    merged['status'] = merged.pop('is_error').map({True: 'error', False: 'success'})
+    merged['total_cost_usd'] = merged['total_cost_usd'].round(2)
+    return merged.reindex(columns=PARTIAL_COLUMNS)
+
+
+def merge_partials(paths, allow_missing=False):
+    """Merge shard partial files into the calculate_costs_from_csv report
+
+    Args:
+        paths: Partial result files, one per shard
+        allow_missing: Merge even if some shards of the run are missing
+
+    Returns (report DataFrame sorted by cost descending, (window_start, window_end)).
+    Raises ValueError if the partials are of different shard counts or windows,
+    if a shard is given twice, or (unless allow_missing) if a shard is missing.
+    """
+    partials = [read_partial(path) for path in paths]
+    if not partials:
+        raise ValueError("No partial result files to merge")
+
+    layouts = {(partial['shard_count'], partial['window_start'], partial['window_end']) for partial in partials}
+    if len(layouts) > 1:
+        raise ValueError(f"Partial results are from different shard counts or windows: {sorted(layouts)}")
+    shard_count, window_start, window_end = layouts.pop()
+
+    seen = {}
+    for path, partial in zip(paths, partials):
+        if partial['shard_index'] in seen:
+            raise ValueError(f"Shard {partial['shard_index']}/{shard_count} given twice: "
+                             f"{seen[partial['shard_index']]} and {path}")
+        seen[partial['shard_index']] = path
+
+    missing = sorted(set(range(shard_count)) - set(seen))
+    if missing:
+        message = f"Missing shards {missing} of {shard_count}"
+        if not allow_missing:
+            raise ValueError(message)
+        logger.warning(f"{message}; the report is incomplete")
+
+    frame = pd.DataFrame(
+        [job for partial in partials for job in partial['jobs']], columns=PARTIAL_COLUMNS
+    )
+    merged = merge_aggregates(frame)
+    logger.info(f"Merged {len(partials)} shards: {len(merged)} jobs, "
+                f"total cost ${merged['total_cost_usd'].sum():.2f}")
+
+    report = merged[REPORT_COLUMNS].sort_values('total_cost_usd', ascending=False)
+    if report['error_message'].isna().all():
+        report = report.drop(columns='error_message')
+    window = (datetime.fromisoformat(window_start), datetime.fromisoformat(window_end))
+    return report, window
@@ -0,0 +1,204 @@
+"""
+Local run-history store for the Glue cost calculator
+
+Keeps AWS Glue job runs in a SQLite database keyed by (job_name, run_id) so cost
+reports for any past window can be answered without calling the Glue API.
+A sync only needs to fetch runs newer than the sync watermark of each job.
+
+Usage:
+    store = JobRunStore('glue_runs.db')
+    calculator = GlueCostCalculator(run_store=store, month='2025-08')
+    calculator.calculate_costs_from_csv('glue_jobs.csv')      # syncs, then reads the store
+
+    offline = GlueCostCalculator(run_store=store, offline=True, month='2025-07')
+    offline.calculate_costs_from_csv('glue_jobs.csv')         # no Glue API calls
+"""
+
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+
+# Runs in these states will not change any more
+TERMINAL_RUN_STATES = ('SUCCEEDED', 'FAILED', 'STOPPED', 'TIMEOUT', 'ERROR', 'EXPIRED')
+
+
+class JobRunRecord(NamedTuple):
+    """The fields of a Glue job run needed for costing
+
+    Much smaller than the get_job_runs response dict, which also carries
+    Arguments, PredecessorRuns, error messages and more.
+    """
+    run_id: str
+    state: Optional[str]
+    started_on: Optional[datetime]
+    completed_on: Optional[datetime]
+    allocated_capacity: Optional[float] = None
+    max_capacity: Optional[float] = None
+    worker_type: Optional[str] = None
+    number_of_workers: Optional[int] = None
+
+    @classmethod
+    def from_api(cls, run):
+        """Build a record from a JobRun dict returned by the Glue API"""
+        return cls(
+            run.get('Id'),
+            run.get('JobRunState'),
+            run.get('StartedOn'),
+            run.get('CompletedOn'),
+            run.get('AllocatedCapacity'),
+            run.get('MaxCapacity'),
+            run.get('WorkerType'),
+            run.get('NumberOfWorkers'),
+        )
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS job_runs (
+    job_name TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    job_run_state TEXT,
+    started_on REAL,
+    completed_on REAL,
+    allocated_capacity REAL,
+    max_capacity REAL,
+    worker_type TEXT,
+    number_of_workers INTEGER,
+    PRIMARY KEY (job_name, run_id)
+);
+CREATE INDEX IF NOT EXISTS job_runs_started_on ON job_runs (job_name, started_on);
+CREATE TABLE IF NOT EXISTS jobs (
+    job_name TEXT PRIMARY KEY,
+    glue_version TEXT,
+    default_max_capacity REAL,
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    job_name TEXT PRIMARY KEY,
+    synced_at REAL
+);
+"""
+
+
+def _to_epoch(value):
+    return value.timestamp() if value is not None else None
+
+
+def _from_epoch(value):
+    return datetime.fromtimestamp(value, tz=timezone.utc) if value is not None else None
+
+
+class JobRunStore:
+    def __init__(self, db_path='glue_runs.db'):
+        """Open (and create if needed) the run store
+
+        Args:
+            db_path: Path of the SQLite database file
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+
+    def sync_watermark(self, job_name):
+        """Return the StartedOn from which a sync must re-fetch runs, or None for a full sync
+
+        This is the oldest stored run that was still in progress when it was stored,
+        or the newest stored run if all of them had finished.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT MIN(started_on) FROM job_runs WHERE job_name = ? "
+                f"AND (job_run_state IS NULL OR job_run_state NOT IN ({','.join('?' * len(TERMINAL_RUN_STATES))}))",
+                (job_name, *TERMINAL_RUN_STATES)
+            ).fetchone()
+            if row[0] is None:
+                row = self._conn.execute(
+                    "SELECT MAX(started_on) FROM job_runs WHERE job_name = ?", (job_name,)
+                ).fetchone()
+        return _from_epoch(row[0])
+
+    def upsert_runs(self, job_name, job_runs):
+        """Insert or replace JobRunRecords of a job"""
+        rows = [
+            (
+                job_name,
+                run.run_id,
+                run.state,
+                _to_epoch(run.started_on),
+                _to_epoch(run.completed_on),
+                run.allocated_capacity,
+                run.max_capacity,
+                run.worker_type,
+                run.number_of_workers,
+            )
+            for run in job_runs
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO job_runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+        return len(rows)
+
+    def record_sync(self, job_name):
+        """Record that the job's runs were synced now (whether or not any were new)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?)",
+                (job_name, datetime.now(timezone.utc).timestamp())
+            )
+
+    def get_runs(self, job_name, start=None, end=None):
+        """Return stored JobRunRecords of a job started within [start, end], newest first"""
+        query = ("SELECT run_id, job_run_state, started_on, completed_on, allocated_capacity, "
+                 "max_capacity, worker_type, number_of_workers FROM job_runs WHERE job_name = ?")
+        params = [job_name]
+        if start is not None:
+            query += " AND started_on >= ?"
+            params.append(start.timestamp())
+        if end is not None:
+            query += " AND started_on <= ?"
+            params.append(end.timestamp())
+        query += " ORDER BY started_on DESC"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        return [
+            JobRunRecord(run_id, state, _from_epoch(started_on), _from_epoch(completed_on),
+                         allocated, max_capacity, worker_type, workers)
+            for run_id, state, started_on, completed_on, allocated, max_capacity, worker_type, workers in rows
+        ]
+
+    def last_synced(self, job_name):
+        """Return when the job was last synced, or None if it never was"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT synced_at FROM sync_state WHERE job_name = ?", (job_name,)
+            ).fetchone()
+        return _from_epoch(row[0]) if row else None
+
+    def save_job_details(self, job_name, job_details):
+        """Store the job details used for costing (Glue version and default capacity)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?)",
+                (job_name, job_details['glue_version'], job_details['default_max_capacity'],
+                 datetime.now(timezone.utc).timestamp())
+            )
+
+    def get_job_details(self, job_name):
+        """Return stored job details, or None if the job was never synced"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT glue_version, default_max_capacity FROM jobs WHERE job_name = ?", (job_name,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'glue_version': row[0], 'default_max_capacity': row[1]}
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
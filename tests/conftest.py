@@ -0,0 +1,12 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The repository root holds a pandas.py (a locust file) that must not shadow the
+# real pandas package, so the root goes at the end of sys.path. `python -m pytest`
+# puts the working directory first, so that entry is moved to the end as well.
+# dock/ holds the Lambda (lam).
+sys.path[:] = [p for p in sys.path if os.path.abspath(p or os.curdir) != ROOT]
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'dock'))
@@ -0,0 +1,49 @@
+"""The cost cube must agree with the per-job report (to the documented cent)"""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from gjobs import GlueCostCalculator
+from gjobs_bench import StubGlueServer
+from gjobs_cube import CostCube, job_cube_rows
+from gjobs_store import JobRunRecord
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'test')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'test')
+    with StubGlueServer(jobs=4, runs_per_job=200, page_size=100) as stub:
+        yield stub
+
+
+def test_cube_job_costs_match_the_report(stub, tmp_path):
+    calculator = GlueCostCalculator(endpoint_url=stub.endpoint_url)
+    report = calculator.calculate_costs_for_jobs(stub.job_names).set_index('job_name')
+    cube = calculator.build_cost_cube(stub.job_names, str(tmp_path / 'cube.parquet'))
+    costs = cube.query(calculator.start_date, calculator.end_date).set_index('job_name')
+
+    assert sorted(costs.index) == sorted(report.index)
+    for job_name, row in report.iterrows():
+        assert costs.loc[job_name, 'cost_usd'] == pytest.approx(row['total_cost_usd'], abs=0.01)
+        assert costs.loc[job_name, 'run_count'] == row['total_runs']
+
+    # Rebuilding the same window replaces its rows instead of adding to them
+    rebuilt = calculator.build_cost_cube(stub.job_names, str(tmp_path / 'cube.parquet'))
+    assert len(rebuilt.frame) == len(cube.frame)
+
+
+def test_cube_can_differ_by_a_cent_on_a_half_cent_total():
+    # 1350 s x 1 DPU x $0.44 = $0.165, which the report rounds half up and the cube half to even
+    started = datetime(2025, 8, 1, tzinfo=timezone.utc)
+    run = JobRunRecord('jr_1', 'SUCCEEDED', started, started + timedelta(seconds=1350), 1)
+    job_details = {'glue_version': '2.0', 'default_max_capacity': 10}
+    calculator = GlueCostCalculator()
+
+    total, _, _ = calculator.aggregate_job_runs(iter([run]), job_details)
+    cube = CostCube(job_cube_rows('job', job_details, [run], {'2.0': Decimal('0.44')}))
+    (cube_cost,) = cube.query()['cost_usd']
+
+    assert (total, cube_cost) == (0.17, 0.16)
@@ -0,0 +1,85 @@
+"""The Decimal and vectorized cost engines must report identical job totals"""
+
+import random
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from gjobs import GlueCostCalculator
+from gjobs_store import JobRunRecord
+
+START = datetime(2025, 8, 1, tzinfo=timezone.utc)
+
+
+def run(seconds, state='SUCCEEDED', allocated=None, max_capacity=None, started=START):
+    completed = None if seconds is None else started + timedelta(seconds=seconds)
+    return JobRunRecord(f"jr_{random.random():.12f}", state, started, completed, allocated, max_capacity)
+
+
+@pytest.fixture
+def calculators():
+    engines = {}
+    for engine in ('decimal', 'vectorized'):
+        calculator = GlueCostCalculator(cost_engine=engine)
+        calculator.pricing = {'2.0': Decimal('0.44'), '4.0': Decimal('0.52')}
+        engines[engine] = calculator
+    return engines
+
+
+def assert_engines_agree(calculators, job_runs, job_details):
+    decimal = calculators['decimal'].aggregate_job_runs(iter(job_runs), job_details)
+    vectorized = calculators['vectorized'].aggregate_job_runs(iter(job_runs), job_details)
+    assert decimal == vectorized
+    return decimal
+
+
+def test_missing_start_or_completion_times(calculators):
+    job_runs = [
+        run(3600, allocated=2),
+        run(None, allocated=2),
+        JobRunRecord('jr_no_start', 'SUCCEEDED', None, START, 2, None),
+        run(600, state='FAILED', allocated=2),
+    ]
+    total, successful, failed = assert_engines_agree(
+        calculators, job_runs, {'glue_version': '4.0', 'default_max_capacity': 10})
+    assert (total, successful, failed) == (1.04, 3, 1)
+
+
+@pytest.mark.parametrize('allocated, max_capacity', [(None, None), (0, None), (None, 0), (0, 0)])
+def test_capacity_falls_back_to_job_default(calculators, allocated, max_capacity):
+    job_runs = [run(3600, allocated=allocated, max_capacity=max_capacity)]
+    total, _, _ = assert_engines_agree(
+        calculators, job_runs, {'glue_version': '4.0', 'default_max_capacity': 10})
+    assert total == 5.2
+
+
+def test_unknown_glue_version_uses_2_0_price(calculators):
+    job_runs = [run(3600, allocated=1), run(1800, max_capacity=3)]
+    total, _, _ = assert_engines_agree(
+        calculators, job_runs, {'glue_version': '9.9', 'default_max_capacity': 10})
+    assert total == 1.1
+
+
+def test_half_cent_total_rounds_half_up(calculators):
+    # 8100 s x 0.5 DPU x $0.44 = $0.495 exactly, but just below it in floats
+    job_runs = [run(8100, allocated=0.5)]
+    total, _, _ = assert_engines_agree(
+        calculators, job_runs, {'glue_version': '2.0', 'default_max_capacity': 10})
+    assert total == 0.5
+
+
+def test_random_jobs(calculators):
+    rng = random.Random(6)
+    for _ in range(200):
+        job_runs = [
+            run(rng.choice([None, rng.randint(1, 40000)]),
+                state=rng.choice(['SUCCEEDED', 'SUCCEEDED', 'FAILED', 'STOPPED']),
+                allocated=rng.choice([None, 0, 2, 10, 0.0625]),
+                max_capacity=rng.choice([None, 0, 5.0, 1.5]),
+                started=START + timedelta(minutes=rng.randint(0, 40000)))
+            for _ in range(rng.randint(0, 30))
+        ]
+        job_details = {'glue_version': rng.choice(['2.0', '4.0', '1.0']),
+                       'default_max_capacity': rng.choice([10, 2.5])}
+        assert_engines_agree(calculators, job_runs, job_details)
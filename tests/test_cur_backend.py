@@ -0,0 +1,53 @@
+"""The CUR backend must sum the window's Glue job line items per job"""
+
+import math
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from gjobs import GlueCostCalculator
+
+ARN = 'arn:aws:glue:us-east-1:123456789012:job/'
+
+# (resource id, product code, usage type, usage start, cost, team tag)
+LINE_ITEMS = [
+    (ARN + 'etl_a', 'AWSGlue', 'USE1-ETL-DPU-Hour', datetime(2025, 8, 3), '0.2', 'data'),
+    (ARN + 'etl_a', 'AWSGlue', 'USE1-ETL-Flex-DPU-Hour', datetime(2025, 8, 31, 23), '0.105', 'data'),
+    (ARN + 'etl_b', 'AWSGlue', 'USE1-ETL-DPU-Hour', datetime(2025, 8, 10), '1.5', 'web'),
+    (ARN + 'etl_a', 'AWSGlue', 'USE1-ETL-DPU-Hour', datetime(2025, 9, 1), '9', 'data'),
+    (ARN + 'etl_b', 'AWSGlue', 'USE1-Crawler-DPU-Hour', datetime(2025, 8, 10), '9', 'web'),
+    (ARN + 'etl_b', 'AmazonS3', 'USE1-ETL-Requests', datetime(2025, 8, 10), '9', 'web'),
+]
+
+
+def write_cur(path, legacy):
+    columns = list(zip(*LINE_ITEMS))
+    data = {
+        'line_item_resource_id': columns[0],
+        'line_item_product_code': columns[1],
+        'line_item_usage_type': columns[2],
+        'line_item_usage_start_date': pa.array(columns[3], pa.timestamp('ms')),
+        'line_item_unblended_cost': pa.array([float(cost) for cost in columns[4]]),
+    }
+    if legacy:
+        data['resource_tags_user_team'] = columns[5]
+    else:
+        data['resource_tags'] = pa.array([[('user_team', team)] for team in columns[5]],
+                                         pa.map_(pa.string(), pa.string()))
+    pq.write_table(pa.table(data), path / 'cur.parquet')
+
+
+@pytest.mark.parametrize('legacy', [True, False])
+def test_cur_costs_of_the_window(tmp_path, legacy):
+    write_cur(tmp_path, legacy)
+    calculator = GlueCostCalculator(month='2025-08')
+
+    results = calculator.calculate_costs_from_cur(str(tmp_path), job_names=['etl_a', 'etl_b', 'etl_c'])
+    # 0.2 + 0.105 rounds half up to 0.31
+    assert results.set_index('job_name')['total_cost_usd'].to_dict() == {'etl_a': 0.31, 'etl_b': 1.5, 'etl_c': 0.0}
+    assert all(math.isnan(runs) for runs in results['total_runs'])
+
+    tagged = calculator.calculate_costs_from_cur(str(tmp_path), tags={'team': 'web'})
+    assert list(tagged['job_name']) == ['etl_b']
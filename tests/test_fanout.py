@@ -0,0 +1,66 @@
+"""Fan-out must cost every target with its role's credentials and refresh them from STS"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import gjobs
+from gjobs import GlueCostCalculator, assume_role_session, calculate_costs_fanout, role_credentials
+from gjobs_bench import StubGlueServer
+
+ROLES = ['arn:aws:iam::111111111111:role/glue-costs', 'arn:aws:iam::222222222222:role/glue-costs']
+
+
+class FakeSts:
+    """assume_role returning new keys on every call, valid for expires_in"""
+
+    def __init__(self, expires_in):
+        self.expires_in = expires_in
+        self.calls = []
+
+    def assume_role(self, RoleArn, RoleSessionName, DurationSeconds):
+        self.calls.append(RoleArn)
+        return {'Credentials': {
+            'AccessKeyId': f"key-{len(self.calls)}",
+            'SecretAccessKey': 'secret',
+            'SessionToken': 'token',
+            'Expiration': datetime.now(timezone.utc) + self.expires_in,
+        }}
+
+
+@pytest.fixture
+def sts(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'test')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'test')
+    monkeypatch.setattr(gjobs, '_assumed_sessions', {})
+    sts = FakeSts(timedelta(hours=1))
+    client = gjobs.boto3.client
+    monkeypatch.setattr(gjobs.boto3, 'client',
+                        lambda service, *args, **kwargs: sts if service == 'sts' else client(service, *args, **kwargs))
+    return sts
+
+
+def test_fanout_costs_each_target_with_its_account(sts):
+    with StubGlueServer(jobs=3, runs_per_job=200) as stub:
+        targets = [f"{ROLES[0]},us-east-1", f"{ROLES[0]},eu-west-1", f"{ROLES[1]},us-east-1"]
+        results = calculate_costs_fanout(targets, job_names=stub.job_names, max_processes=2,
+                                         endpoint_url=stub.endpoint_url, max_workers=2)
+        direct = GlueCostCalculator(endpoint_url=stub.endpoint_url).calculate_costs_for_jobs(stub.job_names)
+
+    # Each role is assumed once, in this process; the target processes reuse the credentials
+    assert sts.calls == ROLES
+    assert sorted(zip(results['account_id'], results['region'])) == sorted(
+        [('111111111111', 'us-east-1')] * 3 + [('111111111111', 'eu-west-1')] * 3 + [('222222222222', 'us-east-1')] * 3)
+    assert results['total_cost_usd'].sum() == pytest.approx(3 * direct['total_cost_usd'].sum())
+
+
+def test_expiring_credentials_are_refreshed(sts):
+    # botocore refreshes credentials that expire within 10 minutes before using them
+    sts.expires_in = timedelta(minutes=5)
+    session = assume_role_session(ROLES[0])
+    assert session.get_credentials().get_frozen_credentials().access_key == 'key-2'
+
+    sts.expires_in = timedelta(hours=1)
+    assert session.get_credentials().get_frozen_credentials().access_key == 'key-3'
+    assert role_credentials(ROLES[0])['access_key'] == 'key-3'
+    assert assume_role_session(ROLES[0]) is session
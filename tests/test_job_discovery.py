@@ -0,0 +1,41 @@
+"""Job details must be loaded in bulk, and discovery must find the same jobs as a CSV"""
+
+import pytest
+
+from gjobs import GlueCostCalculator
+from gjobs_bench import StubGlueServer
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'test')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'test')
+    with StubGlueServer(jobs=150, runs_per_job=4, page_size=40) as stub:
+        yield stub
+
+
+def test_job_details_are_prefetched_100_at_a_time(stub):
+    calculator = GlueCostCalculator(endpoint_url=stub.endpoint_url)
+    results = calculator.calculate_costs_for_jobs(stub.job_names)
+
+    assert list(results['status']) == ['success'] * 150
+    assert set(results['glue_version']) == {'4.0'}
+    assert stub.request_counts['BatchGetJobs'] == 2
+    assert 'GetJob' not in stub.request_counts
+
+
+def test_discovered_jobs_need_no_further_detail_calls(stub):
+    calculator = GlueCostCalculator(endpoint_url=stub.endpoint_url)
+    results = calculator.calculate_costs_discovered(name_prefix='bench_job_0000')
+
+    assert sorted(results['job_name']) == stub.job_names[:10]
+    assert stub.request_counts['GetJobs'] == 4
+    assert 'BatchGetJobs' not in stub.request_counts and 'GetJob' not in stub.request_counts
+
+
+def test_jobs_are_discovered_by_tag(stub):
+    calculator = GlueCostCalculator(endpoint_url=stub.endpoint_url)
+
+    assert calculator.discover_job_names(tags={'parity': 'odd'}) == stub.job_names[1::2]
+    assert calculator.discover_job_names(name_prefix='bench_job_0001', tags={'parity': 'even'}) == \
+        stub.job_names[10:20:2]
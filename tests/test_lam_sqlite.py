@@ -0,0 +1,299 @@
+"""process_table over sqlite3 must keep column types across fetch batches"""
+
+import csv
+import io
+import sqlite3
+from datetime import date, datetime
+from decimal import Decimal
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import lam
+
+
+class FakeS3:
+    """The S3 calls of S3MultipartWriter, keeping objects in memory"""
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[Key] = bytes(Body)
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        self.uploads[Key] = {}
+        return {'UploadId': Key}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploads[UploadId][PartNumber] = bytes(Body)
+        return {'ETag': f'"{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        self.objects[Key] = b''.join(parts[part['PartNumber']] for part in MultipartUpload['Parts'])
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+
+
+@pytest.fixture
+def processor(tmp_path, monkeypatch):
+    database = tmp_path / 'prices.db'
+    connection = sqlite3.connect(database)
+    connection.execute('CREATE TABLE PRICES (ID INTEGER, PRICE DECIMAL(10,2), NAME VARCHAR(20))')
+    # NUMERIC affinity stores 10.00 and 20.00 as integers and 19.5 and 5.25 as reals
+    connection.executemany('INSERT INTO PRICES VALUES (?, ?, ?)',
+                           [(1, 10, 'a'), (2, 20, 'b'), (3, 19.5, 'a'), (4, 5.25, None)])
+    connection.commit()
+    connection.close()
+
+    s3 = FakeS3()
+    monkeypatch.setitem(lam._aws_clients, 's3', s3)
+    processor = lam.DB2DataProcessor(backend=lam.DBAPIBackend(sqlite3))
+    processor.db_connection = processor.backend.connect(str(database))
+    processor.batch_size = 2
+    yield processor, s3
+    processor.backend.close(processor.db_connection)
+
+
+def table_config(query):
+    return {'name': 'prices', 'query': query, 'output': {'bucket': 'out', 'prefix': 'p', 'format': 'parquet'}}
+
+
+def test_declared_decimal_column_keeps_its_values(processor):
+    processor, s3 = processor
+    result = processor.process_table(table_config('SELECT * FROM PRICES ORDER BY ID'))
+
+    assert result['status'] == 'success'
+    assert result['rows_processed'] == 4
+    (body,) = s3.objects.values()
+    table = pq.read_table(io.BytesIO(body))
+    assert str(table.schema.field('PRICE').type) == 'decimal128(10, 2)'
+    assert table.column('PRICE').to_pylist() == [Decimal('10.00'), Decimal('20.00'), Decimal('19.50'), Decimal('5.25')]
+    assert table.column('ID').to_pylist() == [1, 2, 3, 4]
+    assert table.column('NAME').to_pylist() == ['a', 'b', 'a', None]
+
+
+def test_undeclared_column_type_conflict_fails_the_table(processor):
+    processor, s3 = processor
+    # An expression has no declared type: integers in the first batch, reals in the second
+    result = processor.process_table(table_config('SELECT ID, PRICE * 1 AS AMOUNT FROM PRICES ORDER BY ID'))
+
+    assert result['status'] == 'failed'
+    assert 'AMOUNT' in result['error']
+    assert s3.objects == {}
+
+
+def test_binary_values_in_a_character_column_are_kept_as_bytes(processor):
+    processor, s3 = processor
+    # ibm_db reports BINARY, VARBINARY and FOR BIT DATA columns as "string"
+    processor.db_connection.execute('CREATE TABLE KEYS (ID INTEGER, KEY VARCHAR(8))')
+    processor.db_connection.executemany('INSERT INTO KEYS VALUES (?, ?)',
+                                        [(1, None), (2, b'\x00\xff'), (3, b'\x01')])
+    result = processor.process_table(table_config('SELECT * FROM KEYS ORDER BY ID'))
+
+    assert result['status'] == 'success'
+    (body,) = s3.objects.values()
+    table = pq.read_table(io.BytesIO(body))
+    assert str(table.schema.field('KEY').type) == 'binary'
+    assert table.column('KEY').to_pylist() == [None, b'\x00\xff', b'\x01']
+
+
+def test_decfloat_strings_in_a_real_column_keep_every_digit():
+    # ibm_db reports DECFLOAT as "real" and returns its values as strings
+    values = (None, '1.23456789012345678901234567890E+100')
+    arrow_type = lam.refine_arrow_type(lam.db2_arrow_type('real'), values)
+
+    assert lam.column_array(values, arrow_type).to_pylist() == list(values)
+    with pytest.raises(pa.ArrowInvalid):
+        lam.column_array(values, lam.db2_arrow_type('real'))
+
+
+@pytest.mark.parametrize('file_format', ['parquet', 'csv'])
+def test_undeclared_column_that_starts_null_keeps_its_later_values(processor, file_format):
+    processor, s3 = processor
+    config = table_config('SELECT ID, CASE WHEN ID > 2 THEN NAME END AS C FROM PRICES ORDER BY ID')
+    config['output']['format'] = file_format
+    result = processor.process_table(config)
+
+    assert result['status'] == 'success'
+    (body,) = s3.objects.values()
+    if file_format == 'parquet':
+        values = pq.read_table(io.BytesIO(body)).column('C').to_pylist()
+    else:
+        values = [row['C'] or None for row in csv.DictReader(io.StringIO(body.decode()))]
+    assert values == [None, None, 'a', None]
+
+
+def test_undeclared_column_null_past_the_held_batches_fails_the_table(processor, monkeypatch):
+    processor, s3 = processor
+    monkeypatch.setattr(lam, 'TYPE_INFERENCE_BATCHES', 1)
+    query = 'SELECT ID, CASE WHEN ID > 2 THEN NAME END AS C FROM PRICES ORDER BY ID'
+    result = processor.process_table(table_config(query))
+
+    assert result['status'] == 'failed'
+    assert 'Column C has no declared type and was NULL in the first 2 rows' in result['error']
+    assert s3.objects == {}
+
+
+def test_declared_decimal_column_takes_integers_and_reals_in_one_batch(processor):
+    processor, s3 = processor
+    processor.batch_size = 3
+    result = processor.process_table(table_config('SELECT PRICE FROM PRICES ORDER BY ID'))
+
+    assert result['status'] == 'success'
+    (body,) = s3.objects.values()
+    prices = pq.read_table(io.BytesIO(body)).column('PRICE').to_pylist()
+    assert prices == [Decimal('10.00'), Decimal('20.00'), Decimal('19.50'), Decimal('5.25')]
+
+
+def test_resumable_table_finishing_in_a_short_batch_is_complete(processor):
+    processor, s3 = processor
+    processor.batch_size = 3
+    processor.remaining_time_ms = lambda: 0
+    config = {**table_config('SELECT * FROM PRICES'), 'resume_key': 'ID'}
+
+    first = processor.extract_resumable_to_s3(config)
+    assert first['status'] == 'incomplete'
+    assert first['rows_processed'] == 3
+
+    second = processor.extract_resumable_to_s3(config, state=first['continuation'])
+    assert second['status'] == 'success'
+    assert second['rows_processed'] == 4
+    assert 'continuation' not in second
+    assert len(s3.objects) == 2
+
+
+def test_csv_output_only_quotes_values_that_need_it(processor):
+    processor, s3 = processor
+    processor.db_connection.execute('CREATE TABLE NOTES (ID INTEGER, NOTE VARCHAR(20))')
+    processor.db_connection.executemany('INSERT INTO NOTES VALUES (?, ?)',
+                                        [(1, 'plain'), (2, None), (3, 'a, b'), (4, 'c'), (5, 'd "e"'), (6, None)])
+    config = table_config('SELECT * FROM NOTES ORDER BY ID')
+    config['output']['format'] = 'csv'
+    result = processor.process_table(config)
+
+    assert result['status'] == 'success'
+    (body,) = s3.objects.values()
+    assert body.decode() == 'ID,NOTE\n1,plain\n2,\n3,"a, b"\n4,c\n5,"d ""e"""\n6,\n'
+
+
+def test_declared_date_timestamp_and_boolean_columns_are_parsed(processor):
+    processor, s3 = processor
+    # sqlite3 keeps DATE and TIMESTAMP values as ISO text and BOOLEAN values as 0/1
+    processor.db_connection.execute('CREATE TABLE EVENTS (ID INTEGER, D DATE, T TIMESTAMP, B BOOLEAN)')
+    processor.db_connection.executemany('INSERT INTO EVENTS VALUES (?, ?, ?, ?)', [
+        (1, '2025-08-01', '2025-08-01 10:30:00', 1),
+        (2, None, '2025-08-02T11:00:00.5', 0),
+        (3, '2025-08-03', None, None),
+    ])
+    result = processor.process_table(table_config('SELECT * FROM EVENTS ORDER BY ID'))
+
+    assert result['status'] == 'success'
+    (body,) = s3.objects.values()
+    table = pq.read_table(io.BytesIO(body))
+    assert table.column('D').to_pylist() == [date(2025, 8, 1), None, date(2025, 8, 3)]
+    assert table.column('T').to_pylist() == [datetime(2025, 8, 1, 10, 30), datetime(2025, 8, 2, 11, 0, 0, 500000), None]
+    assert table.column('B').to_pylist() == [True, False, None]
+
+
+def test_incremental_table_on_last_updated_only_extracts_new_rows(processor, tmp_path):
+    processor, s3 = processor
+    processor.watermark_store = lam.WatermarkStore(str(tmp_path / 'marks.json'))
+    processor.db_connection.execute('CREATE TABLE EMPLOYEES (EMPLOYEE_ID INTEGER, LAST_UPDATED TIMESTAMP)')
+    processor.db_connection.executemany('INSERT INTO EMPLOYEES VALUES (?, ?)',
+                                        [(1, '2025-08-01 09:00:00'), (2, '2025-08-02 09:00:00')])
+    config = {**table_config('SELECT * FROM EMPLOYEES'), 'incremental': {'column': 'LAST_UPDATED'}}
+
+    first = processor.process_table(config)
+    processor.db_connection.execute("INSERT INTO EMPLOYEES VALUES (3, '2025-08-03 09:00:00')")
+    second = processor.process_table(config)
+    third = processor.process_table(config)
+
+    assert (first['status'], first['rows_processed']) == ('success', 2)
+    assert (second['status'], second['rows_processed']) == ('success', 1)
+    assert (third['status'], third['rows_processed']) == ('success', 0)
+    assert processor.watermark_store.get('prices') == '2025-08-03 09:00:00'
+
+
+class NumericStringBackend(lam.DBAPIBackend):
+    """sqlite3 returning numbers as strings, as ibm_db does for DECIMAL and BIGINT columns"""
+
+    def fetch_rows(self, stmt, count):
+        return [tuple(str(value) if isinstance(value, (int, float)) else value for value in row)
+                for row in super().fetch_rows(stmt, count)]
+
+
+def test_incremental_mark_of_numeric_strings_advances_numerically(processor, tmp_path):
+    processor, s3 = processor
+    processor.backend = NumericStringBackend(sqlite3)
+    processor.watermark_store = lam.WatermarkStore(str(tmp_path / 'marks.json'))
+    processor.db_connection.execute('DELETE FROM PRICES WHERE PRICE > 6')
+    config = {**table_config('SELECT PRICE FROM PRICES'), 'incremental': {'column': 'PRICE'}}
+
+    first = processor.process_table(config)
+    # '5.25' < '10.00' only as numbers
+    processor.db_connection.execute('INSERT INTO PRICES VALUES (5, 10, NULL)')
+    second = processor.process_table(config)
+    third = processor.process_table(config)
+
+    assert (first['status'], first['rows_processed']) == ('success', 1)
+    assert (second['status'], second['rows_processed']) == ('success', 1)
+    assert (third['status'], third['rows_processed']) == ('success', 0)
+    assert processor.watermark_store.get('prices') == Decimal('10.00')
+
+
+def test_partitioned_table_splits_a_numeric_string_column(processor):
+    processor, s3 = processor
+    processor.backend = NumericStringBackend(sqlite3)
+    config = {**table_config('SELECT * FROM PRICES'), 'partition': {'column': 'PRICE', 'count': 2}}
+    result = processor.process_table(config)
+
+    assert result['status'] == 'success'
+    assert (result['parts'], result['rows_processed']) == (2, 4)
+    rows = [pq.read_table(io.BytesIO(body)).num_rows for _, body in sorted(s3.objects.items())]
+    assert rows == [2, 2]
+
+
+def test_partition_bounds_of_numeric_strings():
+    assert lam.partition_bounds('1.00', '900.00', 4) == [Decimal('225.75'), Decimal('450.50'), Decimal('675.25')]
+    assert lam.partition_bounds('1', '900', 4) == [225, 450, 675]
+
+
+def test_declared_columns_null_in_the_first_batch_are_not_held_back(processor):
+    processor, s3 = processor
+    processor.db_connection.execute('CREATE TABLE NOTES (ID INTEGER, NOTE VARCHAR(20), SCORE DOUBLE)')
+    processor.db_connection.executemany('INSERT INTO NOTES VALUES (?, ?, ?)',
+                                        [(i, None if i < 5 else 'n', None if i < 5 else 1.5) for i in range(6)])
+    batches = processor.iter_query_batches('SELECT * FROM NOTES ORDER BY ID', batch_size=2)
+    fetches = []
+    fetch_rows = processor.backend.fetch_rows
+    processor.backend.fetch_rows = lambda stmt, count: fetches.append(count) or fetch_rows(stmt, count)
+
+    first = next(batches)
+    assert len(fetches) == 1
+    assert first.schema.field('NOTE').type == lam.db2_arrow_type('string')
+    assert sum(batch.num_rows for batch in batches) == 4
+
+
+def test_partitioned_table_among_parallel_tables_opens_no_extra_connections(processor, tmp_path):
+    processor, s3 = processor
+    opened = []
+    processor.backend = lam.DBAPIBackend(sqlite3, check_same_thread=False)
+    connect = processor.backend.connect
+    processor.backend.connect = lambda connection_string: opened.append(connection_string) or connect(connection_string)
+    processor.connection_string = str(tmp_path / 'prices.db')
+    processor.db_connection = processor.backend.connect(processor.connection_string)
+    config = {
+        'settings': {'batch_size': 2, 'max_parallel_tables': 2},
+        'tables': [{**table_config('SELECT * FROM PRICES'), 'partition': {'column': 'ID', 'count': 4}},
+                   {**table_config('SELECT * FROM PRICES'), 'name': 'names'}],
+    }
+    results = processor.process_tables(config)
+
+    assert [result['status'] for result in results] == ['success', 'success']
+    assert results[0]['rows_processed'] == 4
+    assert len(opened) <= 2
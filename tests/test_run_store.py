@@ -0,0 +1,48 @@
+"""A second sync of the run store must fetch less and report the same costs"""
+
+import pytest
+
+from gjobs import GlueCostCalculator
+from gjobs_bench import StubGlueServer
+from gjobs_store import JobRunStore
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'test')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'test')
+    with StubGlueServer(jobs=3, runs_per_job=200, page_size=50) as stub:
+        yield stub
+
+
+def test_second_sync_fetches_fewer_pages_for_the_same_total(stub, tmp_path):
+    store = JobRunStore(str(tmp_path / 'runs.db'))
+    direct = GlueCostCalculator(endpoint_url=stub.endpoint_url).calculate_costs_for_jobs(stub.job_names)
+    stub.reset_counts()
+
+    totals = []
+    requests = []
+    for _ in range(2):
+        calculator = GlueCostCalculator(endpoint_url=stub.endpoint_url, run_store=store)
+        results = calculator.calculate_costs_for_jobs(stub.job_names)
+        totals.append(results.set_index('job_name')['total_cost_usd'].to_dict())
+        requests.append(stub.request_counts.get('GetJobRuns', 0))
+        stub.reset_counts()
+
+    assert totals[0] == totals[1] == direct.set_index('job_name')['total_cost_usd'].to_dict()
+    # The first sync pages through all 200 runs of each job; the second stops at its watermark
+    assert requests == [4 * 3, 3]
+    assert all(store.last_synced(job_name) is not None for job_name in stub.job_names)
+
+
+def test_offline_report_makes_no_api_calls(stub, tmp_path):
+    store = JobRunStore(str(tmp_path / 'runs.db'))
+    synced = GlueCostCalculator(endpoint_url=stub.endpoint_url, run_store=store).calculate_costs_for_jobs(
+        stub.job_names)
+    stub.reset_counts()
+
+    offline = GlueCostCalculator(endpoint_url=stub.endpoint_url, run_store=store, offline=True)
+    results = offline.calculate_costs_for_jobs(stub.job_names)
+
+    assert stub.total_requests() == 0
+    assert results['total_cost_usd'].sum() == synced['total_cost_usd'].sum()
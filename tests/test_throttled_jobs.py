@@ -0,0 +1,50 @@
+"""Throttling must slow the Glue calls down, not lose jobs or stall the run"""
+
+import pytest
+
+from gjobs import AdaptiveConcurrencyController, GlueCostCalculator
+from gjobs_bench import StubGlueServer
+from gjobs_service import GlueCostService
+
+
+@pytest.fixture
+def throttling_stub(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'test')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'test')
+    with StubGlueServer(jobs=3, runs_per_job=20, throttle_rate=1.0) as stub:
+        yield stub
+
+
+@pytest.mark.parametrize('enable_parallel', [False, True])
+def test_throttled_jobs_are_failures(throttling_stub, enable_parallel):
+    calculator = GlueCostCalculator(endpoint_url=throttling_stub.endpoint_url,
+                                    enable_parallel=enable_parallel, max_retries=0)
+    results = calculator.calculate_costs_for_jobs(throttling_stub.job_names)
+
+    assert list(results['status']) == ['error'] * 3
+    assert set(results.columns) >= {'failed_runs', 'error_message'}
+    stats = calculator.get_performance_stats(results.to_dict('records'))
+    assert stats['failed_jobs'] == 3
+    assert stats['successful_jobs'] == 0
+
+
+def test_jobs_whose_sync_failed_are_failures_in_every_service_window(throttling_stub, tmp_path):
+    service = GlueCostService(lambda calculator: throttling_stub.job_names, run_store=str(tmp_path / 'runs.db'),
+                              windows=['current-month', 'previous-month'],
+                              calculator_options={'endpoint_url': throttling_stub.endpoint_url, 'max_retries': 0})
+    service.refresh()
+
+    status, payload = service.handle('/windows', {})
+    assert status == 200
+    assert [window['failed_jobs'] for window in payload['windows']] == [3, 3]
+
+
+def test_first_throttle_caps_the_rate_at_half_the_rate_sent():
+    controller = AdaptiveConcurrencyController(max_limit=8)
+    for _ in range(8):
+        controller.acquire()
+    # Eight calls went out together; the first to return was throttled after 50 ms
+    controller.release(0.05, throttled=True)
+
+    assert controller.bucket.rate == pytest.approx(8 / 0.05 * 0.5, rel=0.05)
+    assert controller.limit == 4